@@ -0,0 +1,349 @@
+"""
+Benchmarks the item matchers of the looters and the sorter against a recorded item corpus, without the game client.
+
+The items of the corpus are served through a stand-in of the `Items` API (see `fake_items.py`), and driven through:
+- `lootmaster`: the rules of a `lootmaster.core.match.LootProfile`, on prebuilt item summaries,
+- `lootmaster-compiled`: the same profile compiled by `lootmaster.core.compiler`,
+- `lootmaster-summary`: building the `ItemSummary` of each item, i.e., parsing its properties,
+- `lootmaster_2`: every linked preset of `lootmaster_2.modules.match`, sharing one `ItemContext` per item,
+- `sorter`: every preset of `sorter.modules.core`,
+- `miexplorer`: building the sheet row of each item with `miexplorer.modules.core.PropMaster`.
+
+For each suite, the report lists the throughput, the `Items` calls per item, the allocations,
+and the nodes of the match trees with the most time spent in them.
+
+    python .dev/bench-matching/bench_matching.py [--rounds N] [--top N] [--suite NAME ...] [--json PATH]
+
+Record a corpus in the game with `record_items.py`, then pass it with `--corpus`.
+"""
+
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+PATH = os.path.dirname(os.path.abspath(__file__))
+REPO_PATH = os.path.dirname(os.path.dirname(PATH))
+sys.path.append(PATH)
+sys.path.append(os.path.join(REPO_PATH, ".stubs"))
+
+from fake_items import FakeItem, FakeItems, load_corpus, install
+
+
+CORPUS_PATH = os.path.join(PATH, "fixtures", "items.json")
+
+
+################################################################################
+# Module Loading
+################################################################################
+
+
+def load_package(name: str, path: str):
+    """
+    Import a package directory under another name, so that the `modules` packages of different scripts can coexist.
+    """
+    spec = importlib.util.spec_from_file_location(name, os.path.join(path, "__init__.py"), submodule_search_locations=[path])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_module(name: str, path: str):
+    """
+    Import a single module file under the provided name, without running the `__init__.py` of its package.
+    """
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def match_classes(module) -> List[type]:
+    """
+    Return the classes defined in the module which implement their own `test`.
+    """
+    return [
+        value
+        for value in vars(module).values()
+        if isinstance(value, type) and value.__module__ == module.__name__ and "test" in value.__dict__
+    ]
+
+
+################################################################################
+# Suites
+################################################################################
+
+
+class Suite:
+    """
+    A benchmark suite.
+
+    Attributes:
+        name (str): The name of the suite.
+        prepare (Callable): Converts the corpus items into the inputs of `evaluate`. This is not timed.
+        evaluate (Callable): Evaluates a single input, and returns the number of matches.
+        classes (List[type]): The match classes whose `test` is profiled per node.
+    """
+
+    def __init__(self, name: str, prepare: Callable[[List[FakeItem]], List[Any]], evaluate: Callable[[Any], int], classes: List[type]):
+        self.name = name
+        self.prepare = prepare
+        self.evaluate = evaluate
+        self.classes = classes
+
+
+def lootmaster_suites(items_api: FakeItems) -> List[Suite]:
+    sys.path.append(os.path.join(REPO_PATH, "lootmaster"))
+    sys.path.append(os.path.join(REPO_PATH, "lootmaster", ".dev"))
+    import core.summary
+    import core.match
+    from core.compiler import compile_profile
+    from bench_compiled_rules import build_profile
+
+    # `core.match` imports the summary module as `summary`, so both copies need the stand-in.
+    install(items_api, core.summary, sys.modules["summary"])
+    profile = build_profile()
+    compiled = compile_profile(profile)
+
+    def summarize(items: List[FakeItem]) -> List[Any]:
+        return [core.summary.ItemSummary(item) for item in items]
+
+    def calibrate(items: List[FakeItem]) -> List[Any]:
+        summaries = summarize(items)
+        compiled.calibrate(summaries)
+        return summaries
+
+    return [
+        Suite("lootmaster", summarize, lambda summary: int(bool(profile.test(summary))), match_classes(core.match)),
+        Suite("lootmaster-compiled", calibrate, lambda summary: int(bool(compiled.test(summary))), []),
+        Suite("lootmaster-summary", list, lambda item: len(core.summary.ItemSummary(item).magic_props), []),
+    ]
+
+
+def lootmaster_2_suites(items_api: FakeItems) -> List[Suite]:
+    load_package("lootmaster_2_modules", os.path.join(REPO_PATH, "lootmaster_2", "modules"))
+    match = importlib.import_module("lootmaster_2_modules.match")
+    install(items_api, match)
+    presets = list(match.LINKED_PRESETS.values())
+
+    def evaluate(item: FakeItem) -> int:
+        context = match.ItemContext(item)
+        return sum(1 for preset in presets if preset.test(context))
+
+    return [Suite("lootmaster_2", list, evaluate, match_classes(match))]
+
+
+def sorter_suites(items_api: FakeItems) -> List[Suite]:
+    # The package of the sorter also loads gumpradio, which needs the client, so only the matchers are loaded.
+    core = load_module("sorter_core", os.path.join(REPO_PATH, "sorter", "modules", "core.py"))
+    install(items_api, core)
+    presets = list(core.PRESETS.values())
+
+    def evaluate(item: FakeItem) -> int:
+        return sum(1 for preset in presets if preset.test(item))
+
+    return [Suite("sorter", list, evaluate, match_classes(core))]
+
+
+def miexplorer_suites(items_api: FakeItems) -> List[Suite]:
+    core = load_module("miexplorer_core", os.path.join(REPO_PATH, "miexplorer", "modules", "core.py"))
+    install(items_api, core)
+
+    def evaluate(item: FakeItem) -> int:
+        row = core.PropMaster.create_row_by_serial(item.Serial)
+        return len(row.properties) if row is not None else 0
+
+    return [Suite("miexplorer", list, evaluate, [])]
+
+
+SUITE_FACTORIES = [lootmaster_suites, lootmaster_2_suites, sorter_suites, miexplorer_suites]
+
+
+################################################################################
+# Measurements
+################################################################################
+
+
+class NodeProfiler:
+    """
+    Times every call of `test` on the provided classes, grouped by node (class and name), while active.
+
+    The inclusive time of a node covers its children, and its self time excludes them.
+    """
+
+    def __init__(self, classes: Iterable[type]):
+        self.classes = list(classes)
+        self.stats: Dict[Tuple[str, str], List[float]] = {}
+        self._stack: List[float] = []
+        self._originals: Dict[type, Callable] = {}
+
+    def _wrap(self, test: Callable) -> Callable:
+        profiler = self
+
+        def timed_test(node, *args, **kwargs):
+            profiler._stack.append(0.0)
+            t_start = time.perf_counter()
+            try:
+                result = test(node, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - t_start
+                children = profiler._stack.pop()
+                if profiler._stack:
+                    profiler._stack[-1] += elapsed
+            key = (type(node).__name__, getattr(node, "name", None) or "")
+            stat = profiler.stats.get(key)
+            if stat is None:
+                stat = profiler.stats[key] = [0, 0, 0.0, 0.0]
+            stat[0] += 1
+            stat[1] += 1 if result else 0
+            stat[2] += elapsed
+            stat[3] += elapsed - children
+            return result
+
+        return timed_test
+
+    def __enter__(self):
+        for cls in self.classes:
+            self._originals[cls] = cls.__dict__["test"]
+            setattr(cls, "test", self._wrap(cls.__dict__["test"]))
+        return self
+
+    def __exit__(self, *exc):
+        for cls, test in self._originals.items():
+            setattr(cls, "test", test)
+        self._originals.clear()
+
+    def top(self, count: int) -> List[Dict[str, Any]]:
+        rows = []
+        for (kind, name), (calls, hits, total, own) in self.stats.items():
+            rows.append(
+                {
+                    "node": f"{kind}({name})" if name else kind,
+                    "calls": int(calls),
+                    "hit-rate": hits / calls,
+                    "total-us": total * 1e6,
+                    "self-us": own * 1e6,
+                    "self-us-per-call": own * 1e6 / calls,
+                }
+            )
+        rows.sort(key=lambda row: row["self-us"], reverse=True)
+        return rows[:count]
+
+
+def measure_throughput(suite: Suite, inputs: List[Any], rounds: int, repeat: int = 3) -> float:
+    """
+    Return the best throughput over a few repeats, in items per second.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        for _ in range(rounds):
+            for value in inputs:
+                suite.evaluate(value)
+        best = min(best, time.perf_counter() - t_start)
+    return rounds * len(inputs) / best
+
+
+def measure_allocations(suite: Suite, inputs: List[Any]) -> Dict[str, float]:
+    """
+    Trace the memory allocations of a single pass over the inputs.
+
+    CPython does not count the blocks freed during the pass, so this reports the blocks still alive
+    after the pass (e.g., grown caches) and the peak of the traced memory, both per item.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        for value in inputs:
+            suite.evaluate(value)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    net_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return {
+        "net-blocks-per-item": net_blocks / len(inputs),
+        "peak-bytes-per-item": (peak - base) / len(inputs),
+    }
+
+
+def run_suite(suite: Suite, items: List[FakeItem], items_api: FakeItems, rounds: int, top: int) -> Dict[str, Any]:
+    inputs = suite.prepare(items)
+
+    # A warm-up pass, which also counts the matches and the client calls of a single pass.
+    items_api.reset_counts()
+    matches = sum(suite.evaluate(value) for value in inputs)
+    calls = {name: count / len(inputs) for name, count in items_api.calls.items()}
+
+    throughput = measure_throughput(suite, inputs, rounds)
+    allocations = measure_allocations(suite, inputs)
+    profiler = NodeProfiler(suite.classes)
+    with profiler:
+        for value in inputs:
+            suite.evaluate(value)
+    return {
+        "suite": suite.name,
+        "items": len(inputs),
+        "matches": matches,
+        "items-per-sec": throughput,
+        "calls-per-item": calls,
+        "allocations": allocations,
+        "nodes": profiler.top(top),
+    }
+
+
+def print_report(result: Dict[str, Any]):
+    print(f"== {result['suite']} ({result['items']} items, {result['matches']} matches)")
+    print(f"   {result['items-per-sec']:12.0f} items/s")
+    calls = ", ".join(f"{name} {count:.2f}" for name, count in sorted(result["calls-per-item"].items()))
+    print(f"   Items calls/item: {calls or 'none'}")
+    allocations = result["allocations"]
+    print(f"   Allocations/item: {allocations['net-blocks-per-item']:.2f} net blocks, {allocations['peak-bytes-per-item']:.0f} peak bytes")
+    if result["nodes"]:
+        print(f"   {'node':<48} {'calls':>8} {'hit%':>6} {'total us':>10} {'self us':>10} {'us/call':>8}")
+        for row in result["nodes"]:
+            print(
+                f"   {row['node'][:48]:<48} {row['calls']:>8} {row['hit-rate'] * 100:>6.1f}"
+                f" {row['total-us']:>10.1f} {row['self-us']:>10.1f} {row['self-us-per-call']:>8.2f}"
+            )
+    print()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the item matchers against a recorded item corpus.")
+    parser.add_argument("--corpus", default=CORPUS_PATH, help="the recorded item corpus")
+    parser.add_argument("--rounds", type=int, default=200, help="the passes over the corpus per throughput measurement")
+    parser.add_argument("--top", type=int, default=10, help="the number of nodes to list per suite")
+    parser.add_argument("--suite", action="append", help="run only the named suites")
+    parser.add_argument("--json", help="also write the results to this file, e.g., to compare two revisions")
+    args = parser.parse_args(argv)
+
+    items = load_corpus(args.corpus)
+    items_api = FakeItems(items)
+    suites = [suite for factory in SUITE_FACTORIES for suite in factory(items_api)]
+    if args.suite:
+        suites = [suite for suite in suites if suite.name in args.suite]
+
+    results = []
+    for suite in suites:
+        result = run_suite(suite, items, items_api, args.rounds, args.top)
+        print_report(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+A stand-in for the parts of the RazorEnhanced `Items` API used by the matchers,
+backed by a recorded item corpus, so that the matchers can run without the game client.
+
+A corpus is a JSON list of item records, as written by `record_items.py`:
+
+    {
+        "serial": 1073745929,
+        "id": 4230,
+        "color": 0,
+        "amount": 1,
+        "name": "Gold Bracelet",
+        "weight": 1,
+        "props": ["Gold Bracelet", "Weight: 1 Stone", ...],
+        "properties": [{"number": 1042971, "args": "Gold Bracelet"}, ...]
+    }
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+
+class FakeProperty:
+    """
+    A cliloc property of an item, as in `Item.Properties`.
+    """
+
+    def __init__(self, number: int, args: Optional[str]):
+        self.Number = number
+        self.Args = args
+
+    def ToString(self) -> str:
+        return self.Args or ""
+
+    def __str__(self) -> str:
+        return self.ToString()
+
+
+class FakeItem:
+    """
+    An item of the corpus, exposing the attributes of the RazorEnhanced `Item` read by the matchers.
+    """
+
+    def __init__(self, record: Dict[str, Any]):
+        self.Serial: int = record["serial"]
+        self.ItemID: int = record.get("id", 0)
+        self.Color: int = record.get("color", 0)
+        self.Amount: int = record.get("amount", 1)
+        self.Name: str = record.get("name", "")
+        self.Weight: int = record.get("weight", 0)
+        self.Container: int = record.get("container", 0)
+        self.RootContainer: int = record.get("container", 0)
+        self.OnGround: bool = self.Container == 0
+        self.Layer: str = record.get("layer", "")
+        self.PropsUpdated = True
+        self.Properties = [FakeProperty(prop["number"], prop.get("args")) for prop in record.get("properties", [])]
+        self.prop_strings: List[str] = list(record.get("props", []))
+
+    def __repr__(self) -> str:
+        return f"<FakeItem 0x{self.Serial:08X} {self.Name!r}>"
+
+
+class FakeItems:
+    """
+    The `Items` stand-in. Property lookups are counted, so that a benchmark can report
+    how many round trips to the client a matcher would have caused.
+
+    Attributes:
+        items (Dict[int, FakeItem]): The items of the corpus by serial.
+        calls (Dict[str, int]): The number of calls of each API method.
+    """
+
+    def __init__(self, items: Iterable[FakeItem]):
+        self.items: Dict[int, FakeItem] = {item.Serial: item for item in items}
+        self.calls: Dict[str, int] = {}
+
+    def _count(self, name: str):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _resolve(self, item: Union[int, FakeItem]) -> Optional[FakeItem]:
+        if isinstance(item, FakeItem):
+            return item
+        return self.items.get(item)
+
+    def reset_counts(self):
+        self.calls.clear()
+
+    def FindBySerial(self, serial: int) -> Optional[FakeItem]:
+        self._count("FindBySerial")
+        return self.items.get(serial)
+
+    def WaitForProps(self, item: Union[int, FakeItem], delay: int) -> bool:
+        self._count("WaitForProps")
+        return self._resolve(item) is not None
+
+    def GetPropStringList(self, item: Union[int, FakeItem]) -> List[str]:
+        self._count("GetPropStringList")
+        found = self._resolve(item)
+        return list(found.prop_strings) if found is not None else []
+
+    def GetProperties(self, item: Union[int, FakeItem], delay: int) -> List[FakeProperty]:
+        self._count("GetProperties")
+        found = self._resolve(item)
+        return list(found.Properties) if found is not None else []
+
+
+def load_corpus(path: str) -> List[FakeItem]:
+    """
+    Load the recorded items from a corpus file.
+    """
+    with open(path, "r") as f:
+        return [FakeItem(record) for record in json.load(f)]
+
+
+def install(items: FakeItems, *modules) -> None:
+    """
+    Replace the `Items` global of the modules (imported through `from AutoComplete import *`) with the stand-in.
+    """
+    for module in modules:
+        module.Items = items
+
+
+__all__ = [
+    "FakeProperty",
+    "FakeItem",
+    "FakeItems",
+    "load_corpus",
+    "install",
+]
@@ -0,0 +1,72 @@
+from AutoComplete import *
+import json
+import os
+import sys
+
+# This allows the RazorEnhanced to correctly identify the path of the current module.
+PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PATH)
+
+
+CORPUS_PATH = os.path.join(PATH, "fixtures", "items.json")
+
+
+def record_item(item) -> dict:
+    """
+    Record the raw item data read by the matchers: the base attributes, the property strings and the cliloc properties.
+    """
+    Items.WaitForProps(item.Serial, 1000)
+    return {
+        "serial": item.Serial,
+        "id": item.ItemID,
+        "color": item.Color,
+        "amount": item.Amount,
+        "name": item.Name,
+        "weight": item.Weight,
+        "container": item.Container,
+        "layer": item.Layer,
+        "props": list(Items.GetPropStringList(item.Serial)),
+        "properties": [{"number": prop.Number, "args": prop.Args} for prop in item.Properties],
+    }
+
+
+def record_container(serial: int) -> int:
+    """
+    Append the items in the container, and in its subcontainers, to the corpus file.
+    """
+    cont = Items.FindBySerial(serial)
+    if cont is None:
+        Misc.SendMessage("Container not found.", 33)
+        return 0
+
+    records = []
+    if os.path.exists(CORPUS_PATH):
+        with open(CORPUS_PATH, "r") as f:
+            records = json.load(f)
+    recorded = {record["serial"] for record in records}
+
+    count = 0
+    queue = [cont]
+    while queue:
+        cont = queue.pop()
+        Items.WaitForContents(cont.Serial, 1000)
+        cont = Items.FindBySerial(cont.Serial)
+        for item in cont.Contains:
+            if item.IsContainer:
+                queue.append(item)
+            if item.Serial in recorded:
+                continue
+            records.append(record_item(item))
+            recorded.add(item.Serial)
+            count += 1
+
+    with open(CORPUS_PATH, "w") as f:
+        json.dump(records, f, indent=4)
+    return count
+
+
+if __name__ == "__main__":
+    serial = Target.PromptTarget("Select a container to record.", 0x3B2)
+    if serial != -1:
+        count = record_container(serial)
+        Misc.SendMessage(f"Recorded {count} items.", 68)
@@ -0,0 +1,68 @@
+from AutoComplete import *
+from typing import List, Tuple
+import sys
+import os
+
+# Ensure the current directory is in the system path for module resolution
+sys.path.append(os.path.dirname(__file__))
+
+# Import gumpradio after modifying sys.path
+from gumpradio.templates import *
+
+
+def read_items() -> List[Tuple[str, str, int]]:
+    """
+    Read the name, the serial and the color of every item in the backpack, including its subcontainers.
+    """
+    rows = []
+    queue = [Player.Backpack]
+    while queue:
+        cont = queue.pop()
+        for item in cont.Contains:
+            if item.IsContainer:
+                queue.append(item)
+            rows.append((item.Name, f"0x{item.Serial:08X}", item.Color))
+    rows.sort()
+    return rows
+
+
+def show_main_gump():
+    rows = read_items()
+
+    def cell(row: int, col: int):
+        name, serial, color = rows[row]
+        if col == 0:
+            return name
+        return (serial, 1152 if color != 0 else -1)
+
+    # Initialize CraftingGumpBuilder
+    gb = CraftingGumpBuilder()
+
+    # Build the main frame
+    with gb.MainFrame():
+        # Title
+        with gb.ShadedColumn(halign="center"):
+            gb.Html(f"BACKPACK ({len(rows)} ITEMS)", width=300, color="#FFFFFF", centered=True)
+        # Only the cells of the pages in the window are read and sent, however many rows there are
+        with gb.ShadedColumn():
+            table = gb.Table([200, 80], len(rows), cell, header=["Name", "Serial"], page_size=15, window=5, selectable=True)
+        # Action buttons
+        with gb.ShadedRow():
+            gb.CraftingButton("Exit", style="x")
+
+    # Main loop
+    while True:
+        block, result = gb.launch().wait_response().unpack()
+
+        # Flipping past the window or selecting a row responds with the table
+        if block == table:
+            if table.selected is not None:
+                Misc.SendMessage(f"{rows[table.selected][0]} ({rows[table.selected][1]})", 68)
+            continue
+        # Exit on the exit button, or when the gump is closed
+        Misc.SendMessage("Bye!", 68)
+        break
+
+
+if __name__ == "__main__":
+    show_main_gump()
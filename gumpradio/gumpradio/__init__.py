@@ -1 +1,4 @@
+from .loader import share
+
+share(__name__)
 from .main import GumpBuilder
\ No newline at end of file
@@ -0,0 +1,41 @@
+from AutoComplete import *
+from typing import List, Tuple
+import sys
+import os
+
+# Ensure the current directory is in the system path for module resolution
+sys.path.append(os.path.dirname(__file__))
+
+# Import gumpradio after modifying sys.path
+from gumpradio.main import TILE_RECTS
+
+
+# The ranges of the graphic IDs to scan, as inclusive (first, last) pairs
+ID_RANGES: List[Tuple[int, int]] = [(0x0000, 0x7FFF)]
+# The number of tile arts scanned between two progress messages, which also saves the table
+REPORT_EVERY = 1000
+
+
+def prebuild(ranges: List[Tuple[int, int]]) -> int:
+    """
+    Scan the bounding boxes of every tile art in the ranges into the table shared by the gumps, and return the number of the new entries.
+    The tile arts already in the table are skipped, so an interrupted run can simply be started again.
+    """
+    scanned = [0]
+
+    def on_progress(graphics: int):
+        scanned[0] += 1
+        if scanned[0] % REPORT_EVERY == 0:
+            TILE_RECTS.flush()
+            Misc.SendMessage(f"Scanned {scanned[0]} tile arts, now at 0x{graphics:04X}.", 0x3B2)
+
+    count = 0
+    for first, last in ranges:
+        count += TILE_RECTS.prebuild(range(first, last + 1), on_progress)
+        TILE_RECTS.flush()
+    return count
+
+
+if __name__ == "__main__":
+    count = prebuild(ID_RANGES)
+    Misc.SendMessage(f"Added {count} tile arts, {len(TILE_RECTS.rects)} in total.", 68)
@@ -0,0 +1,131 @@
+"""
+Replays the recorded item summaries through the interpretive `LootProfile.test`
+and the compiled `CompiledProfile.test`, checks that both agree, and reports the throughput.
+
+This runs outside the client:
+
+    python lootmaster/.dev/bench_compiled_rules.py [rounds]
+"""
+
+import json
+import os
+import sys
+import time
+
+PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(PATH))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(PATH)), ".stubs"))
+
+from core.summary import ItemSummary
+from core.match import *
+from core.presets import LootMatchPresets
+from core.compiler import compile_profile
+
+
+FIXTURE_PATH = os.path.join(PATH, "fixtures", "item_summaries.json")
+
+
+def build_profile() -> LootProfile:
+    """
+    The template profile of `lootmaster_0_1.py`, plus a few name and regex rules.
+    """
+    red_backpack = LootMatchItemBase(name="Red Backpack", id=0x0E75, color=33)
+    teal_backpack = LootMatchItemBase(name="Teal Backpack", id=0x0E75, color=88)
+    profile = LootProfile("Benchmark")
+
+    rule = profile.add_rule(LootRules("Daily Rares"))
+    rule.add_match_props(LootMatchPresets.DailyRare())
+    rule = profile.add_rule(LootRules("Artifacts"))
+    rule.add_match_props(LootMatchPresets.Artifact())
+    rule.lootbag = red_backpack
+    rule = profile.add_rule(LootRules("Jewelry, High SSI"))
+    rule.add_match_base(LootMatchPresets.Jewelry())
+    rule.add_match_props(LootMatchMagicProperty(name="SSI", prop="Swing Speed Increase", min_value=10))
+    rule = profile.add_rule(LootRules("High LRC"))
+    rule.add_match_props(LootMatchMagicProperty(name="LRC", prop="Lower Reagent Cost", min_value=25))
+    rule = profile.add_rule(LootRules("100% Elemental Damage"))
+    rule.add_match_props(
+        LootMatchAny(
+            name="100% Elemental Damage",
+            match_list=[
+                LootMatchMagicProperty(name=f"{kind} Damage", prop=f"{kind} Damage", min_value=100)
+                for kind in ("Cold", "Energy", "Fire", "Poison", "Chaos")
+            ],
+        )
+    )
+    rule = profile.add_rule(LootRules("Gold"))
+    rule.add_match_base(LootMatchPresets.Gold())
+    rule = profile.add_rule(LootRules("Seeds"))
+    rule.add_match_base(LootMatchItemBase(name="Seeds", id=0x0DCF))
+    rule = profile.add_rule(LootRules("Paragon Loots"))
+    rule.add_match_base(LootMatchItemBase(name="Vanilla", id=0x0E2A))
+    rule.add_match_base(LootMatchItemBase(name="Sack of Sugar", id=0x1039, color=0x0461))
+    rule.add_match_base(LootMatchItemBase(name="Cocoa Liquor", id=0x103F, color=0x046A))
+    rule.add_match_base(LootMatchItemBase(name="Cocoa Butter", id=0x1044, color=0x0457))
+    rule = profile.add_rule(LootRules("Maps"))
+    rule.add_match_base(LootMatchPresets.Map())
+    rule = profile.add_rule(LootRules("Gems"))
+    rule.add_match_base(LootMatchPresets.Gem())
+    rule.lootbag = teal_backpack
+    rule = profile.add_rule(LootRules("Magic Items"))
+    rule.add_match_props(LootMatchPresets.MagicItem())
+    rule.add_match_except(LootMatchPresets.UnwieldyMagicItem())
+    rule = profile.add_rule(LootRules("Wands"))
+    rule.add_match_base(LootMatchPresets.Wand())
+    rule = profile.add_rule(LootRules("Reagents"))
+    rule.add_match_base(LootMatchPresets.Reagent())
+    rule = profile.add_rule(LootRules("Scrolls"))
+    rule.add_match_base(LootMatchPresets.Scroll())
+    rule = profile.add_rule(LootRules("Arrows and Bolts"))
+    rule.add_match_base(LootMatchPresets.Arrow())
+    rule.add_match_base(LootMatchPresets.Bolt())
+    rule = profile.add_rule(LootRules("Slayers"))
+    rule.add_match_props(LootMatchMagicProperty(name="Undead Slayer", prop="Silver"))
+    rule.add_match_except(LootMatchPresets.MagicItem())
+    rule = profile.add_rule(LootRules("Cursed Luck"))
+    rule.add_match_props(LootMatchProperty(name="Cursed", pattern="cursed"))
+    rule.add_match_props(LootMatchProperty(name="Luck", pattern=r"^luck (\d{2,})$", is_regex=True))
+    rule = profile.add_rule(LootRules("Bandages"))
+    rule.add_match_base(LootMatchName(name="Bandage", pattern="bandage"))
+    rule.add_match_base(LootMatchName(name="Bottle", pattern=r"^Empty Bottle$", is_regex=True))
+    rule.enabled = False
+    return profile
+
+
+def load_fixtures():
+    with open(FIXTURE_PATH, "r") as f:
+        return [ItemSummary.load(record) for record in json.load(f)]
+
+
+def measure(test, items, rounds: int) -> float:
+    t_start = time.perf_counter()
+    for _ in range(rounds):
+        for item in items:
+            test(item)
+    return time.perf_counter() - t_start
+
+
+def main(rounds: int = 2000):
+    items = load_fixtures()
+    profile = build_profile()
+    compiled = compile_profile(profile)
+
+    # Both paths must agree on every item and every rule.
+    for item in items:
+        assert profile.test(item) == compiled.test(item), f"Mismatch on {item.name} (0x{item.serial:08X})"
+        expected = [rule for rule in profile.rules if rule.test(item)]
+        assert compiled.matching_rules(item) == expected, f"Rule mismatch on {item.name} (0x{item.serial:08X})"
+
+    compiled.calibrate(items)
+    t_interp = measure(profile.test, items, rounds)
+    t_compiled = measure(compiled.test, items, rounds)
+    count = rounds * len(items)
+
+    print(f"Fixtures:    {len(items)} items x {rounds} rounds, {len(profile.rules)} rules, {len(compiled.nodes)} shared nodes")
+    print(f"Interpreted: {t_interp:8.3f}s  {count / t_interp:12.0f} items/s")
+    print(f"Compiled:    {t_compiled:8.3f}s  {count / t_compiled:12.0f} items/s")
+    print(f"Speedup:     {t_interp / t_compiled:8.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
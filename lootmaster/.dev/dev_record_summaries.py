@@ -0,0 +1,49 @@
+from AutoComplete import *
+import json
+import os
+import sys
+
+# This allows the RazorEnhanced to correctly identify the path of the current module.
+PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(PATH))
+
+from core.summary import ItemSummary
+
+
+FIXTURE_PATH = os.path.join(PATH, "fixtures", "item_summaries.json")
+
+
+def record_container(serial: int) -> int:
+    """
+    Append the summaries of all items in the container to the fixture file.
+    """
+    cont = Items.FindBySerial(serial)
+    if cont is None:
+        Misc.SendMessage("Container not found.", 33)
+        return 0
+    Items.WaitForContents(serial, 1000)
+    cont = Items.FindBySerial(serial)
+
+    records = []
+    if os.path.exists(FIXTURE_PATH):
+        with open(FIXTURE_PATH, "r") as f:
+            records = json.load(f)
+    recorded = {record["serial"] for record in records}
+
+    count = 0
+    for item in cont.Contains:
+        if item.Serial in recorded:
+            continue
+        records.append(ItemSummary(item).to_dict())
+        count += 1
+
+    with open(FIXTURE_PATH, "w") as f:
+        json.dump(records, f, indent=4)
+    return count
+
+
+if __name__ == "__main__":
+    serial = Target.PromptTarget("Select a container to record.", 0x3B2)
+    if serial != -1:
+        count = record_container(serial)
+        Misc.SendMessage(f"Recorded {count} items.", 68)
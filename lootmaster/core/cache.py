@@ -0,0 +1,147 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+# This allows the RazorEnhanced to correctly identify the path of the current module.
+PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PATH)
+
+
+################################################################################
+# Bounded Cache
+################################################################################
+
+
+T = TypeVar("T")
+
+
+def prop_revision(item) -> Optional[int]:
+    """
+    Compute a revision token of the properties the client currently holds for the item.
+
+    The client refreshes `item.Properties` whenever the server announces a new property revision,
+    so a change of this token means the cached summary of the item is stale.
+    Reading it does not cause a round trip to the server.
+
+    Returns:
+        The revision token, or `None` if the properties of the item have not been received yet.
+    """
+    if not item.PropsUpdated:
+        return None
+    return hash((item.ItemID, item.Color, item.Amount, tuple((prop.Number, prop.Args) for prop in item.Properties)))
+
+
+class LRUCache(Generic[T]):
+    """
+    A thread-safe bounded cache with least-recently-used eviction and a per-entry time-to-live.
+
+    Each entry may carry a revision token. Looking up an entry with a different token invalidates it.
+
+    Attributes:
+        max_size (int): The maximum number of entries. The least recently used entry is evicted beyond this.
+        ttl (float): The lifetime of each entry in seconds. Non-positive values disable the expiration.
+        hits (int): The number of successful lookups.
+        misses (int): The number of failed lookups, including the expired and invalidated ones.
+        evictions (int): The number of entries evicted to respect `max_size`.
+        expirations (int): The number of entries dropped because their lifetime ended.
+        invalidations (int): The number of entries dropped because their revision changed, or by `invalidate`.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 1800):
+        assert max_size > 0, "The cache size must be positive."
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Hashable, Tuple[T, Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, revision: Any = None) -> Optional[T]:
+        """
+        Look up an entry and mark it as the most recently used.
+
+        Arguments:
+            key (Hashable): The key of the entry.
+            revision (Any): The current revision token. If `None`, the revision is not checked.
+
+        Returns:
+            The cached value, or `None` if it is missing, expired or stale.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, cached_revision, expires = entry
+            if self.ttl > 0 and time.monotonic() >= expires:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if revision is not None and cached_revision is not None and revision != cached_revision:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: T, revision: Any = None):
+        """
+        Insert or replace an entry, evicting the least recently used entries if the cache is full.
+        """
+        with self._lock:
+            self._entries[key] = (value, revision, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """
+        Drop an entry. Returns True if the entry existed.
+        """
+        with self._lock:
+            if self._entries.pop(key, None) is None:
+                return False
+            self.invalidations += 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the size and the counters of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max-size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit-rate": self.hits / lookups if lookups > 0 else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+__all__ = [
+    "prop_revision",
+    "LRUCache",
+]
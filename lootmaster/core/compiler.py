@@ -0,0 +1,499 @@
+import os
+import sys
+import re
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# This allows the RazorEnhanced to correctly identify the path of the current module.
+PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PATH)
+
+from core.summary import ItemSummary
+from core.match import LootMatch, LootRules, LootProfile
+
+
+################################################################################
+# Compiled Nodes
+################################################################################
+
+
+REORDER_INTERVAL = 256
+"""The number of profile tests between two automatic re-orderings of the compiled nodes."""
+
+STATIC_COST = {
+    "id": 1.0,
+    "ids": 1.0,
+    "serial": 1.0,
+    "weight": 1.0,
+    "rarity": 1.0,
+    "magic": 2.0,
+    "name": 3.0,
+    "name-regex": 5.0,
+    "prop": 3.0,
+    "prop-regex": 8.0,
+    "opaque": 20.0,
+}
+"""The initial cost estimates of each node kind, used until the nodes are calibrated."""
+
+_LOWER_PROPS = object()
+"""The memo key for the lowercased property lines of the item being tested."""
+
+_JOINED_PROPS = object()
+"""The memo key for the lowercased property lines joined by newlines."""
+
+
+class _Node:
+    """
+    A single predicate of the compiled rule tree.
+
+    Structurally identical predicates share the same node, so that a predicate used by several rules
+    is evaluated at most once per item.
+
+    Attributes:
+        key (tuple): The structural key of the predicate.
+        fn (Callable): The evaluator taking the item summary and the per-item memo.
+        cost (float): The estimated (or measured) cost of a single evaluation.
+        evals (int): The number of times the node has been evaluated.
+        hits (int): The number of times the node has been evaluated to True.
+    """
+
+    __slots__ = ("key", "fn", "cost", "evals", "hits", "children")
+
+    def __init__(self, key: tuple, fn: Callable, cost: float, children: Optional[List["_Node"]] = None):
+        self.key = key
+        self.fn = fn
+        self.cost = cost
+        self.evals = 0
+        self.hits = 0
+        self.children = children
+
+    @property
+    def pass_rate(self) -> float:
+        # Laplace smoothing keeps unseen nodes away from 0 and 1.
+        return (self.hits + 1) / (self.evals + 2)
+
+    def evaluate(self, item: ItemSummary, memo: Dict[Any, bool]) -> bool:
+        result = memo.get(self)
+        if result is None:
+            result = self.fn(item, memo)
+            memo[self] = result
+            self.evals += 1
+            if result:
+                self.hits += 1
+        return result
+
+
+def _rank_all(node: _Node) -> float:
+    """Sort key for conjunctions: cheap predicates that are likely to fail go first."""
+    return node.cost / (1.0 - node.pass_rate)
+
+
+def _rank_any(node: _Node) -> float:
+    """Sort key for disjunctions: cheap predicates that are likely to pass go first."""
+    return node.cost / node.pass_rate
+
+
+def _eval_all(nodes: List[_Node], item: ItemSummary, memo: Dict[Any, bool]) -> bool:
+    for node in nodes:
+        if not node.evaluate(item, memo):
+            return False
+    return True
+
+
+def _eval_any(nodes: List[_Node], item: ItemSummary, memo: Dict[Any, bool]) -> bool:
+    for node in nodes:
+        if node.evaluate(item, memo):
+            return True
+    return False
+
+
+def _lower_props(item: ItemSummary, memo: Dict[Any, Any]) -> List[str]:
+    props = memo.get(_LOWER_PROPS)
+    if props is None:
+        props = memo[_LOWER_PROPS] = [prop.lower() for prop in item.props]
+    return props
+
+
+def _joined_props(item: ItemSummary, memo: Dict[Any, Any]) -> str:
+    joined = memo.get(_JOINED_PROPS)
+    if joined is None:
+        joined = memo[_JOINED_PROPS] = "\n".join(_lower_props(item, memo))
+    return joined
+
+
+def _match_kind(match: LootMatch) -> str:
+    """
+    Return the name of the built-in LootMatch class the given match derives from.
+
+    The class names are compared instead of the classes themselves,
+    since the match module can be imported both as `match` and as `core.match`.
+    """
+    for cls in type(match).__mro__:
+        if cls.__name__.startswith("LootMatch") or cls.__name__ == "LootRules":
+            return cls.__name__
+    return type(match).__name__
+
+
+################################################################################
+# Compiler
+################################################################################
+
+
+class CompiledRules:
+    """
+    The compiled form of a single LootRules.
+
+    Attributes:
+        rule (LootRules): The source rule. Its `enabled` flag is read on every test.
+        index (int): The position of the rule in the profile.
+        base_ids (frozenset): Item IDs that satisfy the base match regardless of the color.
+        base_pairs (frozenset): (Item ID, color) pairs that satisfy the base match.
+        base_nodes (List[_Node]): Base matches that cannot be resolved by an ID lookup.
+        prop_nodes (List[_Node]): Property matches, all of which must pass.
+        except_nodes (List[_Node]): Exception matches, none of which may pass.
+    """
+
+    def __init__(self, rule: LootRules, index: int):
+        self.rule = rule
+        self.index = index
+        self.has_base = len(rule.match_base) > 0
+        self.base_ids: frozenset = frozenset()
+        self.base_pairs: frozenset = frozenset()
+        self.base_nodes: List[_Node] = []
+        self.prop_nodes: List[_Node] = []
+        self.except_nodes: List[_Node] = []
+        self.evals = 0
+        self.hits = 0
+
+    @property
+    def indexable(self) -> bool:
+        """Whether the base match of the rule is fully resolved by the item ID."""
+        return self.has_base and not self.base_nodes
+
+    @property
+    def cost(self) -> float:
+        return 1.0 + sum(node.cost for node in self.base_nodes + self.prop_nodes + self.except_nodes)
+
+    @property
+    def pass_rate(self) -> float:
+        return (self.hits + 1) / (self.evals + 2)
+
+    def test(self, item: ItemSummary, memo: Dict[Any, Any]) -> bool:
+        if not self.rule.enabled:
+            return False
+        self.evals += 1
+        if self.has_base:
+            if item.id not in self.base_ids and (item.id, item.color) not in self.base_pairs:
+                if not _eval_any(self.base_nodes, item, memo):
+                    return False
+        if not _eval_all(self.prop_nodes, item, memo):
+            return False
+        if _eval_any(self.except_nodes, item, memo):
+            return False
+        self.hits += 1
+        return True
+
+    def reorder(self):
+        self.base_nodes.sort(key=_rank_any)
+        self.prop_nodes.sort(key=_rank_all)
+        self.except_nodes.sort(key=_rank_any)
+
+
+class CompiledProfile:
+    """
+    A flat, pre-indexed evaluator equivalent to `LootProfile.test`.
+
+    The profile is compiled once into shared predicate nodes:
+    regular expressions are precompiled, ID groups become frozensets,
+    identical sub-matches across rules are evaluated at most once per item,
+    and the evaluation order is periodically re-sorted by the measured pass rate and cost of each node.
+
+    Rules whose base match is made of item IDs only are indexed by those IDs,
+    so an item is only tested against the rules that can possibly match it.
+
+    The compiled profile does not track edits to the source profile except for the `enabled` flag of the rules.
+    Call `compile_profile` again after adding, removing or editing rules.
+
+    Attributes:
+        profile (LootProfile): The source profile.
+        rules (List[CompiledRules]): The compiled rules, in the profile order.
+        nodes (Dict[tuple, _Node]): All the distinct predicates of the profile, by their structural key.
+    """
+
+    def __init__(self, profile: LootProfile):
+        self.profile = profile
+        self.rules: List[CompiledRules] = []
+        self.nodes: Dict[tuple, _Node] = {}
+        self._by_id: Dict[int, List[CompiledRules]] = {}
+        self._residual: List[CompiledRules] = []
+        self._tests = 0
+
+        for index, rule in enumerate(profile.rules):
+            self.rules.append(self._compile_rule(rule, index))
+        for crule in self.rules:
+            if crule.indexable:
+                for itemid in crule.base_ids.union(pair[0] for pair in crule.base_pairs):
+                    self._by_id.setdefault(itemid, []).append(crule)
+            else:
+                self._residual.append(crule)
+
+    ############################################################################
+    # Evaluation
+
+    def candidates(self, item: ItemSummary) -> List[CompiledRules]:
+        """
+        Return the compiled rules which can possibly match the item, ordered by their expected cost.
+        """
+        indexed = self._by_id.get(item.id)
+        if indexed is None:
+            return self._residual
+        return indexed + self._residual
+
+    def test(self, item: ItemSummary) -> bool:
+        """
+        Test if the item matches any rule in the profile. Equivalent to `LootProfile.test`.
+        """
+        self._tests += 1
+        if self._tests % REORDER_INTERVAL == 0:
+            self.reorder()
+        memo = {}
+        for crule in self.candidates(item):
+            if crule.test(item, memo):
+                return True
+        return False
+
+    def matching_rules(self, item: ItemSummary) -> List[LootRules]:
+        """
+        Return all rules matching the item, in the profile order.
+        """
+        memo = {}
+        result = [crule for crule in self.candidates(item) if crule.test(item, memo)]
+        result.sort(key=lambda crule: crule.index)
+        return [crule.rule for crule in result]
+
+    def test_rule(self, rule: LootRules, item: ItemSummary) -> bool:
+        """
+        Test a single rule of the profile against the item. Equivalent to `LootRules.test`.
+        """
+        for crule in self.rules:
+            if crule.rule is rule:
+                return crule.test(item, {})
+        return rule.test(item)
+
+    ############################################################################
+    # Ordering
+
+    def reorder(self):
+        """
+        Re-sort every conjunction and disjunction by the measured pass rate and cost of its members.
+        """
+        for node in self.nodes.values():
+            if node.children is None:
+                continue
+            if node.key[0] == "all":
+                node.children.sort(key=_rank_all)
+            else:
+                node.children.sort(key=_rank_any)
+        for crule in self.rules:
+            crule.reorder()
+        for rules in self._by_id.values():
+            rules.sort(key=lambda crule: crule.cost / crule.pass_rate)
+        self._residual.sort(key=lambda crule: crule.cost / crule.pass_rate)
+
+    def calibrate(self, items: Iterable[ItemSummary], repeat: int = 3):
+        """
+        Replace the static cost estimates of the leaf nodes by their measured evaluation time.
+
+        The measured time is normalized so that the cheapest leaf costs 1.
+        Group nodes are then assigned the sum of the costs of their children.
+
+        Arguments:
+            items (Iterable[ItemSummary]): Sample items to measure the nodes against.
+            repeat (int): The number of times each node is evaluated against each sample item.
+        """
+        items = list(items)
+        if not items:
+            return
+        leaves = [node for node in self.nodes.values() if node.children is None]
+        timings: Dict[_Node, float] = {}
+        for node in leaves:
+            memos = [{} for _ in items]
+            # Warm the lowercased property lines, which are shared by all property nodes.
+            for item, memo in zip(items, memos):
+                _joined_props(item, memo)
+            t_start = time.perf_counter()
+            for _ in range(repeat):
+                for item, memo in zip(items, memos):
+                    node.fn(item, memo)
+            timings[node] = time.perf_counter() - t_start
+        unit = min((t for t in timings.values() if t > 0), default=1.0)
+        for node, elapsed in timings.items():
+            node.cost = max(elapsed / unit, 1.0)
+        # Children are created before their parents, so the insertion order is a valid bottom-up order.
+        for node in self.nodes.values():
+            if node.children is not None:
+                node.cost = sum(child.cost for child in node.children)
+        self.reorder()
+
+    def stats(self) -> List[Tuple[tuple, int, float, float]]:
+        """
+        Return the (key, evaluations, pass rate, cost) of every node, the most evaluated first.
+        """
+        rows = [(node.key, node.evals, node.pass_rate, node.cost) for node in self.nodes.values()]
+        rows.sort(key=lambda row: -row[1])
+        return rows
+
+    ############################################################################
+    # Compilation
+
+    def _intern(self, key: tuple, fn: Callable, cost: float, children: Optional[List[_Node]] = None) -> _Node:
+        node = self.nodes.get(key)
+        if node is None:
+            node = self.nodes[key] = _Node(key, fn, cost, children)
+        return node
+
+    def _compile_rule(self, rule: LootRules, index: int) -> CompiledRules:
+        crule = CompiledRules(rule, index)
+        base_ids = set()
+        base_pairs = set()
+        for match in rule.match_base:
+            kind = _match_kind(match)
+            if kind == "LootMatchItemBase":
+                if match.color == -1:
+                    base_ids.add(match.id)
+                else:
+                    base_pairs.add((match.id, match.color))
+            elif kind == "LootMatchItemGroup":
+                base_ids.update(match.id_list)
+            else:
+                crule.base_nodes.append(self._compile_match(match))
+        crule.base_ids = frozenset(base_ids)
+        crule.base_pairs = frozenset(pair for pair in base_pairs if pair[0] not in base_ids)
+        crule.prop_nodes = [self._compile_match(match) for match in rule.match_props]
+        crule.except_nodes = [self._compile_match(match) for match in rule.match_except]
+        crule.reorder()
+        return crule
+
+    def _compile_match(self, match: LootMatch) -> _Node:
+        kind = _match_kind(match)
+
+        if kind == "LootMatchItemBase":
+            itemid, color = match.id, match.color
+            if color == -1:
+                return self._intern(("id", itemid, -1), lambda item, memo: item.id == itemid, STATIC_COST["id"])
+            return self._intern(
+                ("id", itemid, color),
+                lambda item, memo: item.id == itemid and item.color == color,
+                STATIC_COST["id"],
+            )
+
+        if kind == "LootMatchItemGroup":
+            id_set = frozenset(match.id_list)
+            return self._intern(("ids", id_set), lambda item, memo: item.id in id_set, STATIC_COST["ids"])
+
+        if kind == "LootMatchSerial":
+            serial = match.serial
+            return self._intern(("serial", serial), lambda item, memo: item.serial == serial, STATIC_COST["serial"])
+
+        if kind == "LootMatchName":
+            if match.is_regex:
+                regex = re.compile(match.pattern)
+                return self._intern(
+                    ("name-regex", match.pattern),
+                    lambda item, memo: regex.search(item.name) is not None,
+                    STATIC_COST["name-regex"],
+                )
+            needle = match.pattern.lower()
+            return self._intern(("name", needle), lambda item, memo: needle in item.name.lower(), STATIC_COST["name"])
+
+        if kind == "LootMatchWeight":
+            w_min, w_max = match.weight_min, match.weight_max
+            return self._intern(
+                ("weight", w_min, w_max),
+                lambda item, memo: item.weight is not None and w_min <= item.weight <= w_max,
+                STATIC_COST["weight"],
+            )
+
+        if kind == "LootMatchRarity":
+            r_min, r_max = match.rarity_min, match.rarity_max
+            return self._intern(("rarity", r_min, r_max), lambda item, memo: r_min <= item.rarity <= r_max, STATIC_COST["rarity"])
+
+        if kind == "LootMatchProperty":
+            if match.is_regex:
+                regex = re.compile(match.pattern)
+
+                def test_prop_regex(item, memo):
+                    for prop in _lower_props(item, memo):
+                        if regex.search(prop):
+                            return True
+                    return False
+
+                return self._intern(("prop-regex", match.pattern), test_prop_regex, STATIC_COST["prop-regex"])
+            needle = match.pattern.lower()
+            # A needle without newlines cannot match across the joined lines.
+            # An empty needle only matches an item with properties, which the joined lines cannot tell.
+            if needle and "\n" not in needle:
+                return self._intern(("prop", needle), lambda item, memo: needle in _joined_props(item, memo), STATIC_COST["prop"])
+            return self._intern(
+                ("prop", needle),
+                lambda item, memo: any(needle in prop for prop in _lower_props(item, memo)),
+                STATIC_COST["prop"],
+            )
+
+        if kind == "LootMatchMagicProperty":
+            prop, min_value = match.prop, match.min_value
+            if prop.endswith("Slayer"):
+                res = re.search(r"^(.+) slayer$", prop.lower())
+                slayer = res.group(1) if res is not None else None
+
+                def test_slayer(item, memo):
+                    value = item.magic_props.get("Slayer", None)
+                    if value is None or slayer is None:
+                        return False
+                    return value.lower() == slayer
+
+                return self._intern(("magic", prop, None), test_slayer, STATIC_COST["magic"])
+
+            def test_magic(item, memo):
+                value = item.magic_props.get(prop, None)
+                if isinstance(value, bool):
+                    return value
+                if isinstance(value, int):
+                    return value >= min_value
+                return False
+
+            return self._intern(("magic", prop, min_value), test_magic, STATIC_COST["magic"])
+
+        if kind in ("LootMatchAll", "LootMatchAny"):
+            children = [self._compile_match(entry) for entry in match.match_list]
+            cost = sum(child.cost for child in children)
+            if kind == "LootMatchAll":
+                children.sort(key=_rank_all)
+                key = ("all", frozenset(child.key for child in children))
+                return self._intern(key, lambda item, memo: _eval_all(children, item, memo), cost, children)
+            children.sort(key=_rank_any)
+            key = ("any", frozenset(child.key for child in children))
+            return self._intern(key, lambda item, memo: _eval_any(children, item, memo), cost, children)
+
+        # Unknown match types are evaluated by the interpreter.
+        return self._intern(("opaque", id(match)), lambda item, memo: match.test(item), STATIC_COST["opaque"])
+
+
+def compile_profile(profile: LootProfile) -> CompiledProfile:
+    """
+    Compile a loot profile into a flat, pre-indexed evaluator.
+
+    Arguments:
+        profile (LootProfile): The profile to be compiled.
+
+    Returns:
+        CompiledProfile: The evaluator, equivalent to `profile.test`.
+    """
+    return CompiledProfile(profile)
+
+
+__all__ = [
+    "CompiledRules",
+    "CompiledProfile",
+    "compile_profile",
+]
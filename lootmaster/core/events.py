@@ -0,0 +1,200 @@
+from AutoComplete import *
+import os
+import sys
+import time
+from enum import Enum
+from typing import Any, Dict, List, Set, Tuple
+
+# This allows the RazorEnhanced to correctly identify the path of the current module.
+PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PATH)
+
+from core.summary import ItemSummary
+from core.match import LootProfile
+from core.looter import Looter, LootingMode
+
+
+################################################################################
+# Event-Driven Looter
+################################################################################
+
+
+class LootEvent(Enum):
+    NEW_TARGET = 1
+    """A lootable target came within reach."""
+    CONTENTS = 2
+    """The contents of a target arrived or changed."""
+    JOURNAL = 3
+    """A name label of a target arrived in the journal."""
+    TIMER = 4
+    """The action delay expired while an action was pending."""
+
+
+class EventLooter(Looter):
+    """
+    A looter that only re-evaluates the targets affected by an event, instead of rescanning everything on a fixed refresh rate.
+
+    Each iteration polls a few cheap signals: the targets within reach, a snapshot of their contents,
+    the new journal entries and the action-delay timer. Targets touched by an event are marked dirty,
+    and only the dirty targets are opened and matched again. When nothing happens, the loop just sleeps.
+
+    Only the looping mode is event-driven. The single mode falls back to `Looter.loot_loop`.
+
+    Attributes:
+        dirty (Set[int]): The serials of the targets to be re-evaluated.
+        lootables (Dict[int, List[ItemSummary]]): The lootable items of each target within reach, as of the last evaluation.
+        event_counts (Dict[LootEvent, int]): The number of events of each kind since the looter was created.
+    """
+
+    def __init__(self, setting: Dict[str, Any], profile: LootProfile, mode: LootingMode = LootingMode.STOPPED):
+        super().__init__(setting, profile, mode)
+        self.dirty: Set[int] = set()
+        self.lootables: Dict[int, List[ItemSummary]] = {}
+        self.event_counts: Dict[LootEvent, int] = {event: 0 for event in LootEvent}
+        self._snapshots: Dict[int, Tuple[bool, frozenset]] = {}
+        self._clicked: Set[int] = set()
+        self._index_version = -1
+        self._journal_time = time.time()
+        self._timer_ready = True
+
+    def _emit(self, events: List[Tuple[LootEvent, int]], event: LootEvent, serial: int):
+        events.append((event, serial))
+        self.event_counts[event] += 1
+
+    def poll_events(self, targets: List[Any]) -> List[Tuple[LootEvent, int]]:
+        """
+        Collect the events since the last poll, and mark the affected targets dirty.
+
+        Arguments:
+            targets (List[Item]): The targets currently within reach.
+
+        Returns:
+            A list of (event, serial) pairs. The serial is 0 for the timer event.
+        """
+        events: List[Tuple[LootEvent, int]] = []
+
+        # New targets and changes of the contents of known targets
+        for target in targets:
+            snapshot = (target.ContainerOpened, frozenset(item.Serial for item in target.Contains))
+            previous = self._snapshots.get(target.Serial)
+            if previous is None:
+                self._emit(events, LootEvent.NEW_TARGET, target.Serial)
+            elif previous != snapshot:
+                self._emit(events, LootEvent.CONTENTS, target.Serial)
+            self._snapshots[target.Serial] = snapshot
+
+        # Name labels of the corpses, which tell whether they are lootable
+        entries = Journal.GetJournalEntry(self._journal_time)
+        if entries:
+            self._journal_time = max(entry.Timestamp for entry in entries)
+            labels = [entry.Serial for entry in entries if entry.Type == "Label"]
+            if labels:
+                self._raw_check_lootability()
+                for serial in labels:
+                    if serial in self._snapshots:
+                        self._emit(events, LootEvent.JOURNAL, serial)
+
+        # The action delay expired while something is waiting for it
+        timer_ready = Timer.Remaining("action-delay") <= 0
+        if timer_ready and not self._timer_ready and (self.dirty or any(self.lootables.values())):
+            self._emit(events, LootEvent.TIMER, 0)
+        self._timer_ready = timer_ready
+
+        for event, serial in events:
+            if serial != 0:
+                self.dirty.add(serial)
+        return events
+
+    def _forget_out_of_reach(self, targets: List[Any]):
+        in_reach = {target.Serial for target in targets}
+        for serial in [serial for serial in self._snapshots if serial not in in_reach]:
+            del self._snapshots[serial]
+            self.lootables.pop(serial, None)
+            self.dirty.discard(serial)
+
+    def _click_new_corpses(self, targets: List[Any]):
+        """
+        Request the name labels of the newly seen corpses, which replaces `global_check_lootability` in the event mode.
+        If the target index is the scanner, the corpses in the vicinity are clicked whenever the index grows.
+        """
+        if self.scanner is self.target_index:
+            if self.target_index.version == self._index_version:
+                return
+            self._index_version = self.target_index.version
+            targets = self.target_index.nearby(8)
+        for target in targets:
+            if target.ItemID != 0x2006:
+                continue
+            if target.Serial in self._clicked or target.Serial in self.target_cache:
+                continue
+            self._clicked.add(target.Serial)
+            Items.SingleClick(target.Serial)
+
+    def evaluate_dirty(self, targets: List[Any]):
+        """
+        Open and match the dirty targets only. Targets which failed to open, or whose items are still waiting for
+        their properties, stay dirty and are evaluated again whenever the action delay is ready.
+        """
+        for target in targets:
+            if self._stop_event.is_set():
+                return
+            if target.Serial not in self.dirty:
+                continue
+            success, lootables, incomplete = self.attempt_open(target)
+            self.lootables[target.Serial] = lootables
+            if success and not incomplete:
+                self.dirty.discard(target.Serial)
+
+    def loot_loop(self):
+        """
+        Wait for events, re-evaluate the affected targets, and loot one item per action delay.
+        """
+        if self.mode != LootingMode.LOOP:
+            return super().loot_loop()
+
+        delay_poll = self.setting.get("event-poll-interval", 50)
+        delay_action = self.setting.get("action-delay", 900)
+        self.dirty.clear()
+        self.lootables.clear()
+        self._snapshots.clear()
+        self._journal_time = time.time()
+        loot_blocked = False
+        while Player.Connected and (not Player.IsGhost) and (not self._stop_event.is_set()):
+            if self.mode == LootingMode.STOPPED:
+                break
+
+            if not Timer.Check("session-timeout"):
+                Misc.SendMessage("Looter> Session timeout reached, stopping looter.", 0x3B2)
+                break
+
+            targets = self.scan_nearby_targets()
+            self._forget_out_of_reach(targets)
+            events = self.poll_events(targets)
+            self._click_new_corpses(targets)
+            if events:
+                loot_blocked = False
+            if self.dirty and Timer.Remaining("action-delay") <= 0:
+                self.evaluate_dirty(targets)
+
+            # Attempt to loot the first item that matches the profile rules
+            lootables = [item for items in self.lootables.values() for item in items]
+            if lootables and not loot_blocked and Timer.Remaining("action-delay") <= 0:
+                if self.loot_single(lootables):
+                    Timer.Create("action-delay", delay_action)
+                else:
+                    # Nothing can be looted until something changes.
+                    loot_blocked = True
+
+            self._stop_event.wait(delay_poll / 1000)
+
+        self._stop_event.set()
+        self.mode = LootingMode.STOPPED
+        if self.callback is not None:
+            self.callback()
+        self._thread = None
+
+
+__all__ = [
+    "LootEvent",
+    "EventLooter",
+]
@@ -30,6 +30,11 @@ SETTING_SCHEMA = {
     "greedy-looting": False,
     "mark-after-finished": True,
     "mark-color": 1014,
+    "event-driven": True,
+    "event-poll-interval": 50,
+    "props-timeout": 1000,
+    "summary-cache-size": 10000,
+    "summary-cache-ttl": 1800,
 }
 
 
@@ -6,7 +6,7 @@ import sys
 from System.Collections.Generic import List as CList  # type: ignore
 from System import Byte  # type: ignore
 from enum import Enum
-from typing import List, Dict, Tuple, Any, Optional, Callable, Union
+from typing import List, Dict, Tuple, Any, Optional, Callable, Union, Iterable, Iterator
 
 # This allows the RazorEnhanced to correctly identify the path of the current module.
 PATH = os.path.dirname(os.path.abspath(__file__))
@@ -14,6 +14,9 @@ sys.path.append(PATH)
 
 from core.summary import ItemSummary
 from core.match import LootProfile, LootRules, LootMatch
+from core.compiler import CompiledProfile, compile_profile
+from core.cache import LRUCache, prop_revision
+from core.spatial import RootResolver, TargetIndex
 
 
 ################################################################################
@@ -93,27 +96,28 @@ def close_container(serial: int):
     PacketLogger.SendToClient(CList[Byte](packet))
 
 
+def request_props(serials: List[int], chunk_size: int = 50):
+    """
+    Request the properties of several objects at once, using the batched "mega cliloc" request (0xD6).
+    This does not wait for the response.
+    """
+    for i in range(0, len(serials), chunk_size):
+        chunk = serials[i : i + chunk_size]
+        packet = b"\xd6"  # command
+        packet += (3 + 4 * len(chunk)).to_bytes(2, "big")  # length
+        for serial in chunk:
+            packet += (serial & 0xFFFFFFFF).to_bytes(4, "big")
+        PacketLogger.SendToServer(CList[Byte](packet))
+
+
+ROOT_RESOLVER = RootResolver()
+
+
 def root_dist_to_player(serial) -> Union[int, float]:
     """
     Calculate the distance between the player and the top container of the object with the provided serial.
     """
-    item = Items.FindBySerial(serial)
-    mob = None
-
-    while item is not None and not item.OnGround:
-        serial = item.RootContainer
-        item = Items.FindBySerial(item.RootContainer)
-
-    player = Mobiles.FindBySerial(Player.Serial)
-    assert player is not None, "Player is not found."
-    if item is None:
-        mob = Mobiles.FindBySerial(serial)
-        if mob is None:
-            return int("inf")
-        else:
-            return mob.DistanceTo(player)
-    else:
-        return int(item.DistanceTo(player))
+    return ROOT_RESOLVER.distance_to_player(serial)
 
 
 ################################################################################
@@ -155,6 +159,54 @@ class LootingMemory:
         self.name_checked = False
 
 
+class PropertyPrefetch:
+    """
+    Summarizes a batch of items, requesting the properties of every uncached item at once.
+
+    Iterating over this object yields the summaries as soon as the properties of each item arrive,
+    so that the caller can match them while the rest of the batch is still in flight.
+    All items share a single deadline. The serials of the items whose properties did not arrive in time
+    are collected in `missing` once the iteration ends.
+
+    Attributes:
+        looter (Looter): The looter whose summary cache is used.
+        items (list): The items to be summarized.
+        timeout (int): The shared deadline of the batch, in milliseconds.
+        missing (List[int]): The serials of the items which could not be summarized before the deadline.
+    """
+
+    def __init__(self, looter: "Looter", items: Iterable[Any], timeout: int = 1000, poll_interval: int = 50):
+        self.looter = looter
+        self.items = list(items)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.missing: List[int] = []
+
+    def __iter__(self) -> Iterator[ItemSummary]:
+        self.missing = []
+        pending: Dict[int, Any] = {}
+        for item in self.items:
+            summary = self.looter.summary_cache.get(item.Serial, prop_revision(item))
+            if summary is not None:
+                yield summary
+            elif item.PropsUpdated:
+                yield self.looter._summarize_uncached(item)
+            else:
+                pending[item.Serial] = item
+        if not pending:
+            return
+
+        request_props(list(pending))
+        deadline = time.monotonic() + self.timeout / 1000
+        while True:
+            for serial in [serial for serial, item in pending.items() if item.PropsUpdated]:
+                yield self.looter._summarize_uncached(pending.pop(serial))
+            if not pending or time.monotonic() >= deadline:
+                break
+            Misc.Pause(self.poll_interval)
+        self.missing = list(pending)
+
+
 class Looter:
     """
     A conceptual object representing the "looter" in the game.
@@ -164,24 +216,34 @@ class Looter:
 
     Attributes:
         profile (LootProfile): The loot profile used for looting.
+        matcher (CompiledProfile): The compiled form of the profile, used to test the items.
         setting (dict): The settings for the looter.
         target_cache (dict): A dictionary storing the looter's interaction with the lootable targets.
-        summary_cache (dict): A dictionary storing the summary of the lootable items.
+        summary_cache (LRUCache): A bounded cache storing the summary of the lootable items.
         mode (LootingMode): The current mode of the looter.
         scanner (Callable[[], List[Item]]): A callable function to be used for scanning lootable targets.
+        target_index (TargetIndex): A grid index of the corpses and treasure chests around the player.
+            It can be used as the scanner, in which case nearby targets are looked up without rescanning.
     """
 
     def __init__(self, setting: Dict[str, Any], profile: LootProfile, mode: LootingMode = LootingMode.STOPPED):
         self.profile = profile
+        self.matcher: CompiledProfile = compile_profile(profile)
+        """This stores the compiled profile. Call `recompile` after editing the profile."""
         self.setting = setting
         self.target_cache: Dict[int, LootingMemory] = {}
         """This stores the looter's interaction with the lootable targets."""
-        self.summary_cache: Dict[int, ItemSummary] = {}
-        """This stores the summary of the lootable items."""
+        self.summary_cache: LRUCache[ItemSummary] = LRUCache(
+            max_size=setting.get("summary-cache-size", 10000),
+            ttl=setting.get("summary-cache-ttl", 1800),
+        )
+        """This stores the summary of the lootable items, keyed by their serials."""
         self.mode = mode
         """This stores the current mode of the looter."""
         self.scanner: Optional[Callable] = None
         """This stores the scanner function to be used for scanning lootable targets."""
+        self.target_index = TargetIndex(IDLIST_CHEST)
+        """This stores the grid index of the lootable targets around the player."""
         self.callback: Optional[Callable] = None
         """This stores the callback function to be used for looting."""
 
@@ -189,25 +251,46 @@ class Looter:
         self._stop_event = threading.Event()
         self._stop_event.set()
 
+    def recompile(self):
+        """
+        Compile the profile again. This must be called after the rules of the profile are edited.
+        """
+        self.matcher = compile_profile(self.profile)
+
     def summarize(self, item) -> ItemSummary:
         """
         Summarizes the item and caches it for later use.
 
+        The cached summary is discarded if the properties of the item have changed since it was made.
+
         Arguments:
             item (Item): The item to be summarized.
 
         Returns:
             ItemSummary: The summary of the item.
         """
-        if item.Serial in self.summary_cache:
-            return self.summary_cache[item.Serial]
-        # Clear the cache if it exceeds 10,000 items.
-        if len(self.summary_cache) >= 10000:
-            self.summary_cache.clear()
+        summary = self.summary_cache.get(item.Serial, prop_revision(item))
+        if summary is not None:
+            return summary
+        return self._summarize_uncached(item)
+
+    def _summarize_uncached(self, item) -> ItemSummary:
         summary = ItemSummary(item)
-        self.summary_cache[item.Serial] = summary
+        self.summary_cache.put(item.Serial, summary, prop_revision(item))
         return summary
 
+    def prefetch(self, items: Iterable[Any]) -> PropertyPrefetch:
+        """
+        Summarize a batch of items, e.g., the contents of a container, with a single property request.
+
+        Arguments:
+            items (Iterable[Item]): The items to be summarized.
+
+        Returns:
+            PropertyPrefetch: An iterable over the summaries, in the order the properties arrive.
+        """
+        return PropertyPrefetch(self, items, timeout=self.setting.get("props-timeout", 1000))
+
     def dehighlight_finished(self, target):
         if not target.Serial in self.target_cache:
             return
@@ -251,12 +334,14 @@ class Looter:
     def global_check_lootability(self) -> None:
         self._raw_check_lootability()
         # Display the name of all corpses in the vicinity.
-        for corpse in Items.FindAllByID(0x2006, -1, -1, 8):
+        for corpse in self.target_index.nearby(8):
+            if corpse.ItemID != 0x2006:
+                continue
             if corpse.Serial in self.target_cache:
                 continue
             Items.SingleClick(corpse.Serial)
 
-    def attempt_open(self, target) -> Tuple[bool, List[ItemSummary]]:
+    def attempt_open(self, target) -> Tuple[bool, List[ItemSummary], bool]:
         """
         Attempt to open a lootable target and update the looting memory.
 
@@ -264,23 +349,24 @@ class Looter:
             target (Item): The target to be looted.
 
         Returns:
-            return (Tuple[bool, List[ItemSummary]]):
+            return (Tuple[bool, List[ItemSummary], bool]):
                 A tuple containing a boolean indicating if the target was successfully opened or no retry is needed,
-                and a list of lootable items in the target.
+                a list of lootable items in the target, and a boolean indicating if some items in the target
+                are still waiting for their properties.
         """
         max_attempts = self.setting.get("max-open-attempts", 3)
         cur_mem = self.target_cache.setdefault(target.Serial, LootingMemory())
         # If the target is not lootable or has been finished, return False.
         if cur_mem.finished:
-            return True, []
+            return True, [], False
         if not cur_mem.lootable:
-            return True, []
+            return True, [], False
         if target.ItemID == 0x2006 and not cur_mem.name_checked:
             Items.SingleClick(target.Serial)
             Misc.Pause(500)
             self._raw_check_lootability()
         if not cur_mem.lootable:
-            return True, []
+            return True, [], False
         # If failed to open the target, increment the attempts and check if it should be marked as not lootable.
         cont_opened = target.ContainerOpened
         if not cont_opened:
@@ -291,21 +377,22 @@ class Looter:
             cur_mem.attempts += 1
             if cur_mem.attempts >= max_attempts:
                 cur_mem.lootable = False
-                return True, []
-            return False, []
+                return True, [], False
+            return False, [], False
         # Builds the list of lootable items in the target.
         Misc.Pause(Timer.Remaining("action-delay"))
         target = Items.FindBySerial(target.Serial)
         if target is None:
-            return False, []
+            return False, [], False
         cur_mem.opened = True
-        lootables = [self.summarize(item) for item in target.Contains]
-        lootables = [item for item in lootables if self.profile.test(item)]
-        if len(lootables) == 0:
+        batch = self.prefetch(target.Contains)
+        lootables = [item for item in batch if self.matcher.test(item)]
+        # The target is not finished until every item in it has been summarized.
+        if len(lootables) == 0 and not batch.missing:
             cur_mem.finished = True
             if self.setting.get("mark-after-finished", False):
                 self.dehighlight_finished(target)
-        return True, lootables
+        return True, lootables, bool(batch.missing)
 
     def scan(self) -> List[ItemSummary]:
         """
@@ -327,14 +414,10 @@ class Looter:
         is_greedy = self.setting.get("greedy-looting", False)
         # In the greedy mode, we only scan for the first lootable item.
         if is_greedy:
-            lootables = []
             for target in self.scan_nearby_targets():
-                cur_lootables = [self.summarize(item) for item in target.Contains]
-                cur_lootables = [item for item in cur_lootables if self.profile.test(item)]
-                if len(cur_lootables) > 0:
-                    lootables.extend(cur_lootables)
-            if len(lootables) > 0:
-                return lootables[:1]
+                for item in self.prefetch(target.Contains):
+                    if self.matcher.test(item):
+                        return [item]
 
         # Open all targets near the player.
         needs_scan = True
@@ -344,7 +427,7 @@ class Looter:
                 return []
             needs_scan = False
             for target in self.scan_nearby_targets():
-                success, cur_lootables = self.attempt_open(target)
+                success, cur_lootables, _ = self.attempt_open(target)
                 if not success:
                     needs_scan = True
                 if is_greedy and len(cur_lootables) > 0:
@@ -353,8 +436,7 @@ class Looter:
         # Scan all the lootable items in the targets.
         lootables = []
         for target in self.scan_nearby_targets():
-            lootables.extend([self.summarize(item) for item in target.Contains])
-        lootables = [item for item in lootables if self.profile.test(item)]
+            lootables.extend(item for item in self.prefetch(target.Contains) if self.matcher.test(item))
         return lootables
 
     def loot_single(self, lootables: List[ItemSummary]):
@@ -380,7 +462,7 @@ class Looter:
             # Sort the lootables based on the rule
             item_to_loot = None
             for item in lootables:
-                if rule.test(item):
+                if self.matcher.test_rule(rule, item):
                     # Skip if the item is too heavy for the player
                     # This is only a temporary solution, and should be improved later.
                     if item.weight + Player.Weight > Player.MaxWeight:
@@ -474,6 +556,8 @@ class Looter:
         if self.scanner is None:
             return []
 
+        if self.scanner is self.target_index:
+            return self.target_index.nearby(2)
         target_list = self.scanner()
         target_list = [target for target in target_list if root_dist_to_player(target.Serial) <= 2]
         return target_list
@@ -497,6 +581,7 @@ class Looter:
 
 
 __all__ = [
+    "PropertyPrefetch",
     "LootingMode",
     "LootingMemory",
     "Looter",
@@ -0,0 +1,85 @@
+import hashlib
+import os
+import pickle
+import sys
+from typing import Any, Callable, Iterable
+
+# This allows the RazorEnhanced to correctly identify the path of the current module.
+PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PATH)
+
+
+################################################################################
+# Snapshot Cache
+################################################################################
+
+
+SNAPSHOT_VERSION = 1
+"""Bump this to invalidate all snapshots, e.g., when the format of the cached tables changes."""
+
+
+def _snapshot_path(source_path: str, tag: str) -> str:
+    cache_dir = os.path.join(os.path.dirname(source_path), "__pycache__")
+    filename = os.path.basename(source_path)
+    if tag:
+        filename += f".{tag}"
+    return os.path.join(cache_dir, filename + ".snapshot")
+
+
+def load_snapshot(source_path: str, build: Callable[[str], Any], tag: str = "", depends: Iterable[str] = ()) -> Any:
+    """
+    Build a table from a source file, or load it from a pickled snapshot of a previous build.
+
+    The snapshot is stored in the `__pycache__` directory next to the source file.
+    It is reused as long as the source file has the same modification time and size, or otherwise the same hash,
+    so that the source is only parsed again after it is actually edited.
+    Editing any of the dependencies, e.g., the module defining the classes of a pickled table, also invalidates the snapshot.
+
+    Arguments:
+        source_path (str): The path to the source file.
+        build (Callable[[str], Any]): The function building the table from the text of the source file.
+        tag (str): Distinguishes several tables built from the same source, e.g., by the importing module name.
+        depends (Iterable[str]): The paths to the other files the table depends on.
+
+    Returns:
+        The built table.
+    """
+    snapshot_path = _snapshot_path(source_path, tag)
+    stat = os.stat(source_path)
+    key = (SNAPSHOT_VERSION, stat.st_mtime, stat.st_size)
+    dependency_key = tuple((os.stat(path).st_mtime, os.stat(path).st_size) for path in depends)
+
+    cached = None
+    try:
+        with open(snapshot_path, "rb") as f:
+            cached = pickle.load(f)
+    except Exception:
+        cached = None
+
+    # Fast path: the source file has not been touched since the snapshot was taken.
+    if cached is not None and cached["key"] == key and cached["depends"] == dependency_key:
+        return cached["table"]
+
+    with open(source_path, "rb") as f:
+        source = f.read()
+    digest = hashlib.sha1(source).hexdigest()
+    if cached is not None and cached["key"][0] == SNAPSHOT_VERSION and cached["depends"] == dependency_key and cached["hash"] == digest:
+        table = cached["table"]
+    else:
+        table = build(source.decode("utf-8"))
+
+    try:
+        os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+        temp_path = snapshot_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump({"key": key, "depends": dependency_key, "hash": digest, "table": table}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, snapshot_path)
+    except Exception:
+        # The snapshot is only an optimization. A read-only directory must not break the script.
+        pass
+    return table
+
+
+__all__ = [
+    "load_snapshot",
+]
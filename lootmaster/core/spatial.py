@@ -0,0 +1,221 @@
+from AutoComplete import *
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+# This allows the RazorEnhanced to correctly identify the path of the current module.
+PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PATH)
+
+
+################################################################################
+# Root Container Resolver
+################################################################################
+
+
+class RootResolver:
+    """
+    A memoized resolver of the top-level container of an object.
+
+    The root of each serial is cached together with the container it was resolved through,
+    so a lookup costs a single `FindBySerial` as long as the object stays in the same container,
+    instead of walking the whole container chain.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._cache: Dict[int, Tuple[int, int]] = {}
+
+    def clear(self):
+        self._cache.clear()
+
+    def root(self, serial: int) -> Tuple[int, Any]:
+        """
+        Resolve the top-level container of the object with the provided serial.
+
+        Returns:
+            A tuple of the root serial and the root object (an Item on the ground, a Mobile, or `None` if unknown).
+        """
+        item = Items.FindBySerial(serial)
+        if item is None:
+            return serial, Mobiles.FindBySerial(serial)
+        if item.OnGround:
+            return serial, item
+        cached = self._cache.get(serial)
+        if cached is not None and cached[0] == item.Container:
+            root_serial = cached[1]
+        else:
+            root_serial, _ = self.root(item.Container)
+            if len(self._cache) >= self.max_size:
+                self._cache.clear()
+            self._cache[serial] = (item.Container, root_serial)
+        root = Items.FindBySerial(root_serial)
+        if root is None:
+            root = Mobiles.FindBySerial(root_serial)
+        return root_serial, root
+
+    def distance_to_player(self, serial: int) -> Union[int, float]:
+        """
+        Calculate the distance between the player and the top container of the object with the provided serial.
+        """
+        _, root = self.root(serial)
+        if root is None:
+            return float("inf")
+        pos = root.Position
+        return max(abs(pos.X - Player.Position.X), abs(pos.Y - Player.Position.Y))
+
+
+################################################################################
+# Target Index
+################################################################################
+
+
+CORPSE_ID = 0x2006
+
+
+class TargetIndex:
+    """
+    An incrementally maintained grid index of lootable targets (corpses and treasure chests) on the ground.
+
+    Ground targets never move, so each target is placed in a grid cell once, when it is first seen.
+    A discovery scan is run at most once every `refresh_interval` milliseconds, and only the serials
+    not seen before are processed in Python. Nearby queries then only look at the cells around the player.
+
+    An instance can be used as a looter scanner: calling it returns all the indexed targets.
+
+    Attributes:
+        chest_ids (List[int]): The item IDs of the chests to be indexed, if their names contain "treasure chest".
+        scan_range (int): The range of the discovery scan, in tiles.
+        cell_size (int): The width of a grid cell, in tiles.
+        refresh_interval (int): The minimum interval between two discovery scans, in milliseconds.
+        version (int): A counter incremented whenever a new target is indexed.
+    """
+
+    def __init__(self, chest_ids: List[int], scan_range: int = 24, cell_size: int = 8, refresh_interval: int = 500):
+        self.chest_ids = list(chest_ids)
+        self.scan_range = scan_range
+        self.cell_size = cell_size
+        self.refresh_interval = refresh_interval
+        self.cells: Dict[Tuple[int, int], Set[int]] = {}
+        self.positions: Dict[int, Tuple[int, int]] = {}
+        self.rejected: Set[int] = set()
+        self.version = 0
+        self._map = None
+        self._player_cell = None
+        self._next_refresh = 0.0
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __call__(self) -> List[Any]:
+        self.refresh()
+        return self._resolve(list(self.positions))
+
+    def clear(self):
+        self.cells.clear()
+        self.positions.clear()
+        self.rejected.clear()
+        self._player_cell = None
+        self._next_refresh = 0.0
+
+    def _cell(self, x: int, y: int) -> Tuple[int, int]:
+        return x // self.cell_size, y // self.cell_size
+
+    def add(self, item) -> bool:
+        """
+        Index a target. Returns False if the target is not lootable or already indexed.
+        """
+        if item.Serial in self.positions or item.Serial in self.rejected:
+            return False
+        if item.ItemID != CORPSE_ID:
+            # An empty name means the name has not been received yet, so the chest is checked again later.
+            if not item.Name:
+                return False
+            if "treasure chest" not in item.Name.lower():
+                self.rejected.add(item.Serial)
+                return False
+        pos = (item.Position.X, item.Position.Y)
+        self.positions[item.Serial] = pos
+        self.cells.setdefault(self._cell(*pos), set()).add(item.Serial)
+        self.version += 1
+        return True
+
+    def remove(self, serial: int):
+        pos = self.positions.pop(serial, None)
+        if pos is None:
+            return
+        cell = self._cell(*pos)
+        serials = self.cells.get(cell)
+        if serials is not None:
+            serials.discard(serial)
+            if not serials:
+                del self.cells[cell]
+
+    def refresh(self, force: bool = False):
+        """
+        Run a discovery scan if the refresh interval has passed, and index the targets not seen before.
+        """
+        if Player.Map != self._map:
+            self.clear()
+            self._map = Player.Map
+        now = time.monotonic()
+        if not force and now < self._next_refresh:
+            return
+        self._next_refresh = now + self.refresh_interval / 1000
+
+        # Forget the targets far away, but only when the player moved to another cell.
+        player_cell = self._cell(Player.Position.X, Player.Position.Y)
+        if player_cell != self._player_cell:
+            self._player_cell = player_cell
+            reach = self.scan_range // self.cell_size + 2
+            for cell in list(self.cells):
+                if max(abs(cell[0] - player_cell[0]), abs(cell[1] - player_cell[1])) > reach:
+                    for serial in self.cells.pop(cell):
+                        del self.positions[serial]
+            if len(self.rejected) > 4096:
+                self.rejected.clear()
+
+        for item in Items.FindAllByID([CORPSE_ID] + self.chest_ids, -1, -1, self.scan_range):
+            if item.Serial in self.positions or item.Serial in self.rejected:
+                continue
+            if not item.OnGround:
+                continue
+            self.add(item)
+
+    def nearby(self, radius: int) -> List[Any]:
+        """
+        Return the indexed targets within the radius from the player.
+        Only the grid cells overlapping the radius are examined.
+        """
+        self.refresh()
+        px, py = Player.Position.X, Player.Position.Y
+        cx0, cy0 = self._cell(px - radius, py - radius)
+        cx1, cy1 = self._cell(px + radius, py + radius)
+        serials = []
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for serial in self.cells.get((cx, cy), ()):
+                    x, y = self.positions[serial]
+                    if max(abs(x - px), abs(y - py)) <= radius:
+                        serials.append(serial)
+        return self._resolve(serials)
+
+    def _resolve(self, serials: List[int]) -> List[Any]:
+        """
+        Look up the live objects of the serials, dropping the targets which no longer exist.
+        """
+        result = []
+        for serial in serials:
+            item = Items.FindBySerial(serial)
+            if item is None:
+                self.remove(serial)
+                continue
+            result.append(item)
+        return result
+
+
+__all__ = [
+    "RootResolver",
+    "TargetIndex",
+]
@@ -3,12 +3,15 @@ import os
 import sys
 import re
 import xml.etree.ElementTree as ET
-from typing import Optional, Union, Any, Dict
+from types import SimpleNamespace
+from typing import Optional, Union, Any, Dict, List, Tuple
 
 # This allows the RazorEnhanced to correctly identify the path of the current module.
 PATH = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(PATH)
 
+from snapshot import load_snapshot
+
 
 ################################################################################
 # Property Parser
@@ -45,8 +48,130 @@ def parse_magic_prop_db(xml_data: str) -> dict:
     return properties
 
 
-with open(os.path.join(PATH, "magic_prop_db.xml"), "r") as file:
-    MAGIC_PROPERTY_DATA = parse_magic_prop_db(file.read())
+_MAGIC_PROPERTY_DATA: Optional[Dict[str, Dict[str, Any]]] = None
+
+
+def get_magic_property_data() -> Dict[str, Dict[str, Any]]:
+    """
+    Return the magic property database, which is loaded on the first call.
+    The parsed table is cached in a snapshot, so the XML file is only parsed again after it is edited.
+    """
+    global _MAGIC_PROPERTY_DATA
+    if _MAGIC_PROPERTY_DATA is None:
+        _MAGIC_PROPERTY_DATA = load_snapshot(os.path.join(PATH, "magic_prop_db.xml"), parse_magic_prop_db)
+    return _MAGIC_PROPERTY_DATA
+
+
+TOKEN_CONTENTS = "contents"
+TOKEN_DAMAGE = "damage"
+TOKEN_SPEED = "speed"
+TOKEN_RARITY = "rarity"
+TOKEN_SLAYER = "slayer"
+TOKEN_MAGIC = "magic"
+
+
+class PropertyTokenizer:
+    """
+    A single-pass classifier for the (proper-cased) property lines of an item.
+
+    The fixed-format lines (contents, weapon damage, weapon speed, slayers) are recognized by a single precompiled alternation.
+    The magic properties are indexed by the first word of their names, so that each line is only tested
+    against the few properties sharing its leading word, with patterns compiled once.
+
+    Attributes:
+        index (dict): Maps the first word of each magic property to a list of (name, type, pattern),
+            in the order of the database.
+        single_words (list): The (name, type, pattern) of single-word properties, which may also prefix a longer first word.
+    """
+
+    LINE_PATTERN = re.compile(
+        r"^(?:"
+        r"Contents: (?P<count>\d+)/(?P<maxcount>\d+) Items, (?P<weight>\d+)(?:/(?P<maxweight>\d+))? Stones"
+        r"|Weapon Damage (?P<damage_min>\d+) - (?P<damage_max>\d+)"
+        r"|Weapon Speed (?P<speed>[\d\.]+)s"
+        r"|(?P<slayer>.+) Slayer$"
+        r")"
+    )
+
+    def __init__(self, magic_props: Dict[str, Dict[str, Any]]):
+        self.index: Dict[str, List[Tuple[str, str, Optional[re.Pattern]]]] = {}
+        for name, prop_data in magic_props.items():
+            prop_type = prop_data["type"]
+            pattern = None
+            if prop_type == "percent":
+                pattern = re.compile(r"^" + re.escape(name) + r"\s*:?\s*([+-]?\d+)%$")
+            elif prop_type == "int":
+                pattern = re.compile(r"^" + re.escape(name) + r"\s*:?\s*([+-]?\d+)$")
+            self.index.setdefault(name.split(" ", 1)[0], []).append((name, prop_type, pattern))
+        self.single_words = [entry for entries in self.index.values() for entry in entries if " " not in entry[0]]
+        self.single_word_pattern = re.compile(r"^(?:" + "|".join(re.escape(entry[0]) for entry in self.single_words) + r")")
+
+    def classify(self, prop: str) -> Optional[Tuple[str, Any]]:
+        """
+        Classify a single property line.
+
+        Returns:
+            A tuple of the token kind and its value, or `None` if the line is not recognized:
+            - `TOKEN_CONTENTS`: (count, max count, weight, max weight)
+            - `TOKEN_DAMAGE`: (min damage, max damage)
+            - `TOKEN_SPEED`: the weapon speed in seconds
+            - `TOKEN_RARITY`: the rarity level
+            - `TOKEN_SLAYER`: the slayer type
+            - `TOKEN_MAGIC`: (property name, value)
+        """
+        rarity = RARITY_MAP.get(prop)
+        if rarity is not None:
+            return TOKEN_RARITY, rarity
+
+        res = self.LINE_PATTERN.match(prop)
+        if res is not None:
+            if res.group("count") is not None:
+                maxweight = res.group("maxweight")
+                return TOKEN_CONTENTS, (
+                    int(res.group("count")),
+                    int(res.group("maxcount")),
+                    int(res.group("weight")),
+                    int(maxweight) if maxweight is not None else 400,
+                )
+            if res.group("damage_min") is not None:
+                return TOKEN_DAMAGE, (int(res.group("damage_min")), int(res.group("damage_max")))
+            if res.group("speed") is not None:
+                return TOKEN_SPEED, float(res.group("speed"))
+            return TOKEN_SLAYER, res.group("slayer")
+        if prop == "Silver":
+            return TOKEN_SLAYER, "Undead"
+
+        first_word = prop.split(" ", 1)[0]
+        token = self._classify_magic(prop, self.index.get(first_word.rstrip(":"), ()))
+        if token is None and first_word not in self.index and self.single_word_pattern.match(first_word):
+            token = self._classify_magic(prop, self.single_words)
+        return token
+
+    def _classify_magic(self, prop: str, candidates: List[Tuple[str, str, Optional[re.Pattern]]]) -> Optional[Tuple[str, Any]]:
+        for name, prop_type, pattern in candidates:
+            if not prop.startswith(name):
+                continue
+            if pattern is None:
+                if prop_type == "bool":
+                    return TOKEN_MAGIC, (name, True)
+                continue
+            res = pattern.match(prop)
+            if res is not None:
+                return TOKEN_MAGIC, (name, int(res.group(1)))
+        return None
+
+
+_PROPERTY_TOKENIZER: Optional[PropertyTokenizer] = None
+
+
+def get_property_tokenizer() -> PropertyTokenizer:
+    """
+    Return the shared property tokenizer, which is built on the first call.
+    """
+    global _PROPERTY_TOKENIZER
+    if _PROPERTY_TOKENIZER is None:
+        _PROPERTY_TOKENIZER = PropertyTokenizer(get_magic_property_data())
+    return _PROPERTY_TOKENIZER
 
 
 class ItemSummary:
@@ -75,11 +200,12 @@ class ItemSummary:
         props (list): A list of properties of the item.
 
     Methods:
-        __init__(item: Item):
+        __init__(item: Item, props: Optional[List[str]] = None):
             Initializes the ItemSummary with the given item.
+            If `props` is not provided, the property list is requested from the client.
     """
 
-    def __init__(self, item):
+    def __init__(self, item, props: Optional[List[str]] = None):
         self.serial: int = item.Serial
         self.id: int = item.ItemID
         self.color: int = item.Color
@@ -97,69 +223,59 @@ class ItemSummary:
         self.damage_max = 0
         self.weapon_speed = 0
 
-        Items.WaitForProps(item.Serial, 1000)
-        self.props = Items.GetPropStringList(item.Serial)
+        if props is None:
+            Items.WaitForProps(item.Serial, 1000)
+            props = Items.GetPropStringList(item.Serial)
+        self.props = props
 
+        tokenizer = get_property_tokenizer()
         for prop in self.props:
-            prop = proper_case(prop)
-
-            # find content
-            res = re.search(r"^Contents: (\d+)/(\d+) Items, (\d+)/(\d+) Stones", prop)
-            if res is not None:
-                self.content_count = int(res.group(1))
-                self.content_maxcount = int(res.group(2))
-                self.content_weight = int(res.group(3))
-                self.content_maxweight = int(res.group(4))
-                continue
-            res = re.search(r"^Contents: (\d+)/(\d+) Items, (\d+) Stones", prop)
-            if res is not None:
-                self.content_count = int(res.group(1))
-                self.content_maxcount = int(res.group(2))
-                self.content_weight = int(res.group(3))
-                self.content_maxweight = 400
-                continue
-
-            # find damage min/max
-            res = re.search(r"^Weapon Damage (\d+) - (\d+)", prop)
-            if res is not None:
-                self.damage_min = int(res.group(1))
-                self.damage_max = int(res.group(2))
+            token = tokenizer.classify(proper_case(prop))
+            if token is None:
                 continue
+            kind, value = token
+            if kind == TOKEN_MAGIC:
+                self.magic_props[value[0]] = value[1]
+            elif kind == TOKEN_CONTENTS:
+                self.content_count, self.content_maxcount, self.content_weight, self.content_maxweight = value
+            elif kind == TOKEN_RARITY:
+                self.rarity = value
+            elif kind == TOKEN_SLAYER:
+                self.magic_props["Slayer"] = value
+            elif kind == TOKEN_DAMAGE:
+                self.damage_min, self.damage_max = value
+            elif kind == TOKEN_SPEED:
+                self.weapon_speed = value
 
-            # find weapon speed
-            res = re.search(r"^Weapon Speed ([\d\.]+)s", prop)
-            if res is not None:
-                self.weapon_speed = float(res.group(1))
-                continue
+    def to_dict(self) -> dict:
+        """
+        Convert the summary to a dictionary representation, e.g., to record it as a fixture.
+        """
+        return {
+            "serial": self.serial,
+            "id": self.id,
+            "color": self.color,
+            "amount": self.amount,
+            "name": self.name,
+            "weight": self.weight,
+            "props": list(self.props),
+        }
 
-            # determine rarity
-            if prop in RARITY_MAP:
-                self.rarity = RARITY_MAP[prop]
-                continue
-
-            # determine slayer property
-            res = re.match(r"^(.+) Slayer$", prop)
-            if res is not None:
-                self.magic_props["Slayer"] = res.group(1)
-                continue
-            elif prop == "Silver":
-                self.magic_props["Slayer"] = "Undead"
-                continue
+    @classmethod
+    def load(cls, summary_dict: dict) -> "ItemSummary":
+        """
+        Rebuild a summary from its dictionary representation without querying the client.
+        The properties are parsed again, so the result reflects the current parser.
+        """
+        assert "serial" in summary_dict
+        assert "props" in summary_dict
 
-            # determine magic properties
-            for magic_prop, prop_data in MAGIC_PROPERTY_DATA.items():
-                if not prop.startswith(magic_prop):
-                    continue
-                if prop_data["type"] == "percent":
-                    res = re.search(r"^" + magic_prop + r"\s*:?\s*([+-]?\d+)%$", prop)
-                    if res is not None:
-                        self.magic_props[magic_prop] = int(res.group(1))
-                        break
-                elif prop_data["type"] == "int":
-                    res = re.search(r"^" + magic_prop + r"\s*:?\s*([+-]?\d+)$", prop)
-                    if res is not None:
-                        self.magic_props[magic_prop] = int(res.group(1))
-                        break
-                elif prop_data["type"] == "bool":
-                    self.magic_props[magic_prop] = True
-                    break
+        item = SimpleNamespace(
+            Serial=summary_dict["serial"],
+            ItemID=summary_dict.get("id", 0),
+            Color=summary_dict.get("color", 0),
+            Amount=summary_dict.get("amount", 1),
+            Name=summary_dict.get("name", ""),
+            Weight=summary_dict.get("weight", 0),
+        )
+        return cls(item, props=summary_dict["props"])
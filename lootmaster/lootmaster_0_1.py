@@ -12,6 +12,7 @@ import core.io as io
 from core.match import *
 from core.presets import LootMatchPresets
 from core.looter import Looter, LootingMode
+from core.events import EventLooter
 
 
 ################################################################################
@@ -244,9 +245,12 @@ def main():
     Logger.Info("Setting saved.")
 
     # Initialize the looter
-    LOOTER = Looter(SETTING, PROFILE)
+    if SETTING.get("event-driven", False):
+        LOOTER = EventLooter(SETTING, PROFILE)
+    else:
+        LOOTER = Looter(SETTING, PROFILE)
     LOOTER.callback = refresh_gump_menu
-    LOOTER.scanner = Looter.scanner_basic
+    LOOTER.scanner = LOOTER.target_index
     Timer.Create("session-timeout", 5000)
     LOOTER.start(LootingMode.LOOP)
     Logger.Info("Looter started.")
@@ -281,7 +285,7 @@ def main():
             if LOOTER.is_running:
                 LOOTER.stop()
             # Start the looter in autoloot mode
-            LOOTER.scanner = Looter.scanner_basic
+            LOOTER.scanner = LOOTER.target_index
             LOOTER.start(LootingMode.LOOP)
             Logger.Info("Autoloot mode enabled.")
             continue
@@ -290,6 +294,11 @@ def main():
             if LOOTER.is_running:
                 LOOTER.stop()
                 Logger.Info("Looter has stopped.")
+            stats = LOOTER.summary_cache.stats()
+            Logger.Debug(
+                f"Summary cache: {stats['size']}/{stats['max-size']} entries, {stats['hit-rate']:.0%} hits, "
+                f"{stats['evictions']} evicted, {stats['expirations']} expired, {stats['invalidations']} invalidated"
+            )
             continue
         if response == 1004:
             # Edit profile
@@ -2,9 +2,12 @@ from AutoComplete import *
 from abc import ABC, abstractmethod
 from typing import Any, Iterable, List, Dict, Tuple, Optional, TypeVar, Generic, Union, Generator, Callable
 import xml.etree.ElementTree as ET
+import copy
 import re
 import os
 
+from .snapshot import load_snapshot
+
 
 ################################################################################
 # Utilities
@@ -57,35 +60,169 @@ def to_interval(values: Iterable[int]) -> str:
     return ",".join(ranges)
 
 
+################################################################################
+# Evaluation Context
+
+
+class ItemContext:
+    """
+    A per-item evaluation context shared by all the nodes of a match tree.
+
+    The property strings and the cliloc properties of the item are fetched and indexed once, on first use,
+    and the numbers computed by range matches are memoized, so a deep preset tree costs a single property
+    fetch per item instead of one per leaf. Any other attribute is forwarded to the wrapped item.
+
+    The context is meant to live for a single evaluation. Create a new one if the item may have changed.
+    """
+
+    def __init__(self, item: "Item"):
+        self.item = item
+        self._prop_strings: Optional[List[str]] = None
+        self._clilocs: Optional[Dict[int, List[List[str]]]] = None
+        self._numbers: Dict[int, Optional[int]] = {}
+
+    @classmethod
+    def of(cls, item: Union["Item", "ItemContext"]) -> "ItemContext":
+        """
+        Return the item itself if it is already a context, or wrap it into a new context.
+        """
+        if isinstance(item, ItemContext):
+            return item
+        return cls(item)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.item, name)
+
+    @property
+    def prop_strings(self) -> List[str]:
+        """The property lines of the item, as in `Items.GetPropStringList`."""
+        if self._prop_strings is None:
+            self._prop_strings = list(Items.GetPropStringList(self.item))
+        return self._prop_strings
+
+    @property
+    def clilocs(self) -> Dict[int, List[List[str]]]:
+        """The arguments of the cliloc properties of the item, split by tabs and grouped by the cliloc number."""
+        if self._clilocs is None:
+            self._clilocs = {}
+            for prop in self.item.Properties:
+                args = prop.Args.split("\t") if prop.Args is not None else []
+                self._clilocs.setdefault(prop.Number, []).append(args)
+        return self._clilocs
+
+    def number(self, match: "RangeMatch") -> Optional[int]:
+        """
+        Return the number of a range match for this item, computing it only once.
+        """
+        key = id(match)
+        if key in self._numbers:
+            return self._numbers[key]
+        value = self._numbers[key] = match.get_number(self)
+        return value
+
+
 ################################################################################
 # Match Classes
 
 
-PRESETS: dict[str, "BaseMatch"] = {}
-"""A registry of all loaded presets."""
+class LazyRegistry(dict):
+    """
+    A dictionary which is filled by a loader on the first read access.
 
-PARSER_REGISTRY: Dict[str, "XmlParsable"] = {}
-"""A registry of all match parsers."""
+    This defers the cost of loading the presets from the import of the module to their first use.
+    The loader must fill the registry through the `dict` methods, and is retried on the next access if it raises.
+    """
+
+    def __init__(self, loader: Callable[[], None]):
+        super().__init__()
+        self._loader = loader
+        self._loaded = False
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loader()
+        self._loaded = True
+
+    def __getitem__(self, key):
+        self.ensure_loaded()
+        return super().__getitem__(key)
+
+    def __contains__(self, key) -> bool:
+        self.ensure_loaded()
+        return super().__contains__(key)
+
+    def __iter__(self):
+        self.ensure_loaded()
+        return super().__iter__()
+
+    def __len__(self) -> int:
+        self.ensure_loaded()
+        return super().__len__()
+
+    def get(self, key, default=None):
+        self.ensure_loaded()
+        return super().get(key, default)
+
+    def keys(self):
+        self.ensure_loaded()
+        return super().keys()
+
+    def values(self):
+        self.ensure_loaded()
+        return super().values()
+
+    def items(self):
+        self.ensure_loaded()
+        return super().items()
 
 
 def _load_preset():
     """
-    Load presets from the presets.xml file.
+    Load presets from the presets.xml file, and link them.
+
+    The parsed and linked presets are cached in a snapshot, so the XML file is only parsed again after it is edited.
     """
-    PRESETS.clear()
+    dict.clear(PRESETS)
+    dict.clear(LINKED_PRESETS)
 
     script_dir = os.path.dirname(os.path.abspath(__file__))
     presets_path = os.path.join(script_dir, "presets.xml")
     if not os.path.isfile(presets_path):
         return
 
-    tree = ET.parse(presets_path)
-    root = tree.getroot()
+    # The snapshot pickles the match objects, so it also depends on this module and on the name it was imported as.
+    presets, linked = load_snapshot(presets_path, _parse_presets, tag=__name__, depends=[os.path.abspath(__file__)])
+    dict.update(PRESETS, presets)
+    dict.update(LINKED_PRESETS, linked)
+
+
+def _parse_presets(xml_data: str) -> Tuple[Dict[str, "BaseMatch"], Dict[str, "BaseMatch"]]:
+    """
+    Parse the presets from the XML data and link them. Raises a `LinkError` if any preset is broken.
+
+    Returns:
+        A tuple of the presets as written, and the linked presets.
+    """
+    presets: Dict[str, BaseMatch] = {}
+    root = ET.fromstring(xml_data)
     for e in root:
         name = e.get("name")
         if name is None:
             continue
-        PRESETS[name] = parse_element(e)
+        presets[name] = parse_element(e)
+
+    linker = Linker(presets)
+    for name in presets:
+        linker.link_preset(name)
+    return presets, linker.linked
+
+
+PRESETS: Dict[str, "BaseMatch"] = LazyRegistry(_load_preset)
+"""A registry of all loaded presets. The presets are loaded on first access."""
+
+PARSER_REGISTRY: Dict[str, "XmlParsable"] = {}
+"""A registry of all match parsers."""
 
 
 def parse_element(element: ET.Element) -> "BaseMatch":
@@ -141,7 +278,11 @@ class BaseMatch(ABC, metaclass=XmlParsable):
         self.desc = desc
 
     @abstractmethod
-    def test(self, item: "Item") -> bool:
+    def test(self, item: Union["Item", ItemContext]) -> bool:
+        """
+        Test the item. Composite matches pass an `ItemContext` down to their entries,
+        so that the properties of the item are fetched only once per evaluation.
+        """
         pass
 
     def to_xml(self, e: Optional[ET.Element] = None) -> ET.Element:
@@ -258,15 +399,15 @@ class RangeMatch(BaseMatch):
         self.max_value = max_value
 
     @abstractmethod
-    def get_number(self, item: "Item") -> Optional[int]:
+    def get_number(self, item: ItemContext) -> Optional[int]:
         """
         Get the number to be tested from the item.
         This method should be overridden by subclasses.
         """
         pass
 
-    def test(self, item: "Item") -> bool:
-        value = self.get_number(item)
+    def test(self, item: Union["Item", ItemContext]) -> bool:
+        value = ItemContext.of(item).number(self)
         if value is None:
             return False
         if self.min_value is not None and value < self.min_value:
@@ -298,12 +439,12 @@ class SumMatch(DerivedMatch):
     A match class that sums the results of its entries.
     """
 
-    def get_number(self, item: "Item") -> Optional[int]:
+    def get_number(self, item: ItemContext) -> Optional[int]:
         total = None
         for entry in self.entries:
             if not isinstance(entry, RangeMatch):
                 continue
-            value = entry.get_number(item)
+            value = item.number(entry)
             if value is None:
                 continue
             if total is None:
@@ -317,12 +458,12 @@ class MaxMatch(DerivedMatch):
     A match class that takes the maximum result of its entries.
     """
 
-    def get_number(self, item: "Item") -> Optional[int]:
+    def get_number(self, item: ItemContext) -> Optional[int]:
         maximum = None
         for entry in self.entries:
             if not isinstance(entry, RangeMatch):
                 continue
-            value = entry.get_number(item)
+            value = item.number(entry)
             if value is None:
                 continue
             if maximum is None or value > maximum:
@@ -335,12 +476,12 @@ class MinMatch(DerivedMatch):
     A match class that takes the minimum result of its entries.
     """
 
-    def get_number(self, item: "Item") -> Optional[int]:
+    def get_number(self, item: ItemContext) -> Optional[int]:
         minimum = None
         for entry in self.entries:
             if not isinstance(entry, RangeMatch):
                 continue
-            value = entry.get_number(item)
+            value = item.number(entry)
             if value is None:
                 continue
             if minimum is None or value < minimum:
@@ -451,7 +592,7 @@ class WeightMatch(RangeMatch):
     A match class for item weight.
     """
 
-    def get_number(self, item: "Item"):
+    def get_number(self, item: ItemContext):
         return item.Weight
 
 
@@ -472,8 +613,8 @@ class RarityMatch(RangeMatch):
         "Legendary Artifact": 9,
     }
 
-    def get_number(self, item: "Item"):
-        for prop in Items.GetPropStringList(item):
+    def get_number(self, item: ItemContext):
+        for prop in item.prop_strings:
             if prop in self.RARITY_MAP:
                 rarity = self.RARITY_MAP[prop]
                 return rarity
@@ -502,11 +643,13 @@ class PresetMatch(BaseMatch):
         super().__init__(name=name, desc=desc)
         self.preset = preset
 
-    def test(self, item: "Item"):
-        preset = PRESETS.get(self.preset)
+    def test(self, item: Union["Item", ItemContext]):
+        preset = LINKED_PRESETS.get(self.preset)
+        if preset is None:
+            preset = PRESETS.get(self.preset)
         if preset is None:
             raise ValueError(f"Preset '{self.preset}' not found.")
-        return preset.test(item)
+        return preset.test(ItemContext.of(item))
 
 
 class ClilocMatch(BaseMatch):
@@ -531,8 +674,8 @@ class ClilocMatch(BaseMatch):
         super().__init__(name=name, desc=desc)
         self.cliloc = cliloc
 
-    def test(self, item: "Item"):
-        return any(prop.Number == self.cliloc for prop in item.Properties)
+    def test(self, item: Union["Item", ItemContext]):
+        return self.cliloc in ItemContext.of(item).clilocs
 
 
 class ClilocRangeMatch(RangeMatch):
@@ -564,11 +707,8 @@ class ClilocRangeMatch(RangeMatch):
         self.cliloc = cliloc
         self.index = index
 
-    def get_number(self, item: "Item"):
-        for prop in item.Properties:
-            if prop.Number != self.cliloc:
-                continue
-            args = prop.Args.split("\t")
+    def get_number(self, item: ItemContext):
+        for args in item.clilocs.get(self.cliloc, ()):
             if self.index >= len(args):
                 raise IndexError(f"Index {self.index} out of range for cliloc {self.cliloc} with args: {args}")
             return int(args[self.index])
@@ -662,15 +802,18 @@ class ClilocSkillMatch(RangeMatch):
         RangeMatch.__init__(self, min_value=min_value, max_value=max_value, name=name, desc=desc)
         self.skill_name = skill_name
 
-    def get_number(self, item: "Item"):
-        for prop in item.Properties:
-            if prop.Number not in (1060451, 1060452, 1060453, 1060454, 1060455):
-                continue
-            args = prop.Args.split("\t")
-            if len(args) < 2:
-                continue
-            if self.SKILLNAME_CLILOC_MAP[self.skill_name] == int(args[0].strip("#@")):
-                return int(args[1])
+    SKILL_BONUS_CLILOCS = (1060451, 1060452, 1060453, 1060454, 1060455)
+    """The cliloc numbers of the skill bonus properties, in the order they appear."""
+
+    def get_number(self, item: ItemContext):
+        skill_cliloc = self.SKILLNAME_CLILOC_MAP[self.skill_name]
+        clilocs = item.clilocs
+        for number in self.SKILL_BONUS_CLILOCS:
+            for args in clilocs.get(number, ()):
+                if len(args) < 2:
+                    continue
+                if skill_cliloc == int(args[0].strip("#@")):
+                    return int(args[1])
         return None
 
 
@@ -679,8 +822,8 @@ class PropMatch(PatternMatch):
     A match class for item properties in compiled string format.
     """
 
-    def test(self, item: "Item"):
-        for prop in Items.GetPropStringList(item):
+    def test(self, item: Union["Item", ItemContext]):
+        for prop in ItemContext.of(item).prop_strings:
             if self.pattern.search(prop):
                 return True
         return False
@@ -710,8 +853,8 @@ class PropRangeMatch(RangeMatch, PatternMatch):
         RangeMatch.__init__(self, min_value=min_value, max_value=max_value, name=name, desc=desc)
         PatternMatch.__init__(self, pattern=pattern, name=name, desc=desc)
 
-    def get_number(self, item: "Item"):
-        for prop in Items.GetPropStringList(item):
+    def get_number(self, item: ItemContext):
+        for prop in item.prop_strings:
             match = self.pattern.search(prop)
             if match is None:
                 continue
@@ -723,8 +866,9 @@ class AllMatch(GroupMatch):
     A match class that requires all entries to match.
     """
 
-    def test(self, item: "Item"):
-        return all(entry.test(item) for entry in self.entries)
+    def test(self, item: Union["Item", ItemContext]):
+        ctx = ItemContext.of(item)
+        return all(entry.test(ctx) for entry in self.entries)
 
 
 class AnyMatch(GroupMatch):
@@ -732,8 +876,9 @@ class AnyMatch(GroupMatch):
     A match class that requires any entry to match.
     """
 
-    def test(self, item: "Item"):
-        return any(entry.test(item) for entry in self.entries)
+    def test(self, item: Union["Item", ItemContext]):
+        ctx = ItemContext.of(item)
+        return any(entry.test(ctx) for entry in self.entries)
 
 
 class ExceptMatch(GroupMatch):
@@ -741,14 +886,158 @@ class ExceptMatch(GroupMatch):
     A match class that requires no entries to match.
     """
 
-    def test(self, item: "Item"):
-        return not any(entry.test(item) for entry in self.entries)
+    def test(self, item: Union["Item", ItemContext]):
+        ctx = ItemContext.of(item)
+        return not any(entry.test(ctx) for entry in self.entries)
+
+
+class ConstMatch(BaseMatch):
+    """
+    A match class with a constant result. The linker folds trivially true or false subtrees into it.
+    """
+
+    _XML_ATTRIBUTES: dict[str, Callable] = {
+        "name": str,
+        "desc": str,
+        "value": lambda value: value.strip().lower() == "true",
+    }
+    value: bool
+    """The result of the match."""
+
+    def __init__(
+        self,
+        value: bool,
+        name: Optional[str] = None,
+        desc: Optional[str] = None,
+    ):
+        super().__init__(name=name, desc=desc)
+        self.value = value
+
+    def test(self, item: Union["Item", ItemContext]):
+        return self.value
+
+
+################################################################################
+# Linking
 
 
-_load_preset()
+LINKED_PRESETS: Dict[str, BaseMatch] = LazyRegistry(PRESETS.ensure_loaded)
+"""The presets after linking. Preset references are inlined and trivial subtrees are folded."""
+
+
+class LinkError(ValueError):
+    """
+    Raised when a match tree references a missing preset, or a preset which (indirectly) references itself.
+    """
+
+
+class Linker:
+    """
+    Resolves the preset references of match trees and simplifies them.
+
+    Linking returns a new tree and leaves the source tree untouched, so that it can still be serialized as written.
+    1. Every `PresetMatch` is replaced by the linked tree of the preset it refers to.
+       Missing presets and reference cycles raise a `LinkError`.
+    2. Nested `AllMatch` and `AnyMatch` entries are flattened into their parent of the same type.
+    3. Trivially true or false subtrees (e.g., an empty `AnyMatch`) are folded into a `ConstMatch`.
+
+    The entries of `SumMatch`, `MaxMatch` and `MinMatch` which are not range matches are ignored by the aggregation,
+    so they are only linked to check them, and kept as written.
+    """
+
+    def __init__(self, presets: Dict[str, BaseMatch]):
+        self.presets = presets
+        self.linked: Dict[str, BaseMatch] = {}
+        self._stack: List[str] = []
+
+    def link_preset(self, preset: str) -> BaseMatch:
+        linked = self.linked.get(preset)
+        if linked is not None:
+            return linked
+        if preset in self._stack:
+            cycle = " -> ".join(self._stack[self._stack.index(preset) :] + [preset])
+            raise LinkError(f"Preset reference cycle: {cycle}")
+        match = self.presets.get(preset)
+        if match is None:
+            via = f" (referenced by '{self._stack[-1]}')" if self._stack else ""
+            raise LinkError(f"Preset '{preset}' not found{via}.")
+        self._stack.append(preset)
+        try:
+            linked = self.linked[preset] = self.link(match)
+        finally:
+            self._stack.pop()
+        return linked
+
+    def link(self, match: BaseMatch) -> BaseMatch:
+        if isinstance(match, PresetMatch):
+            return self.link_preset(match.preset)
+        if not isinstance(match, GroupMatch):
+            return match
+
+        entries = [self.link(entry) for entry in match.entries]
+        kind = type(match)
+        if kind is AllMatch:
+            return self._fold(match, entries, AllMatch, absorbing=False)
+        if kind is AnyMatch:
+            return self._fold(match, entries, AnyMatch, absorbing=True)
+        if kind is ExceptMatch:
+            folded = self._fold(match, entries, AnyMatch, absorbing=True)
+            if isinstance(folded, ConstMatch):
+                return ConstMatch(not folded.value, name=match.name, desc=match.desc)
+            linked = copy.copy(match)
+            linked.entries = folded.entries if type(folded) is AnyMatch else [folded]
+            return linked
+        linked = copy.copy(match)
+        if isinstance(match, DerivedMatch):
+            # Only the range entries are aggregated, so the other entries are kept as written, even if they link into a range match.
+            linked.entries = [linked_entry if isinstance(entry, RangeMatch) else entry for entry, linked_entry in zip(match.entries, entries)]
+        else:
+            linked.entries = entries
+        return linked
+
+    def _fold(self, match: GroupMatch, entries: List[BaseMatch], kind: type, absorbing: bool) -> BaseMatch:
+        """
+        Flatten and fold the entries of a conjunction (`absorbing=False`) or a disjunction (`absorbing=True`).
+        """
+        flat: List[BaseMatch] = []
+        for entry in entries:
+            if type(entry) is kind:
+                flat.extend(entry.entries)
+            elif isinstance(entry, ConstMatch):
+                # A true entry decides a disjunction, a false entry decides a conjunction.
+                if entry.value == absorbing:
+                    return ConstMatch(absorbing, name=match.name, desc=match.desc)
+            else:
+                flat.append(entry)
+        if not flat:
+            return ConstMatch(not absorbing, name=match.name, desc=match.desc)
+        if len(flat) == 1 and type(match) is kind:
+            return flat[0]
+        linked = kind(entries=flat, name=match.name, desc=match.desc)
+        return linked
+
+
+def link(match: BaseMatch) -> BaseMatch:
+    """
+    Link a match tree against the loaded presets. See `Linker`.
+    """
+    return Linker(PRESETS).link(match)
+
+
+def parse_and_link(element: ET.Element) -> BaseMatch:
+    """
+    Parse an XML element into a match object and link it, so that configuration errors surface at load time.
+    """
+    return link(parse_element(element))
+
 
 __export__ = [
     "parse_element",
+    "parse_and_link",
+    "link",
+    "Linker",
+    "LinkError",
+    "ItemContext",
     "BaseMatch",
     "GroupMatch",
     "PatternMatch",
@@ -769,4 +1058,5 @@ __export__ = [
     "AllMatch",
     "AnyMatch",
     "ExceptMatch",
+    "ConstMatch",
 ]
@@ -0,0 +1,35 @@
+import os
+import sys
+import xml.etree.ElementTree as ET
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import modules.match as match
+
+
+# The aggregations only count their range entries, so a range wrapped in a group must stay ignored after linking.
+CASES = [
+    "<SumMatch min_value='10'><WeightMatch /><AllMatch><WeightMatch /></AllMatch></SumMatch>",
+    "<MaxMatch min_value='10'><AnyMatch><WeightMatch /></AnyMatch></MaxMatch>",
+    "<MinMatch max_value='5'><WeightMatch /><AllMatch><AnyMatch><WeightMatch /></AnyMatch></AllMatch></MinMatch>",
+    "<AllMatch><SumMatch min_value='10'><WeightMatch /><AnyMatch><WeightMatch /></AnyMatch></SumMatch></AllMatch>",
+]
+
+
+def test_link_equivalence() -> bool:
+    ok = True
+    for case in CASES:
+        parsed = match.parse_element(ET.fromstring(case))
+        linked = match.parse_and_link(ET.fromstring(case))
+        for weight in range(0, 21):
+            item = SimpleNamespace(Weight=weight)
+            expected = parsed.test(match.ItemContext(item))
+            actual = linked.test(match.ItemContext(item))
+            if expected != actual:
+                print(f"Mismatch for weight {weight}: {case} (parsed: {expected}, linked: {actual})")
+                ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    print("OK" if test_link_equivalence() else "FAILED")
@@ -2,10 +2,17 @@
 # Settings
 ################################################################################
 
-VERSION = "2.1.3"
+VERSION = "2.2.0"
 EXPORT_PATH = "Data/Sheets"
 SETTING_PATH = "Data/Sheets/setting.json"
 
+# The house search indexes every locked down container within this range, including the nested ones
+HOUSE_RANGE = 18
+# The delay between opening two containers, in milliseconds
+OPEN_DELAY = 600
+# The number of item property requests in flight at the same time
+FETCH_WORKERS = 4
+
 ################################################################################
 # Imports
 ################################################################################
@@ -27,7 +34,7 @@ from modules import *
 
 
 from AutoComplete import *
-from typing import List, Dict, Set, Tuple, Any, Optional, Iterable
+from typing import List, Dict, Set, Tuple, Any, Optional, Iterable, Callable
 import time
 import csv
 import re
@@ -61,13 +68,21 @@ class ExplorerSheetView:
     def close(cls):
         Gumps.CloseGump(cls.MAIN_GUMP_ID)
 
+    _loading: Optional[Tuple[CraftingGumpBuilder, Any, Any]] = None
+
     @classmethod
     def show_loading(cls, progress: float = 0.0):
-        gb = CraftingGumpBuilder(id=cls.MAIN_GUMP_ID)
-        with gb.MainFrame():
-            with gb.ShadedColumn():
-                gb.Html(f"Loading... ({progress:.1%})", width=200, centered=True, color="#FFFFFF")
-                gb.ProgressBar(width=200, height=22, progress=progress)
+        # The loading gump is built once, and only its label and bar are updated afterwards
+        if cls._loading is None:
+            gb = CraftingGumpBuilder(id=cls.MAIN_GUMP_ID)
+            with gb.MainFrame():
+                with gb.ShadedColumn():
+                    label = gb.Html("", width=200, centered=True, color="#FFFFFF")
+                    bar = gb.ProgressBar(width=200, height=22)
+            cls._loading = (gb, label, bar)
+        gb, label, bar = cls._loading
+        label.text = f"Loading... ({progress:.1%})"
+        bar.progress = max(0.0, min(1.0, progress))
         gb.launch()
 
     def _build_menubar(self, gb: CraftingGumpBuilder):
@@ -90,7 +105,7 @@ class ExplorerSheetView:
             # Navigation buttons
             with gb.Row(background="tiled:9354", width=80, height=self.HEADER_HEIGHT):
                 self.menu_prev = gb.MenuItem("", style="single_left")
-                gb.Html(f"{self.page+1}/{self.total_pages}", centered=True, width=50, height=18)
+                self.page_label = gb.Html(f"{self.page+1}/{self.total_pages}", centered=True, width=50, height=18)
                 self.menu_next = gb.MenuItem("", style="single_right")
             # Column headers
             self.menu_edit_column = []
@@ -121,31 +136,63 @@ class ExplorerSheetView:
                 self.menu_new_column = gb.BlueJewelButton(tooltip="Add Column")
 
     def _build_rows(self, gb: CraftingGumpBuilder):
+        self.row_slots = []
+        for i in range(self.ITEMS_PER_PAGE):
+            with gb.Row(background="tiled:2624; alpha", height=60, spacing=1) as slot:
+                self.row_slots.append(slot)
+        self._fill_rows(gb)
+
+    def _read_cell(self, row: ItemPropRow, col: SheetColumn) -> Tuple[str, int]:
+        hue = 1152
+        if col.id == "Rarity":
+            rarity = row["Rarity"]
+            hue = self.RARITY_COLOR_MAP.get(rarity, 1152)
+        return col.read(row) or "", hue
+
+    def _fill_rows(self, gb: CraftingGumpBuilder):
         is_batch_mode = self.mode == self.Mode.BATCH
         self.menu_item_action = []
-        for i in range(self.ITEMS_PER_PAGE):
+        current = gb.current
+        for i, slot in enumerate(self.row_slots):
             row_idx = self.page * self.ITEMS_PER_PAGE + i
-            with gb.Row(background="tiled:2624; alpha", height=60, spacing=1):
-                if row_idx >= len(self.sheet.rows):
-                    continue
-                row = self.sheet.rows[row_idx]
+            if row_idx >= len(self.sheet.rows):
+                slot.clear_children()
+                continue
+            row = self.sheet.rows[row_idx]
+            checked = is_batch_mode and (row["Serial"] in self.row_selected)
+            if not slot.children:
+                gb.current = slot
                 # Item button
-                self.menu_item_action.append(
-                    gb.ItemDisplayButton(
-                        row["Serial"],
-                        checked=is_batch_mode and (row["Serial"] in self.row_selected),
-                    ).on_click(row)
-                )
+                btn = gb.ItemDisplayButton(row["Serial"], checked=checked)
                 # Write the content of the row
                 for j, col in enumerate(self.sheet.columns):
                     width = col.metadata.get("width", self.COL_WIDTH)
-                    hue = 1152
-                    if col.id == "Rarity":
-                        rarity = row["Rarity"]
-                        hue = self.RARITY_COLOR_MAP.get(rarity, 1152)
-                    value = col.read(row) or ""
+                    value, hue = self._read_cell(row, col)
                     with gb.Row(width=width, padding=(10, 0, 0, 0)):
                         gb.Text(value, hue=hue, width=width - 10, tooltip=f"{col.name}: {value}", cropped=True)
+            else:
+                # Rewrite the row in place, which keeps its layout
+                btn = slot.children[0]
+                item = Items.FindBySerial(row["Serial"])
+                if item is None:
+                    btn.tileart = None
+                    btn.itemproperty = None
+                elif btn.tileart is None:
+                    btn.add_tileart(graphics=item.ItemID, hue=item.Hue)
+                    btn.itemproperty = item.Serial
+                else:
+                    btn.tileart.graphics = item.ItemID
+                    btn.tileart.hue = item.Hue
+                    btn.itemproperty = item.Serial
+                btn.checked = checked
+                for j, col in enumerate(self.sheet.columns):
+                    value, hue = self._read_cell(row, col)
+                    text = slot.children[j + 1].children[0]
+                    text.text = value
+                    text.hue = hue
+                    text.tooltip = f"{col.name}: {value}"
+            self.menu_item_action.append(btn.on_click(row))
+        gb.current = current
 
     def _build_extra_frame(self, gb: CraftingGumpBuilder):
         self.menu_extra_select_all = None
@@ -184,6 +231,29 @@ class ExplorerSheetView:
 
         self.gb = gb
 
+    def shows(self, sheet: Sheet, mode: Mode) -> bool:
+        """
+        Check if this view was built for the sheet in the mode, so that it can be updated in place.
+        """
+        return self.sheet is sheet and self.mode == mode
+
+    def update(self, page: int, row_selected: Set[int]):
+        """
+        Update the page and the selection in place. The rows of a new page are rewritten into the same blocks,
+        so only the changed blocks are compiled again by the next launch.
+
+        :param page: The page to show.
+        :param row_selected: The serials of the selected rows.
+        """
+        self.row_selected = row_selected
+        if page != self.page:
+            self.page = page
+            self.page_label.text = f"{self.page+1}/{self.total_pages}"
+            self._fill_rows(self.gb)
+        if self.mode == self.Mode.BATCH:
+            for btn in self.menu_item_action:
+                btn.checked = btn.click_handler["Serial"] in self.row_selected
+
 
 class BatchMoveManager:
     class ItemNotFound(Exception):
@@ -273,6 +343,7 @@ class BatchMoveManager:
         if cont_serial == -1:
             return
         num_items = len(list(selected))
+        executor = MoveQueue()
         for i, serial in enumerate(selected):
             item = Items.FindBySerial(serial)
             if item is None:
@@ -304,16 +375,24 @@ class BatchMoveManager:
                 break
             if cont_res is None:
                 continue
-            if cont_res.contents >= cont_res.max_contents:
+            # The moves still in flight are not reflected in the properties yet.
+            if cont_res.contents + len(executor) >= cont_res.max_contents:
                 Misc.SendMessage(f"[{i + 1}/{num_items}] Cannot move '{item.Name}': The destination is full.", 0x21)
                 break
             if cont_res.weight + item.Weight > cont_res.max_weight:
                 Misc.SendMessage(f"[{i + 1}/{num_items}] Cannot move '{item.Name}': The destination will be overweight if this item is moved.", 0x21)
                 continue
 
-            Items.Move(item.Serial, cont_serial, -1)
             Misc.SendMessage(f"[{i + 1}/{num_items}] Attempting to move '{item.Name}'.", 68)
-            Misc.Pause(1000)
+            executor.submit(MoveJob(item.Serial, cont_serial, on_done=cls.on_move_done))
+
+        executor.drain()
+        Misc.SendMessage(executor.report(), 68)
+
+    @staticmethod
+    def on_move_done(job: MoveJob):
+        if job.status == MoveJob.FAILED:
+            Misc.SendMessage(f"Failed to move {hex(job.serial)} after {job.attempts} attempts.", 0x21)
 
 
 class Explorer:
@@ -1033,66 +1112,164 @@ class Explorer:
                 continue
 
     @staticmethod
-    def load_contents(serial: int, sheet_header: Sheet, show_loading: bool = True) -> Optional[Sheet]:
+    def load_contents(serials: List[int], sheet_header: Sheet, show_loading: bool = True, recursive: bool = False) -> Optional[Sheet]:
         """
-        Load the contents of a container into a sheet.
+        Load the contents of containers into a sheet.
 
-        :param serial: The serial of the container to load.
+        :param serials: The serials of the containers to load.
         :param sheet_header: The header of the sheet to use.
         :param show_loading: Whether to show the loading screen.
+        :param recursive: Whether to also load the contents of the nested containers.
         :return: The loaded sheet, or None if failed.
         """
-        # Open the container
+        # Create an unfiltered sheet using the provided header, and fill it with the containers' contents
+        sheet = Sheet(name=sheet_header.name)
+        sheet.columns = sheet_header.columns
+        if Explorer.refresh_contents(serials, sheet, show_loading, recursive) is None:
+            return None
+        return sheet
+
+    @staticmethod
+    def open_container(serial: int, paced: bool = False) -> Optional["Item"]:
+        """
+        Open a container and wait for its contents.
+
+        :param serial: The serial of the container to open.
+        :param paced: Whether to wait before opening, so that consecutive opens respect the action delay.
+        :return: The container, or None if not found.
+        """
         cont = Items.FindBySerial(serial)
         if cont is None:
             return None
+        if paced:
+            Misc.Pause(OPEN_DELAY)
         if cont.ItemID in (0x9F1C, 0x9F1D):
             Items.UseItem(cont)
             Misc.Pause(500)
         else:
             Items.WaitForContents(serial, 1000)
+        return Items.FindBySerial(serial)
 
-        # Create an unfiltered sheet using the provided header and the container's contents
-        sheet = Sheet(name=sheet_header.name)
-        sheet.columns = sheet_header.columns
+    @staticmethod
+    def collect_contents(serials: List[int], recursive: bool = False, on_progress: Optional[Callable[[float], None]] = None) -> Optional[List[int]]:
+        """
+        Open the containers and collect the serials of the items in them.
+
+        :param serials: The serials of the containers to open.
+        :param recursive: Whether to also open the nested containers and collect their contents.
+        :param on_progress: Called with the fraction of the containers opened so far.
+        :return: The serials of the items, or None if no container could be opened.
+        """
+        queue = list(serials)
+        visited: Set[int] = set()
+        contents: List[int] = []
+        opened = 0
+        while queue:
+            serial = queue.pop(0)
+            if serial in visited:
+                continue
+            visited.add(serial)
+            if on_progress is not None:
+                on_progress(len(visited) / (len(visited) + len(queue)))
+            cont = Explorer.open_container(serial, paced=opened > 0)
+            if cont is None:
+                continue
+            opened += 1
+            for item in cont.Contains:
+                contents.append(item.Serial)
+                if recursive and item.IsContainer:
+                    queue.append(item.Serial)
+        if opened == 0:
+            return None
+        return contents
+
+    @staticmethod
+    def find_house_containers() -> List[int]:
+        """
+        Find the locked down containers around the player, e.g., the storage chests of the house.
+        """
+        filter = Items.Filter()
+        filter.Enabled = True
+        filter.OnGround = 1
+        filter.IsContainer = 1
+        filter.IsCorpse = 0
+        filter.Movable = 0
+        filter.RangeMax = HOUSE_RANGE
+        return [cont.Serial for cont in Items.ApplyFilter(filter)]
+
+    @staticmethod
+    def refresh_contents(serials: List[int], sheet: Sheet, show_loading: bool = True, recursive: bool = False) -> Optional[SheetDelta]:
+        """
+        Bring a sheet up to date with the contents of containers.
+
+        Only the properties of the items which are new or whose data changed are requested again,
+        by several requests in flight at the same time.
+
+        :param serials: The serials of the containers to load.
+        :param sheet: The sheet to update.
+        :param show_loading: Whether to show the loading screen.
+        :param recursive: Whether to also load the contents of the nested containers.
+        :return: The changes made to the sheet, or None if failed.
+        """
 
         # Show the loading screen
-        for row in cont.Contains:
+        def on_progress(progress: float):
             if show_loading and not Timer.Check("update-loading"):
-                progress = len(sheet.rows) / max(1, len(cont.Contains))
                 ExplorerSheetView.show_loading(progress=progress)
                 Timer.Create("update-loading", 250)
-            sheet.add_row_by_serial(row.Serial)
 
+        # Open the containers, and then request the properties of the items in all of them at once
+        contents = Explorer.collect_contents(serials, recursive, on_progress if recursive else None)
+        if contents is None:
+            ExplorerSheetView.close()
+            return None
+        delta = sheet.refresh(contents, on_progress, FETCH_WORKERS)
+        ITEM_CACHE.flush()
         ExplorerSheetView.close()
-        return sheet
+        return delta
 
     @staticmethod
-    def explorer(serial: int, sheet_header: Sheet, setting: Dict[str, Any]) -> Optional[Sheet]:
+    def explorer(serials: List[int], sheet_header: Sheet, setting: Dict[str, Any], recursive: bool = False) -> Optional[Sheet]:
         """
         The main loop of the explorer.
 
-        :param serial: The serial of the container to explore.
+        :param serials: The serials of the containers to explore, whose contents are shown in a single sheet.
         :param sheet_header: The header of the sheet to use.
         :param setting: The current setting to save changes to.
+        :param recursive: Whether to also show the contents of the nested containers.
         """
         sheet: Optional[Sheet] = None
         sorted_sheet: Optional[Sheet] = None
+        stale: bool = False
         col_precedence: List[Optional[int]] = []
         col_sorted: List[SheetColumn] = []
+        col_applied: List[SheetColumn] = []
         row_selected: Set[int] = set()
         page: int = 0
         mode: ExplorerSheetView.Mode = ExplorerSheetView.Mode.NORMAL
+        esv: Optional[ExplorerSheetView] = None
         while True:
             # Load the sheet if not already loaded
             if sheet is None:
-                sheet = Explorer.load_contents(serial, sheet_header)
+                sheet = Explorer.load_contents(serials, sheet_header, recursive=recursive)
                 sorted_sheet = None
                 if sheet is None:
                     Misc.SendMessage("Failed to load the container.", 0x21)
                     return None
                 row_selected &= set(row["Serial"] for row in sheet.rows)
 
+            # Update the sheet in place, and patch the sorted sheet with the changes
+            if stale:
+                stale = False
+                delta = Explorer.refresh_contents(serials, sheet, recursive=recursive)
+                if delta is None:
+                    Misc.SendMessage("Failed to load the container.", 0x21)
+                    return None
+                if delta and sorted_sheet is not None:
+                    sorted_sheet = sheet.patch_view(sorted_sheet, col_applied, delta)
+                row_selected &= set(row["Serial"] for row in sheet.rows)
+                esv = None
+
             # Check if the sheet is empty
             if len(sheet.rows) == 0:
                 Misc.SendMessage("Either the container is empty or the items have not been loaded yet.", 0x3B2)
@@ -1100,17 +1277,18 @@ class Explorer:
 
             # Sort the sheet if not already sorted
             if sorted_sheet is None:
-                sorted_sheet = sheet
                 # Sort the columns according to the update time
                 idxcol_sorted = sorted(enumerate(sheet.columns), key=lambda c: c[1].metadata.get("update_time", 0))
                 col_sorted = list(map(lambda c: c[1], idxcol_sorted))
                 # Calculate column precedence and sort the sheet
                 col_precedence: List[Optional[int]] = [None] * len(idxcol_sorted)
+                col_applied = []
                 for i, idxcol in enumerate(idxcol_sorted):
                     idx, col = idxcol
                     if "update_time" in col.metadata:
                         col_precedence[idx] = len(idxcol_sorted) - i
-                        sorted_sheet = col.apply_filter(sorted_sheet)
+                        col_applied.append(col)
+                sorted_sheet = sheet.view(col_applied)
 
             # Ensure the current page is within bounds
             last_page = (len(sorted_sheet.rows) - 1) // ExplorerSheetView.ITEMS_PER_PAGE
@@ -1119,17 +1297,22 @@ class Explorer:
             if page < 0:
                 page = 0
 
-            esv = ExplorerSheetView(sorted_sheet, page, mode, col_precedence, row_selected)
+            # Keep the view across page flips and selections, so that only the changed blocks are compiled again
+            if esv is None or not esv.shows(sorted_sheet, mode):
+                esv = ExplorerSheetView(sorted_sheet, page, mode, col_precedence, row_selected)
+            else:
+                esv.update(page, row_selected)
 
             block, response = esv.gb.launch().wait_response().unpack()
             if block == esv.menu_refresh:
                 # Reload the contents
-                sheet = None
+                stale = True
                 continue
             if block == esv.menu_export:
                 # Rename or export the sheet
                 Explorer.rename_save(sorted_sheet)
                 sheet_header.name = sorted_sheet.name
+                esv = None
                 continue
             if block == esv.menu_columns:
                 # Manage column configurations
@@ -1160,7 +1343,7 @@ class Explorer:
                         row_selected.add(row["Serial"])
                 elif mode == ExplorerSheetView.Mode.NORMAL:
                     Explorer.item_action(row)
-                    sheet = None
+                    stale = True
                 continue
             if block in esv.menu_edit_column:
                 # Edit the selected column
@@ -1214,7 +1397,7 @@ class Explorer:
                 Explorer.batch_move_to(row_selected)
                 # mode = ExplorerSheetView.Mode.NORMAL
                 # row_selected = set()
-                sheet = None
+                stale = True
                 continue
             return None
 
@@ -1227,7 +1410,8 @@ class Explorer:
         gb = CraftingGumpBuilder(id="SheetShortcutGump")
         with gb.MinimalFrame():
             gb.Html("Item Explorer", centered=True, color="#FFFFFF", width=125)
-            gb.UOStoreButton("Inspect", tooltip="Inspect the target container's contents.").on_click(True)
+            gb.UOStoreButton("Inspect", tooltip="Inspect the target container's contents.").on_click("inspect")
+            gb.UOStoreButton("Search House", tooltip="Inspect the contents of every locked down container nearby, including the nested containers.").on_click("house")
 
         _, response = gb.launch().wait_response().unpack()
         return response
@@ -1239,6 +1423,10 @@ class Explorer:
 
 
 if Player.Connected:
+    # Load the cached item properties, shared with the other scripts
+    ITEM_CACHE.load()
+    PropMaster.CACHE = ITEM_CACHE
+
     # Load the saved setting if any, and add the columns to the sheet header
     setting = Explorer.import_setting() or {}
     if setting is not None and "columns" in setting:
@@ -1255,12 +1443,31 @@ if Player.Connected:
         if not response:
             continue
 
-        # If the user wants to inspect a container, prompt for it
-        serial = Target.PromptTarget("Select the container to inspect.", 1153)
-        if serial == 0:
-            continue
+        session_header = sheet_header
+        session_col = None
+        if response == "house":
+            # Search every container of the house at once
+            serials = Explorer.find_house_containers()
+            if not serials:
+                Misc.SendMessage("No locked down containers found nearby.", 0x21)
+                continue
+            if not sheet_header.has_column("Container"):
+                # Show the containers in this session only, without adding the column to the saved header
+                session_header = Sheet()
+                session_header.columns = list(sheet_header.columns)
+                session_col = session_header.add_column_by_id("Container")
+        else:
+            # If the user wants to inspect a container, prompt for it
+            serial = Target.PromptTarget("Select the container to inspect.", 1153)
+            if serial == 0:
+                continue
+            serials = [serial]
 
         # Start the exploration loop
-        sheet_header.name = f"Untitled_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        Explorer.explorer(serial, sheet_header, setting)
+        session_header.name = f"Untitled_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        Explorer.explorer(serials, session_header, setting, recursive=response == "house")
+        if session_header is not sheet_header:
+            # Keep the column changes made in the session, except for the session column
+            sheet_header.name = session_header.name
+            sheet_header.columns = [col for col in session_header.columns if col is not session_col]
         Explorer.export_setting(sheet_header, setting)
@@ -1,10 +1,11 @@
 from AutoComplete import *
 from typing import Iterable, List, Dict, Set, Tuple, Callable, Generator, Any, Optional, Union, TypeVar, Generic
 import re
+import threading
 from enum import Enum
 
 
-VERSION_CORE = "1.0.0"
+VERSION_CORE = "1.1.0"
 """The version of the magic item explorer core module."""
 
 
@@ -25,6 +26,8 @@ class ItemPropRow:
     def __init__(self):
         self.properties: Dict[str, Any] = {}
         self.raw_props: List[str] = []
+        self.signature: Optional[int] = None
+        """This stores the signature of the item data the row was parsed from, see `PropMaster.signature`."""
 
     def __getitem__(self, key: str) -> Any:
         return self.properties.get(key, None)
@@ -146,111 +149,21 @@ class ComparableProp(BaseProp[CT]):
     This represents a property with values of comparable types.
 
     The generic type `CT` must be bound to a comparable type, implementing `SupportsDunderLT` protocol.
+    The rows without a value are placed last, whether sorted in ascending or descending order.
     """
 
-    class _ValueWrapperNoneIsInf:
-        """
-        A wrapper for comparable values.
-
-        This ensures that `None` is comparable and treated as the lowest value.
-        """
-
-        def __init__(self, value: Optional[CT] = None):
-            self.value = value
-
-        def __str__(self) -> str:
-            return str(self.value)
-
-        def __eq__(self, other: Any) -> bool:
-            if not isinstance(other, self.__class__):
-                return NotImplemented
-            return self.value == other.value
-
-        def __lt__(self, other: Any) -> bool:
-            if not isinstance(other, self.__class__):
-                return NotImplemented
-            a, b = self.value, other.value
-            if a is None and b is None:
-                return False
-            elif a is None:
-                return True
-            elif b is None:
-                return False
-            else:
-                return a.__lt__(b)  # type: ignore
-
-        def __gt__(self, other: Any) -> bool:
-            if not isinstance(other, self.__class__):
-                return NotImplemented
-            a, b = self.value, other.value
-            if a is None and b is None:
-                return False
-            elif a is None:
-                return False
-            elif b is None:
-                return True
-            else:
-                return b.__lt__(a)  # type: ignore
-
-    class _ValueWrapperNoneIsSup:
-        """
-        A wrapper for comparable values.
-
-        This ensures that `None` is comparable and treated as the highest value.
-        """
-
-        def __init__(self, value: Optional[CT] = None):
-            self.value = value
-
-        def __str__(self) -> str:
-            return str(self.value)
-
-        def __eq__(self, other: Any) -> bool:
-            if not isinstance(other, self.__class__):
-                return NotImplemented
-            return self.value == other.value
-
-        def __lt__(self, other: Any) -> bool:
-            if not isinstance(other, self.__class__):
-                return NotImplemented
-            a, b = self.value, other.value
-            if a is None and b is None:
-                return False
-            elif a is None:
-                return False
-            elif b is None:
-                return True
-            else:
-                return a.__lt__(b)  # type: ignore
-
-        def __gt__(self, other: Any) -> bool:
-            if not isinstance(other, self.__class__):
-                return NotImplemented
-            a, b = self.value, other.value
-            if a is None and b is None:
-                return False
-            elif a is None:
-                return True
-            elif b is None:
-                return False
-            else:
-                return b.__lt__(a)  # type: ignore
-
     def __init__(self, name: str, id: str):
         super().__init__(name, id)
         self.default_order = SortOrder.DESCENDING
 
-    def key_none_is_inf(self, row: ItemPropRow) -> Any:
-        return self._ValueWrapperNoneIsInf(self.key(row))
-
-    def key_none_is_sup(self, row: ItemPropRow) -> Any:
-        return self._ValueWrapperNoneIsSup(self.key(row))
-
     def sort(self, sheet: ItemPropSheet, reverse: bool = False) -> ItemPropSheet:
-        if reverse:
-            return sorted(sheet, key=self.key_none_is_inf, reverse=True)
-        else:
-            return sorted(sheet, key=self.key_none_is_sup)
+        """
+        Sorts the rows by their values, placing the rows without a value last in either order.
+        """
+        keys = [self.key(row) for row in sheet]
+        present = [i for i, value in enumerate(keys) if value is not None]
+        present.sort(key=keys.__getitem__, reverse=reverse)
+        return [sheet[i] for i in present] + [row for row, value in zip(sheet, keys) if value is None]
 
 
 class MatchProp(BaseProp[CT]):
@@ -566,6 +479,128 @@ def to_proper_case(text: str) -> str:
     return " ".join(word.capitalize() for word in text.split())
 
 
+class PropDispatcher:
+    """
+    This routes each property line to the few properties that can parse it, instead of trying every property on every line.
+
+    A pattern is applied with `re.match`, so a line can only match it if the line starts with the literal prefix of the pattern.
+    The properties are indexed by the leading characters of their literal prefixes, and a line is looked up by its own leading
+    characters, once for each indexed key length. Properties whose patterns have no literal prefix (e.g., slayers and talisman
+    bonuses) are tried on every line, as before.
+    """
+
+    MAX_KEY_LENGTH = 8
+    """The maximum number of leading characters used as an index key."""
+    META_CHARS = set(".^$*+?{}[]\\|()")
+    QUANTIFIERS = set("*+?{")
+
+    def __init__(self, root: PropGroup):
+        self.props: List[BaseProp[Any]] = []
+        """This stores the parsable properties, in the order of the property tree."""
+        self.index: Dict[int, Dict[str, List[int]]] = {}
+        """This stores the positions of the indexed properties, by key length and key."""
+        self.residual: List[int] = []
+        """This stores the positions of the properties which must be tried on every line."""
+        self.layer: Optional[int] = None
+        """This stores the position of the layer property, which is also applied to the layer of the item."""
+
+        for prop in root.walk_prop():
+            patterns = self._patterns_of(prop)
+            if patterns is None:
+                continue
+            pos = len(self.props)
+            self.props.append(prop)
+            if prop.id == "Layer":
+                self.layer = pos
+            prefixes = [self._literal_prefix(pattern) for pattern in patterns]
+            if not prefixes or not all(prefixes):
+                self.residual.append(pos)
+                continue
+            for prefix in prefixes:
+                key = prefix[: self.MAX_KEY_LENGTH]
+                bucket = self.index.setdefault(len(key), {}).setdefault(key, [])
+                if pos not in bucket:
+                    bucket.append(pos)
+        self.key_lengths = sorted(self.index)
+        """This stores the key lengths to look up for each line."""
+
+    @staticmethod
+    def _patterns_of(prop: BaseProp[Any]) -> Optional[List[re.Pattern]]:
+        """
+        Returns the patterns the property parses with, an empty list if they are unknown, or `None` if the property is not parsed from lines.
+        """
+        if isinstance(prop, DerivedProp) or type(prop).parse is BaseProp.parse:
+            return None
+        if isinstance(prop, MatchProp) and type(prop).parse in (MatchProp.parse, BooleanProp.parse):
+            return [prop.pattern]
+        if isinstance(prop, EnumProp) and type(prop).parse is EnumProp.parse:
+            return [re.compile(pattern) for pattern in prop.pattern_to_value]
+        return []
+
+    @classmethod
+    def _literal_prefix(cls, pattern: re.Pattern) -> str:
+        """
+        Returns the literal text every match of the pattern starts with, or an empty string if there is none.
+        """
+        source = pattern.pattern
+        if not isinstance(source, str) or pattern.flags & re.IGNORECASE or "|" in source:
+            return ""
+        prefix = ""
+        # The length of the prefix at the opening of each plain group
+        opened: List[int] = []
+        i = 1 if source.startswith("^") else 0
+        while i < len(source):
+            char = source[i]
+            after = source[i + 1] if i + 1 < len(source) else ""
+            if char == "(" and after != "?":
+                opened.append(len(prefix))
+                i += 1
+                continue
+            if char == ")" and opened:
+                start = opened.pop()
+                if after in cls.QUANTIFIERS:
+                    # The group is optional or repeated, so its text is not required
+                    return prefix[:start]
+                # Plain groups do not change the matched text
+                i += 1
+                continue
+            if char in cls.META_CHARS:
+                break
+            if after in cls.QUANTIFIERS:
+                # The character is optional or repeated
+                break
+            prefix += char
+            i += 1
+        return prefix
+
+    def candidates(self, line: str) -> List[int]:
+        """
+        Returns the positions of the properties which can parse the line, in the order of the property tree.
+        """
+        found = list(self.residual)
+        for length in self.key_lengths:
+            bucket = self.index[length].get(line[:length])
+            if bucket:
+                found.extend(bucket)
+        if len(found) > len(self.residual):
+            found.sort()
+        return found
+
+    def dispatch(self, item: "Item", lines: List[str]) -> Dict[int, List[Any]]:
+        """
+        Parses the lines of the item, and returns the parsed values by the position of the property.
+        """
+        values: Dict[int, List[Any]] = {}
+        if self.layer is not None:
+            values[self.layer] = [self.props[self.layer].parse(item.Layer)]
+        for line in lines:
+            for pos in self.candidates(line):
+                value = self.props[pos].parse(line)
+                if value:
+                    values.setdefault(pos, []).append(value)
+        return values
+
+
 class PropMaster:
     RARITY_VALUES = {
         "Minor Magic Item": 1,
@@ -709,6 +744,7 @@ class PropMaster:
                         },
                     ),
                     ComparableMatchProp("Contents", "Contents", r"^Contents: (\d+)", int),
+                    BaseProp("Container", "Container"),
                 ],
             ),
             PropGroup(
@@ -979,45 +1015,63 @@ class PropMaster:
     )
     """A master tree of all properties."""
 
-    @staticmethod
-    def _apply_prop(col: BaseProp, item: "Item", lines: List[str]) -> Generator[Any, None, None]:
+    CACHE: "Optional[ItemPropCache]" = None
+    """The persistent item property cache to read the properties from, if any."""
+    CACHE_NAMESPACE = f"miexplorer-{VERSION_CORE}"
+    """The namespace of the rows in the cache. This changes with the version of the module, as the parsed rows may change."""
+
+    _dispatcher: Optional[PropDispatcher] = None
+
+    @classmethod
+    def get_dispatcher(cls) -> PropDispatcher:
         """
-        Applies the given property to the item and yields all the parsed values.
+        Returns the line dispatcher of the master tree, building it on the first use.
         """
-        try:
-            if col.id == "Layer":
-                yield col.parse(item.Layer)
-            for prop_text in lines:
-                value = col.parse(prop_text)
-                if value:
-                    yield value
-        except NotImplementedError as e:
-            return
+        if cls._dispatcher is None:
+            cls._dispatcher = PropDispatcher(cls.ALL_PROPS)
+        return cls._dispatcher
 
     @classmethod
-    def create_row_by_serial(cls, serial: int, delay: int = 1000) -> Optional[ItemPropRow]:
+    def create_row_by_serial(cls, serial: int, delay: int = 1000, container: bool = False) -> Optional[ItemPropRow]:
         """
         Scans the item property with the given serial number and creates a row for it.
+        The path of the containers holding the item is only looked up if `container` is set, as it costs a lookup per container.
         """
         item = Items.FindBySerial(serial)
         if item is None:
             return None
 
-        lines = [to_proper_case(str(line)) for line in Items.GetProperties(serial, delay)]
+        # Use the cached properties of the item if they are still valid, or request them
+        cached = cls.CACHE.get(item, cls.CACHE_NAMESPACE) if cls.CACHE is not None else None
+        if cached is not None:
+            raw_lines, properties = cached
+        else:
+            raw_lines, properties = [str(line) for line in Items.GetProperties(serial, delay)], None
+        lines = [to_proper_case(line) for line in raw_lines]
         if not lines:
             return None
 
         row = ItemPropRow()
         row.raw_props = lines
+        row.signature = cls.signature(item, lines)
+        if properties is not None:
+            row.properties.update(properties)
         row["Name"] = to_proper_case(item.Name)
         row["Serial"] = item.Serial
         row["Weight"] = item.Weight
         row["Type"] = item.ItemID
         row["Color"] = item.Color
         row["Amount"] = item.Amount
-
-        for col in cls.ALL_PROPS.walk_prop():
-            values = list(cls._apply_prop(col, item, lines))
+        if container:
+            row["Container"] = cls.container_path(item)
+        if properties is not None:
+            return row
+
+        dispatcher = cls.get_dispatcher()
+        parsed = dispatcher.dispatch(item, lines)
+        for pos in sorted(parsed):
+            col = dispatcher.props[pos]
+            values = parsed[pos]
             if values:
                 if all(isinstance(value, str) for value in values):
                     # If multiple string values are found, concatenate them separated by a slash
@@ -1028,8 +1082,46 @@ class PropMaster:
                     # For non-string properties, just take the first matched value
                     # This is because such properties should only appear once
                     row[col.id] = values[0]
+        if cls.CACHE is not None:
+            cls.CACHE.put(item, raw_lines, cls.CACHE_NAMESPACE, row.properties)
         return row
 
+    @staticmethod
+    def signature(item: "Item", lines: List[str]) -> int:
+        """
+        Returns a hash of the item data a row is parsed from, to tell whether the row is still up to date.
+        """
+        return hash((item.Name, item.ItemID, item.Color, item.Amount, item.Weight, item.Container, tuple(lines)))
+
+    @staticmethod
+    def container_path(item: "Item", max_depth: int = 8) -> str:
+        """
+        Returns the names of the containers holding the item, from the outermost one, separated by " > ".
+        """
+        names = []
+        cont = Items.FindBySerial(item.Container)
+        while cont is not None and len(names) < max_depth:
+            names.append(to_proper_case(cont.Name) if cont.Name else f"0x{cont.Serial:08X}")
+            cont = Items.FindBySerial(cont.Container)
+        return " > ".join(reversed(names))
+
+    @classmethod
+    def peek_signature(cls, serial: int) -> Optional[int]:
+        """
+        Returns the signature of the item from the properties already known to the client, without requesting them.
+        If the client does not hold the properties, such as for the rows served from the cache, the cached properties are used.
+        Returns `None` if the item is not found or its properties are not known yet.
+        """
+        item = Items.FindBySerial(serial)
+        if item is None:
+            return None
+        if item.PropsUpdated and item.Properties:
+            return cls.signature(item, [to_proper_case(str(line)) for line in item.Properties])
+        cached = cls.CACHE.get(item) if cls.CACHE is not None else None
+        if cached is None:
+            return None
+        return cls.signature(item, [to_proper_case(line) for line in cached[0]])
+
     @classmethod
     def create_col_by_id(cls, col_id: str, metadata: Optional[Dict[str, Any]] = None) -> "Optional[SheetColumn]":
         """
@@ -1158,6 +1250,123 @@ class SheetColumnFilters:
             raise ValueError(f"Unknown filter type: {filter_type}")
 
 
+class PropColumn:
+    """
+    This stores the key values of a single property for all rows of a sheet, in the order of the rows.
+
+    The values are kept in a plain list, with a separate mask of the rows without a value,
+    so that filters and sorts work on indices instead of copying or wrapping the rows.
+    """
+
+    def __init__(self, prop: BaseProp):
+        self.prop = prop
+        self.values: List[Any] = []
+        """This stores the key value of each row, or `None` if the row has no value."""
+        self.none_mask = bytearray()
+        """This stores 1 for each row without a value, and 0 otherwise."""
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append(self, row: ItemPropRow) -> None:
+        value = self.prop.key(row)
+        self.values.append(value)
+        self.none_mask.append(1 if value is None else 0)
+
+    def replace(self, index: int, row: ItemPropRow) -> None:
+        value = self.prop.key(row)
+        self.values[index] = value
+        self.none_mask[index] = 1 if value is None else 0
+
+    def remove(self, indices: Set[int]) -> None:
+        self.values = [value for i, value in enumerate(self.values) if i not in indices]
+        self.none_mask = bytearray(flag for i, flag in enumerate(self.none_mask) if i not in indices)
+
+    def filter_indices(self, indices: List[int], col_filter: SheetColumnFilters.Base) -> List[int]:
+        """
+        Returns the indices whose values pass the filter, keeping their order.
+        """
+        values = self.values
+        return [i for i in indices if col_filter(values[i])]
+
+    def sort_indices(self, indices: List[int], reverse: bool = False) -> List[int]:
+        """
+        Stably sorts the indices by their values, placing the indices without a value last in either order.
+        """
+        mask = self.none_mask
+        present = [i for i in indices if not mask[i]]
+        present.sort(key=self.values.__getitem__, reverse=reverse)
+        if len(present) < len(indices):
+            present.extend(i for i in indices if mask[i])
+        return present
+
+
+class ColumnStore:
+    """
+    This is the columnar backend of a sheet. It holds one `PropColumn` per property ID,
+    built on the first use of the property and extended as rows are added.
+
+    The views of a sheet are computed as a list of row indices: every filter narrows the indices,
+    and the stacked sort orders are applied as successive stable sorts from the least to the most recent column,
+    i.e., a lexicographic sort over the columns.
+    """
+
+    def __init__(self, rows: ItemPropSheet):
+        self.rows = rows
+        """This stores the rows of the sheet, shared with the sheet."""
+        self.columns: Dict[str, PropColumn] = {}
+        """This stores the built columns by property ID."""
+
+    def column(self, prop: BaseProp) -> PropColumn:
+        """
+        Returns the column of the property, building it if necessary.
+        """
+        col = self.columns.get(prop.id)
+        if col is None or col.prop is not prop or len(col) != len(self.rows):
+            col = PropColumn(prop)
+            for row in self.rows:
+                col.append(row)
+            self.columns[prop.id] = col
+        return col
+
+    def append(self, row: ItemPropRow) -> None:
+        """
+        Extends the built columns with a row which was just appended to the rows.
+        """
+        for col in self.columns.values():
+            col.append(row)
+
+    def replace(self, index: int, row: ItemPropRow) -> None:
+        """
+        Updates the built columns for a row which was just replaced in the rows.
+        """
+        for col in self.columns.values():
+            col.replace(index, row)
+
+    def remove(self, indices: Set[int]) -> None:
+        """
+        Shrinks the built columns for the rows which were just removed from the rows.
+        """
+        for col in self.columns.values():
+            col.remove(indices)
+
+    def select(self, sheet_columns: "Iterable[SheetColumn]") -> List[int]:
+        """
+        Returns the indices of the rows passing the filters of the columns, sorted by the columns.
+
+        The columns are given from the least to the most significant sort order.
+        """
+        sheet_columns = list(sheet_columns)
+        indices = list(range(len(self.rows)))
+        for sheet_col in sheet_columns:
+            if sheet_col.filter:
+                indices = self.column(sheet_col.prop).filter_indices(indices, sheet_col.filter)
+        for sheet_col in sheet_columns:
+            if not sheet_col.is_unsorted():
+                indices = self.column(sheet_col.prop).sort_indices(indices, reverse=sheet_col.is_reverse())
+        return indices
+
+
 class SheetColumn:
     """
     This represents a column in the sheet.
@@ -1203,25 +1412,38 @@ class SheetColumn:
 
         This returns a new sheet with the filtered rows.
         """
-        new_sheet = Sheet(name=sheet.name)
-        new_sheet.columns = sheet.columns
-        for row in sheet.rows:
-            if not self.filter or self.filter(self.prop.key(row)):
-                new_sheet.add_row(row)
-        if not self.is_unsorted():
-            new_sheet.rows = self.prop.sort(new_sheet.rows, reverse=self.is_reverse())
-
-        return new_sheet
+        return sheet.view([self])
 
     def read(self, row: ItemPropRow) -> Optional[str]:
         return self.prop.stringify(row)
 
 
+class SheetDelta:
+    """
+    This represents the changes made to a sheet by a refresh.
+    """
+
+    def __init__(self):
+        self.added: List[ItemPropRow] = []
+        """This stores the rows of the items which were not in the sheet."""
+        self.removed: List[ItemPropRow] = []
+        """This stores the rows of the items which are no longer in the container, or whose rows were replaced."""
+        self.replaced: List[ItemPropRow] = []
+        """This stores the new rows of the items whose data changed."""
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.replaced)
+
+    def __str__(self) -> str:
+        return f"{len(self.added)} added, {len(self.removed) - len(self.replaced)} removed, {len(self.replaced)} updated"
+
+
 class Sheet:
-    def __init__(self, name: str = "Untitled"):
+    def __init__(self, name: str = "Untitled", rows: Optional[ItemPropSheet] = None):
         self.name = name
-        self.rows: ItemPropSheet = []
+        self.rows: ItemPropSheet = rows if rows is not None else []
         self.columns: List[SheetColumn] = []
+        self.store = ColumnStore(self.rows)
 
     def has_column(self, id: str) -> bool:
         """
@@ -1262,15 +1484,166 @@ class Sheet:
         Adds a new row to the sheet.
         """
         self.rows.append(row)
+        self.store.append(row)
 
     def add_row_by_serial(self, serial: int):
         """
         Adds a new row to the sheet based on the item with the given serial number.
         """
-        row = PropMaster.create_row_by_serial(serial)
+        row = PropMaster.create_row_by_serial(serial, container=self.has_column("Container"))
         if not row:
             return
-        self.rows.append(row)
+        self.add_row(row)
+
+    def refresh(self, serials: Iterable[int], on_progress: Optional[Callable[[float], None]] = None, workers: int = 1) -> SheetDelta:
+        """
+        Brings the rows up to date with the items of the given serials, requesting the properties of new or changed items only.
+
+        The rows of the items not in `serials` are removed, the rows of new items are appended,
+        and the rows of items whose signature changed are parsed again and replaced in place.
+        The order of the remaining rows is kept.
+
+        :param serials: The serials of the items which should be in the sheet.
+        :param on_progress: Called with the fraction of the requested items done, from the calling thread.
+        :param workers: The number of threads requesting the properties at the same time.
+        :return: The changes made to the sheet.
+        """
+        delta = SheetDelta()
+        serials = list(serials)
+        index_by_serial = {row["Serial"]: i for i, row in enumerate(self.rows)}
+        if self.store.rows is not self.rows:
+            self.store = ColumnStore(self.rows)
+
+        # Find the requests to make, keeping the rows whose items did not change
+        wanted = set(serials)
+        gone = {i for serial, i in index_by_serial.items() if serial not in wanted}
+        stale: List[int] = []
+        for serial in serials:
+            i = index_by_serial.get(serial)
+            if i is None:
+                stale.append(serial)
+            elif i not in gone and self.rows[i].signature != PropMaster.peek_signature(serial):
+                stale.append(serial)
+
+        fetched = self._fetch_rows(stale, on_progress, workers, self.has_column("Container"))
+        for serial in stale:
+            row = fetched.get(serial)
+            i = index_by_serial.get(serial)
+            if i is None:
+                if row is not None:
+                    delta.added.append(row)
+            elif row is None:
+                gone.add(i)
+            else:
+                delta.removed.append(self.rows[i])
+                delta.replaced.append(row)
+                self.rows[i] = row
+                self.store.replace(i, row)
+
+        if gone:
+            delta.removed.extend(self.rows[i] for i in sorted(gone))
+            self.rows[:] = [row for i, row in enumerate(self.rows) if i not in gone]
+            self.store.remove(gone)
+        for row in delta.added:
+            self.add_row(row)
+        return delta
+
+    @staticmethod
+    def _fetch_rows(serials: List[int], on_progress: Optional[Callable[[float], None]], workers: int, container: bool = False) -> Dict[int, Optional[ItemPropRow]]:
+        """
+        Creates the rows of the serials, with up to `workers` requests in flight.
+        """
+        fetched: Dict[int, Optional[ItemPropRow]] = {}
+        if workers <= 1 or len(serials) <= 1:
+            for n, serial in enumerate(serials):
+                if on_progress is not None:
+                    on_progress(n / len(serials))
+                fetched[serial] = PropMaster.create_row_by_serial(serial, container=container)
+            return fetched
+
+        queue = iter(serials)
+        lock = threading.Lock()
+
+        def work():
+            while True:
+                with lock:
+                    serial = next(queue, None)
+                if serial is None:
+                    return
+                row = PropMaster.create_row_by_serial(serial, container=container)
+                with lock:
+                    fetched[serial] = row
+
+        threads = [threading.Thread(target=work) for _ in range(min(workers, len(serials)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                if on_progress is not None:
+                    on_progress(len(fetched) / len(serials))
+                thread.join(0.1)
+        return fetched
+
+    def patch_view(self, view: "Sheet", sheet_columns: Iterable[SheetColumn], delta: SheetDelta) -> "Sheet":
+        """
+        Applies the changes of a refresh to a view of this sheet, made by `view` with the same columns,
+        so that the result equals a new view without filtering and sorting all the rows again.
+
+        :param view: The view to patch, which is left unchanged.
+        :param sheet_columns: The columns of the view, from the least to the most significant sort order.
+        :param delta: The changes returned by `refresh`.
+        :return: The patched view.
+        """
+        sheet_columns = list(sheet_columns)
+        removed = set(map(id, delta.removed))
+        rows = [row for row in view.rows if id(row) not in removed]
+
+        # Insert the new rows at their sorted positions, ties broken by their positions in this sheet
+        position = {id(row): i for i, row in enumerate(self.rows)}
+        sort_columns = [col for col in reversed(sheet_columns) if not col.is_unsorted()]
+
+        def precedes(a: ItemPropRow, b: ItemPropRow) -> bool:
+            for col in sort_columns:
+                key_a, key_b = col.prop.key(a), col.prop.key(b)
+                if key_a is None or key_b is None:
+                    if key_a is None and key_b is None:
+                        continue
+                    return key_b is None
+                if key_a == key_b:
+                    continue
+                return key_b < key_a if col.is_reverse() else key_a < key_b
+            return position[id(a)] < position[id(b)]
+
+        for row in delta.replaced + delta.added:
+            if not all(col.filter(col.prop.key(row)) for col in sheet_columns if col.filter):
+                continue
+            lo, hi = 0, len(rows)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if precedes(rows[mid], row):
+                    lo = mid + 1
+                else:
+                    hi = mid
+            rows.insert(lo, row)
+
+        new_sheet = Sheet(name=view.name, rows=rows)
+        new_sheet.columns = view.columns
+        return new_sheet
+
+    def view(self, sheet_columns: Iterable[SheetColumn]) -> "Sheet":
+        """
+        Returns a new sheet with the rows passing the filters of the columns, sorted by the columns.
+
+        The columns are given from the least to the most significant sort order, and the new sheet shares the columns of this sheet.
+        """
+        if self.store.rows is not self.rows:
+            # The rows were replaced, so the built columns are stale
+            self.store = ColumnStore(self.rows)
+        rows = self.rows
+        new_sheet = Sheet(name=self.name, rows=[rows[i] for i in self.store.select(sheet_columns)])
+        new_sheet.columns = self.columns
+        return new_sheet
 
 
 __exported__ = [
@@ -1297,9 +1670,13 @@ __exported__ = [
     "IntegerMinProp",
     "PropGroup",
     # Property Master
+    "PropDispatcher",
     "PropMaster",
     # Spreadsheet
     "SheetColumnFilters",
+    "PropColumn",
+    "ColumnStore",
+    "SheetDelta",
     "SheetColumn",
     "Sheet",
 ]
@@ -0,0 +1,81 @@
+"""
+Resolves every copy of gumpradio in the process to a single loaded module.
+
+Several scripts ship their own copy of this package, and RazorEnhanced runs them in one interpreter,
+which shares the loaded modules between the scripts. Each copy registers itself under the shared names
+unless a copy of the same or a newer version is already loaded, so that every script uses the same classes
+and shares the caches kept by them.
+
+Note that a copy is only loaded again when its `VERSION` is raised, not when its files are modified.
+"""
+
+from typing import Tuple
+import os
+import re
+import sys
+import types
+
+
+SHARED_MAIN = "gumpradio_main"
+"""The name under which the shared `main` module is registered."""
+
+SHARED_TEMPLATES = "gumpradio_templates"
+"""The name under which the shared `templates` module is registered."""
+
+
+def parse_version(version: str) -> Tuple[int, ...]:
+    """
+    Converts a version string such as "1.2.0" into a comparable tuple.
+    """
+    return tuple(int(part) for part in re.findall(r"\d+", version))
+
+
+def read_version(path: str) -> str:
+    """
+    Reads the version of a copy from its `main.py`, without executing it.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            matchres = re.match(r'^VERSION = "([^"]+)"', line)
+            if matchres:
+                return matchres.group(1)
+    return "0"
+
+
+def load_module(name: str, path: str) -> types.ModuleType:
+    """
+    Executes the file as a top-level module of the name, replacing any module of the name.
+    """
+    module = types.ModuleType(name)
+    module.__file__ = path
+    sys.modules[name] = module
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            code = compile(f.read(), path, "exec")
+        exec(code, module.__dict__)
+    except Exception:
+        del sys.modules[name]
+        raise
+    return module
+
+
+def share(package: str) -> types.ModuleType:
+    """
+    Resolves the `main` and `templates` modules of the package to the shared gumpradio,
+    loading the copy of the package first if it is newer than the shared one.
+
+    :param package: The name of the package, i.e., `__name__` in its `__init__.py`.
+    :return: The shared `main` module.
+    """
+    path = os.path.dirname(os.path.abspath(sys.modules[package].__file__))
+    main = sys.modules.get(SHARED_MAIN)
+    templates = sys.modules.get(SHARED_TEMPLATES)
+    if main is None or templates is None or parse_version(main.VERSION) < parse_version(read_version(os.path.join(path, "main.py"))):
+        main = load_module(SHARED_MAIN, os.path.join(path, "main.py"))
+        templates = load_module(SHARED_TEMPLATES, os.path.join(path, "templates.py"))
+    # Make the relative imports in the package resolve to the shared modules
+    sys.modules[package + ".main"] = main
+    sys.modules[package + ".templates"] = templates
+    setattr(sys.modules[package], "main", main)
+    setattr(sys.modules[package], "templates", templates)
+    return main
@@ -1,14 +1,9 @@
 from AutoComplete import *
 from typing import Optional, Union, Tuple
 from enum import Enum
-import sys
-import os
 
-# Ensure the current directory is in the system path for module resolution
-sys.path.append(os.path.dirname(__file__))
-
-# Import gumpradio after modifying sys.path
-from main import GumpBuilder
+# Import the shared gumpradio, which is loaded along with this module (see loader.py)
+from gumpradio_main import GumpBuilder
 
 
 class CraftingGumpBuilder(GumpBuilder):
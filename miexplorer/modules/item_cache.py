@@ -0,0 +1,225 @@
+from AutoComplete import *
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import os
+import re
+import threading
+import time
+
+
+VERSION_ITEM_CACHE = "1.1.0"
+"""The version of the item property cache module. The copies of this module in the other scripts are kept identical."""
+
+CACHE_PATH = "Data/ItemCache/{shard}/props.jsonl"
+"""The file shared by the scripts which cache item properties, one per shard since the serials are only unique within a shard."""
+
+
+################################################################################
+# Item Property Cache
+################################################################################
+
+
+class ItemPropCache:
+    """
+    A persistent cache of item properties by serial, shared by the scripts through a single file per shard.
+
+    Each entry holds the raw property lines of an item, and optionally the rows parsed from them by each script,
+    under a namespace which should include the version of the parser. An entry is only used while the item keeps
+    the item ID, color and amount it was recorded with, and while it is younger than `max_age`. If the client
+    already holds the properties of the item, they must also be the recorded ones.
+
+    The file is a log of JSON lines, one per update, loaded in bulk with `load` and appended to by `flush`.
+    The latest line of a serial wins. The log is rewritten without the superseded lines once they outnumber the live ones.
+    Two scripts may append to the file concurrently, but a rewrite by one can drop the latest lines of the other,
+    which only costs another request of the properties. Within a script, the cache is safe to use from several threads.
+
+    Attributes:
+        path (Optional[str]): The path of the cache file. If `None`, the file of the current shard is used, resolved on the first load.
+        max_age (float): The lifetime of each entry in seconds. Non-positive values disable the expiration.
+        hits (int): The number of successful lookups.
+        misses (int): The number of failed lookups, including the stale ones.
+    """
+
+    COMPACT_MIN_LINES = 1000
+
+    def __init__(self, path: Optional[str] = None, max_age: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self.entries: Dict[int, Dict[str, Any]] = {}
+        """This stores the entries by serial, as written in the file."""
+        self.hits = 0
+        self.misses = 0
+        self._loaded = False
+        self._pending: List[Dict[str, Any]] = []
+        self._lines = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        self.load()
+        return len(self.entries)
+
+    @staticmethod
+    def shard_path() -> str:
+        """
+        Returns the path of the cache file of the shard the client is connected to.
+        """
+        shard = re.sub(r"[^\w.-]+", "_", Misc.ShardName() or "").strip("_")
+        return CACHE_PATH.format(shard=shard or "default")
+
+    @staticmethod
+    def token(item: "Item") -> List[int]:
+        """
+        Returns the validation token of the item, which is known to the client without requesting the properties.
+        """
+        return [item.ItemID, item.Color, item.Amount]
+
+    @staticmethod
+    def known_lines(item: "Item") -> Optional[List[str]]:
+        """
+        Returns the property lines the client already holds for the item, or `None` if they have not been received.
+        """
+        if not item.PropsUpdated or not item.Properties:
+            return None
+        return [str(line) for line in item.Properties]
+
+    def load(self, force: bool = False) -> int:
+        """
+        Reads the cache file once, and returns the number of entries.
+        """
+        with self._lock:
+            if self._loaded and not force:
+                return len(self.entries)
+            if self.path is None:
+                self.path = self.shard_path()
+            self._loaded = True
+            self.entries.clear()
+            self._lines = 0
+            if not os.path.exists(self.path):
+                return 0
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        serial = entry["s"]
+                    except (ValueError, KeyError, TypeError):
+                        # A line cut by a crash, which is simply skipped
+                        continue
+                    self._lines += 1
+                    if entry.get("x"):
+                        self.entries.pop(serial, None)
+                    else:
+                        self.entries[serial] = entry
+            return len(self.entries)
+
+    def _lookup(self, item: "Item") -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self.load()
+            entry = self.entries.get(item.Serial)
+            if entry is None:
+                self.misses += 1
+                return None
+            stale = entry["k"] != self.token(item)
+            if not stale and self.max_age > 0:
+                stale = time.time() - entry["t"] > self.max_age
+            if not stale:
+                known = self.known_lines(item)
+                stale = known is not None and known != entry["p"]
+            if stale:
+                self.invalidate(item.Serial)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry
+
+    def get(self, item: "Item", namespace: Optional[str] = None) -> Optional[Tuple[List[str], Any]]:
+        """
+        Returns the cached property lines of the item and the row parsed from them under the namespace,
+        or `None` if the entry is missing or stale. The row is `None` if it was not recorded under the namespace.
+        """
+        entry = self._lookup(item)
+        if entry is None:
+            return None
+        return entry["p"], entry["r"].get(namespace) if namespace is not None else None
+
+    def put(self, item: "Item", lines: Iterable[str], namespace: Optional[str] = None, parsed: Any = None) -> None:
+        """
+        Records the property lines of the item, and optionally the JSON-serializable row parsed from them.
+
+        The rows parsed by the other namespaces are kept as long as the lines are unchanged.
+        """
+        with self._lock:
+            self.load()
+            lines = [str(line) for line in lines]
+            entry = self.entries.get(item.Serial)
+            rows = dict(entry["r"]) if entry is not None and entry["p"] == lines else {}
+            if namespace is not None:
+                rows[namespace] = parsed
+            entry = {"s": item.Serial, "k": self.token(item), "t": time.time(), "p": lines, "r": rows}
+            self.entries[item.Serial] = entry
+            self._pending.append(entry)
+
+    def record_known(self, items: Iterable["Item"]) -> int:
+        """
+        Records the items whose properties the client already holds, and returns the number of new or changed entries.
+        This does not request any properties.
+        """
+        self.load()
+        count = 0
+        for item in items:
+            lines = self.known_lines(item)
+            if lines is None:
+                continue
+            entry = self.entries.get(item.Serial)
+            if entry is not None and entry["p"] == lines and entry["k"] == self.token(item):
+                continue
+            self.put(item, lines)
+            count += 1
+        return count
+
+    def invalidate(self, serial: int) -> bool:
+        """
+        Drops the entry of the serial. Returns True if the entry existed.
+        """
+        with self._lock:
+            if self.entries.pop(serial, None) is None:
+                return False
+            self._pending.append({"s": serial, "x": 1})
+            return True
+
+    def flush(self) -> None:
+        """
+        Appends the pending updates to the cache file, or rewrites the file if it is mostly superseded lines.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if self._lines + len(self._pending) > max(self.COMPACT_MIN_LINES, 2 * len(self.entries)):
+                self._rewrite()
+                return
+            with open(self.path, "a", encoding="utf-8") as f:
+                for entry in self._pending:
+                    f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._lines += len(self._pending)
+            self._pending.clear()
+
+    def _rewrite(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, self.path)
+        self._lines = len(self.entries)
+        self._pending.clear()
+
+    def report(self) -> str:
+        """
+        Summarize the size and the hit rate in a single line.
+        """
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups > 0 else 0.0
+        return f"Item cache: {len(self.entries)} entries, {self.hits}/{lookups} hits ({rate:.0%})."
+
+
+ITEM_CACHE = ItemPropCache()
+"""The item property cache of this script."""
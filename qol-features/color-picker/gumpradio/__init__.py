@@ -1,2 +1,5 @@
+from .loader import share
+
+share(__name__)
 from .main import GumpBuilder
 from .templates import CraftingGumpBuilder
\ No newline at end of file
@@ -7,10 +7,27 @@ A library for building complex gumps with automatic layout and event handling.
 from AutoComplete import *
 from System.Collections.Generic import List as CList  # type: ignore
 from enum import Enum
-from typing import List, Optional, Tuple, Dict, Union, Callable, Any
+from typing import List, Optional, Tuple, Dict, Union, Callable, Any, Iterable
+import json
+import os
 
+try:
+    # Used to read the pixels of a bitmap at once, instead of pixel by pixel
+    import clr  # type: ignore
 
-VERSION = "1.0.0"
+    clr.AddReference("System.Drawing")
+    from System import Array, Byte  # type: ignore
+    from System.Drawing import Rectangle  # type: ignore
+    from System.Drawing.Imaging import ImageLockMode, PixelFormat  # type: ignore
+    from System.Runtime.InteropServices import Marshal  # type: ignore
+except Exception:
+    Marshal = None
+
+
+VERSION = "1.4.0"
+
+TILEART_CACHE_PATH = "Data/Gumpradio/tileart_rects.json"
+"""The file of the bounding boxes of the tile arts, which is shared by every script using gumpradio."""
 
 
 ################################################################################
@@ -38,6 +55,8 @@ class VerticalAlign(Enum):
 class _Serializable:
     _id: int = -1
     """The unique ID of the block in the gump."""
+    _id_count: int = 1
+    """The number of consecutive IDs reserved by the block, starting from `_id`."""
 
 
 class _HasText:
@@ -132,6 +151,15 @@ class _Block:
         # Atomic blocks have no default rendering
         return []
 
+    def compile_key(self) -> Tuple[Any, ...]:
+        """
+        A snapshot of the state the compiled commands depend on. The commands are reused while the snapshot is equal.
+
+        This covers every attribute of the block, including the computed size, position, ID and text index.
+        Mutable attributes are compared by identity first, so their in-place modifications may go unnoticed.
+        """
+        return tuple(self.__dict__.values())
+
 
 class _Spacer(_Block):
     spacing: int
@@ -470,6 +498,7 @@ class _GumpArt(_InteractiveBlock):
 
 class _TileArt(_InteractiveBlock):
     RECT_CACHE: Dict[int, Tuple[int, int, int, int]] = {}
+    """The bounding boxes found in this session, backed by the persistent table `TILE_RECTS`."""
 
     graphics: int
     """The tileart ID to display."""
@@ -520,19 +549,7 @@ class _TileArt(_InteractiveBlock):
     @staticmethod
     def get_rect(graphics: int) -> Tuple[int, int, int, int]:
         if graphics not in _TileArt.RECT_CACHE:
-            bitmap = Items.GetImage(graphics, 0)
-            w, h = bitmap.Width, bitmap.Height
-            # Find the rectangle bounds
-            left, top, right, bottom = w, h, 0, 0
-            for y in range(h):
-                for x in range(w):
-                    pixel = bitmap.GetPixel(x, y)
-                    if pixel.R or pixel.G or pixel.B:
-                        left = min(x, left)
-                        top = min(y, top)
-                        right = max(x, right)
-                        bottom = max(y, bottom)
-            _TileArt.RECT_CACHE[graphics] = (left, top, right, bottom)
+            _TileArt.RECT_CACHE[graphics] = TILE_RECTS.get(graphics)
         return _TileArt.RECT_CACHE[graphics]
 
 
@@ -578,6 +595,12 @@ class _Button(_InteractiveBlock, _Serializable, _Clickable):
         cmds.extend(_InteractiveBlock.compile(self))
         return cmds
 
+    def compile_key(self) -> Tuple[Any, ...]:
+        # The tileart is not a child, so its state is part of the button
+        if self.tileart is None:
+            return super().compile_key()
+        return super().compile_key() + self.tileart.compile_key()
+
     def add_tileart(self, graphics: int, hue: int = 0, centered: bool = True) -> "_Button":
         self.tileart = _TileArt(graphics=graphics, width=self.width, height=self.height, hue=hue, centered=centered)
         return self
@@ -686,12 +709,338 @@ class _TextEntry(_InteractiveBlock, _HasText, _Serializable):
         return cmds
 
 
+class _Table(_Block, _Serializable, _Clickable):
+    ROW_BUTTON = (4005, 4007, 30)
+    """The gumpart IDs and the width of the button at the start of each row, if the rows are selectable."""
+    PREV_BUTTON = (4014, 4016, 30)
+    """The gumpart IDs and the width of the button to the previous page."""
+    NEXT_BUTTON = (4005, 4007, 30)
+    """The gumpart IDs and the width of the button to the next page."""
+    FOOTER_HEIGHT = 22
+    """The height of the footer, which holds the page buttons and the page number."""
+
+    widths: List[int]
+    """The widths of the columns."""
+    count: int
+    """The number of rows."""
+    cell: Callable[[int, int], Any]
+    """Returns the content of the cell at (row, column), as a text or a (text, hue) pair."""
+    page: int
+    """The first page of the window."""
+    selected: Optional[int]
+    """The row whose button was clicked by the last response, or None if a page button was clicked."""
+
+    def __init__(
+        self,
+        widths: List[int],
+        count: int,
+        cell: Callable[[int, int], Any],
+        header: Optional[List[str]] = None,
+        page: int = 0,
+        page_size: int = 10,
+        window: int = 5,
+        row_height: int = 22,
+        spacing: int = 5,
+        hue: int = -1,
+        selectable: bool = False,
+    ):
+        """
+        Represents a table of text cells, of which only a window of pages is compiled.
+
+        The cells are of a fixed size, so they are placed by arithmetic rather than as blocks.
+        The pages of the window are sent as the pages of the gump, which are flipped by the client without a response.
+        Flipping past the window, or clicking the button of a row, responds with this table.
+        A gump can hold only one table, since the pages belong to the whole gump.
+        """
+        _Block.__init__(self)
+        _Clickable.__init__(self)
+        self.widths = widths
+        self.count = count
+        self.cell = cell
+        self.header = header
+        self.page = page
+        self.page_size = page_size
+        self.window = window
+        self.row_height = row_height
+        self.spacing = spacing
+        self.hue = hue
+        self.selectable = selectable
+        self.selected = None
+        self._id_count = 2 + window * page_size
+        self._rows: List[List[Tuple[str, int]]] = []
+        self._text_indices: Dict[str, int] = {}
+
+    @property
+    def total_pages(self) -> int:
+        return max(1, (self.count - 1) // self.page_size + 1)
+
+    def window_pages(self) -> range:
+        """The pages compiled into the gump, starting from the current page."""
+        self.page = max(0, min(self.page, self.total_pages - 1))
+        return range(self.page, min(self.page + self.window, self.total_pages))
+
+    def compute_size(self) -> Tuple[int, int]:
+        width = sum(self.widths) + self.spacing * (len(self.widths) - 1)
+        if self.selectable:
+            width += self.ROW_BUTTON[2] + self.spacing
+        height = self.row_height * self.page_size + self.FOOTER_HEIGHT
+        if self.header:
+            height += self.row_height
+        self._calc_width = self.width or width
+        self._calc_height = self.height or height
+        return (self._calc_width, self._calc_height)
+
+    def index_texts(self, intern: Callable[[str], int]):
+        """
+        Read the cells of the window, and register their texts to the gump.
+
+        :param intern: Returns the index of a text in the gump's text list, adding it if needed.
+        """
+        self._rows = []
+        texts = list(self.header or [])
+        for page in self.window_pages():
+            for i in range(page * self.page_size, min((page + 1) * self.page_size, self.count)):
+                row = []
+                for j in range(len(self.widths)):
+                    value = self.cell(i, j)
+                    text, hue = value if isinstance(value, tuple) else (value, self.hue)
+                    row.append(("" if text is None else str(text), hue))
+                self._rows.append(row)
+                texts.extend(text for text, _ in row)
+            texts.append(f"{page + 1}/{self.total_pages}")
+        self._text_indices = {text: intern(text) for text in texts if text}
+
+    def compile(self) -> List[str]:
+        left, top = self._calc_left, self._calc_top
+        # Place the columns
+        lefts = []
+        x = left + (self.ROW_BUTTON[2] + self.spacing if self.selectable else 0)
+        for width in self.widths:
+            lefts.append(x)
+            x += width + self.spacing
+        cmds = []
+        if self.header:
+            for x, width, text in zip(lefts, self.widths, self.header):
+                if text:
+                    cmds.append(f"croppedtext {x} {top} {width} {self.row_height} {self.hue} {self._text_indices[text]}")
+            top += self.row_height
+        footer_top = top + self.row_height * self.page_size
+        pages = self.window_pages()
+        rows = iter(self._rows)
+        for k, page in enumerate(pages, start=1):
+            cmds.append(f"page {k}")
+            for r in range(min(self.page_size, self.count - page * self.page_size)):
+                y = top + r * self.row_height
+                if self.selectable:
+                    cmds.append(f"button {left} {y} {self.ROW_BUTTON[0]} {self.ROW_BUTTON[1]} 1 0 {self._id + 2 + (k - 1) * self.page_size + r}")
+                for x, width, (text, hue) in zip(lefts, self.widths, next(rows)):
+                    if text:
+                        cmds.append(f"croppedtext {x} {y} {width} {self.row_height} {hue} {self._text_indices[text]}")
+            # Page buttons flip the pages of the window on the client, and respond at its edges
+            if k > 1:
+                cmds.append(f"button {left} {footer_top} {self.PREV_BUTTON[0]} {self.PREV_BUTTON[1]} 0 {k - 1} 0")
+            elif page > 0:
+                cmds.append(f"button {left} {footer_top} {self.PREV_BUTTON[0]} {self.PREV_BUTTON[1]} 1 0 {self._id}")
+            label = f"{page + 1}/{self.total_pages}"
+            cmds.append(f"text {left + self.PREV_BUTTON[2] + self.spacing} {footer_top} {self.hue} {self._text_indices[label]}")
+            right = left + self._calc_width - self.NEXT_BUTTON[2]
+            if k < len(pages):
+                cmds.append(f"button {right} {footer_top} {self.NEXT_BUTTON[0]} {self.NEXT_BUTTON[1]} 0 {k + 1} 0")
+            elif page < self.total_pages - 1:
+                cmds.append(f"button {right} {footer_top} {self.NEXT_BUTTON[0]} {self.NEXT_BUTTON[1]} 1 0 {self._id + 1}")
+        # The blocks after the table are shown on every page
+        cmds.append("page 0")
+        return cmds
+
+    def press(self, offset: int):
+        """
+        Handle a click on the button of the given offset from the ID of the table.
+        """
+        self.selected = None
+        if offset == 0:
+            self.page = max(0, self.page - 1)
+        elif offset == 1:
+            self.page = min(self.total_pages - 1, self.page + self.window)
+        else:
+            self.selected = self.page * self.page_size + offset - 2
+
+
+################################################################################
+# Tile Art Bounds
+################################################################################
+
+
+class _TileRectCache:
+    """
+    A persistent table of the bounding boxes of the tile arts, by graphic ID.
+
+    A bounding box is the `(left, top, right, bottom)` rectangle of the pixels which are not black,
+    and is found by scanning the image of the tile art once. The table is read from the file on the first lookup,
+    and the new entries are written back by `flush`. The whole table is discarded when the art files change,
+    which is detected by the sizes of a few common tile arts.
+    """
+
+    PROBES = (0x0E75, 0x0EED, 0x0F0E, 0x13B9, 0x14F0, 0x1BF2, 0x1F03, 0x2252)
+    """The graphic IDs whose sizes identify the version of the art files."""
+
+    def __init__(self, path: str = TILEART_CACHE_PATH):
+        self.path = path
+        self.rects: Dict[int, Tuple[int, int, int, int]] = {}
+        """This stores the bounding boxes by graphic ID."""
+        self.art_version: Optional[str] = None
+        """This stores the version of the art files, once the table is loaded."""
+        self._loaded = False
+        self._modified = False
+
+    @classmethod
+    def read_art_version(cls) -> str:
+        """
+        Returns the fingerprint of the art files, made of the sizes of the probe tile arts.
+        """
+        sizes = []
+        for graphics in cls.PROBES:
+            bitmap = Items.GetImage(graphics, 0)
+            sizes.append(f"{bitmap.Width}x{bitmap.Height}" if bitmap else "-")
+        return ",".join(sizes)
+
+    def load(self) -> int:
+        """
+        Reads the table once, and returns the number of entries.
+        """
+        if self._loaded:
+            return len(self.rects)
+        self._loaded = True
+        self.art_version = self.read_art_version()
+        if not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # A broken table is simply built again
+            return 0
+        if data.get("art") != self.art_version:
+            self._modified = True
+            return 0
+        for graphics, rect in data.get("rects", {}).items():
+            self.rects.setdefault(int(graphics), tuple(rect))
+        return len(self.rects)
+
+    def get(self, graphics: int) -> Tuple[int, int, int, int]:
+        """
+        Returns the bounding box of the tile art, scanning its image if it is not in the table.
+        """
+        rect = self.rects.get(graphics)
+        if rect is None:
+            self.load()
+            rect = self.rects.get(graphics)
+        if rect is None:
+            rect = self.scan(Items.GetImage(graphics, 0))
+            self.rects[graphics] = rect
+            self._modified = True
+        return rect
+
+    def prebuild(self, graphics_ids: Iterable[int], on_progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Scans the tile arts which are not in the table yet, and returns the number of the new entries.
+        This does not write the table; call `flush` afterwards.
+
+        :param graphics_ids: The graphic IDs to scan.
+        :param on_progress: An optional callback, called with each graphic ID before it is scanned.
+        """
+        self.load()
+        count = 0
+        for graphics in graphics_ids:
+            if graphics in self.rects:
+                continue
+            if on_progress is not None:
+                on_progress(graphics)
+            bitmap = Items.GetImage(graphics, 0)
+            if bitmap is None:
+                continue
+            self.rects[graphics] = self.scan(bitmap)
+            self._modified = True
+            count += 1
+        return count
+
+    def flush(self) -> None:
+        """
+        Writes the table if it has new entries.
+        """
+        if not self._modified:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data = {"art": self.art_version, "rects": {str(graphics): list(rect) for graphics, rect in sorted(self.rects.items())}}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        self._modified = False
+
+    @classmethod
+    def scan(cls, bitmap: Any) -> Tuple[int, int, int, int]:
+        """
+        Find the bounding box of the pixels which are not black. An empty image gives `(width, height, 0, 0)`.
+        """
+        if bitmap is None:
+            return (0, 0, 0, 0)
+        w, h = bitmap.Width, bitmap.Height
+        if Marshal is not None:
+            # Copy the pixels into a buffer, in the order of blue, green, red and alpha
+            data = bitmap.LockBits(Rectangle(0, 0, w, h), ImageLockMode.ReadOnly, PixelFormat.Format32bppArgb)
+            try:
+                stride = data.Stride
+                buffer = Array.CreateInstance(Byte, abs(stride) * h)
+                Marshal.Copy(data.Scan0, buffer, 0, abs(stride) * h)
+            finally:
+                bitmap.UnlockBits(data)
+            if stride > 0:
+                return cls.scan_buffer(bytes(buffer), stride, w, h)
+        # Find the rectangle bounds
+        left, top, right, bottom = w, h, 0, 0
+        for y in range(h):
+            for x in range(w):
+                pixel = bitmap.GetPixel(x, y)
+                if pixel.R or pixel.G or pixel.B:
+                    left = min(x, left)
+                    top = min(y, top)
+                    right = max(x, right)
+                    bottom = max(y, bottom)
+        return (left, top, right, bottom)
+
+    @staticmethod
+    def scan_buffer(buffer: bytes, stride: int, w: int, h: int) -> Tuple[int, int, int, int]:
+        """
+        Find the bounding box of the pixels which are not black, in a buffer of 32-bit BGRA rows.
+        """
+        left, top, right, bottom = w, h, 0, 0
+        for y in range(h):
+            row = buffer[y * stride : y * stride + 4 * w]
+            # Each color channel of the row is searched for its first and last non-zero values, ignoring the alpha
+            for channel in (row[0::4], row[1::4], row[2::4]):
+                stripped = channel.lstrip(b"\0")
+                if not stripped:
+                    continue
+                left = min(left, w - len(stripped))
+                right = max(right, len(channel.rstrip(b"\0")) - 1)
+                top = min(top, y)
+                bottom = y
+        return (left, top, right, bottom)
+
+
+TILE_RECTS = _TileRectCache()
+"""The bounding boxes of the tile arts, shared by the gumps of this script."""
+
+
 ################################################################################
 # Public API
 ################################################################################
 
 
 class GumpBuilder(_Clickable):
+    SENT: Dict[int, Tuple[int, int, str, List[str]]] = {}
+    """The last layout and texts sent under each gump ID, which are not sent again while the gump is still open."""
+
     class Assets:
         # Protocols
         Serializable = _Serializable
@@ -709,6 +1058,7 @@ class GumpBuilder(_Clickable):
         Checkbox = _Checkbox
         Html = _Html
         TextEntry = _TextEntry
+        Table = _Table
 
     class Scope:
         def __init__(self, builder: "GumpBuilder", block: _Container):
@@ -753,6 +1103,9 @@ class GumpBuilder(_Clickable):
 
         self.root: _Root = _Root()
         self.current: _Container = self.root
+        self.compiled: Optional[Dict[int, Tuple[_Block, Tuple[Any, ...], List[str]]]] = None
+        """This stores the commands of each block compiled by the last launch, with the snapshot they were compiled from.
+        This is `None` until the first launch, since most gumps are launched only once."""
 
     def on_exit(self, handler: Callable, args: "Optional[List[_Block]]" = None):
         """
@@ -1036,6 +1389,41 @@ class GumpBuilder(_Clickable):
         self.current.append(block)
         return block
 
+    def Table(
+        self,
+        widths: List[int],
+        count: int,
+        cell: Callable[[int, int], Any],
+        header: Optional[List[str]] = None,
+        page: int = 0,
+        page_size: int = 10,
+        window: int = 5,
+        row_height: int = 22,
+        spacing: int = 5,
+        hue: int = -1,
+        selectable: bool = False,
+    ):
+        """
+        Add a table of text cells, which only reads the cells of a window of pages.
+        The pages of the window are flipped by the client, and flipping past the window responds with the table.
+
+        :param widths: The widths of the columns in pixels.
+        :param count: The number of rows.
+        :param cell: Returns the content of the cell at (row, column), as a text or a (text, hue) pair.
+        :param header: The optional titles of the columns.
+        :param page: The first page of the window.
+        :param page_size: The number of rows in each page.
+        :param window: The number of pages sent at once.
+        :param row_height: The height of each row in pixels.
+        :param spacing: The spacing between the columns in pixels.
+        :param hue: The 0-based color hue of the texts. -1 for default color.
+        :param selectable: Whether to add a button to each row, which responds with the table and sets its `selected` row.
+        :return: The created Table block.
+        """
+        block = _Table(widths, count, cell, header, page, page_size, window, row_height, spacing, hue, selectable)
+        self.current.append(block)
+        return block
+
     class Response:
         """
         Represents a response from the gump.
@@ -1101,6 +1489,8 @@ class GumpBuilder(_Clickable):
                 response = GumpBuilder.Response(block)
                 if isinstance(block, _Checkbox):
                     block.checked = not block.checked
+                if isinstance(block, _Table):
+                    block.press(gd.buttonid - block._id)
                 if isinstance(block, _Clickable):
                     if callable(block.click_handler):
                         response.result = block.click_handler(*(block.click_args or []))
@@ -1114,8 +1504,9 @@ class GumpBuilder(_Clickable):
         """
         Launch the gump and return a response parser.
 
-        :param response: Whether to wait for and process a response from the user.
-        :param timeout: Timeout in milliseconds to wait for a response. Default is 1 hour.
+        The builder can be modified and launched again, which only compiles the modified blocks again.
+        The gump is not sent again if it is still open with the identical layout and texts.
+
         :return: A response parser for the launched gump.
         """
         # Compute sizes
@@ -1127,21 +1518,24 @@ class GumpBuilder(_Clickable):
         serialized: Dict[int, _Block] = {0: self.root}  # ID 0 is reserved for root
         texts: List[str] = []
         texts_inv: Dict[str, int] = {}
-        for block in self.root.walk():
+
+        def intern(text: str) -> int:
+            if text not in texts_inv:
+                texts_inv[text] = len(texts)
+                texts.append(text)
+            return texts_inv[text]
+
+        blocks = list(self.root.walk())
+        for block in blocks:
             if isinstance(block, _Serializable):
                 block._id = current_id
-                serialized[current_id] = block
-                current_id += 1
+                for offset in range(block._id_count):
+                    serialized[current_id + offset] = block
+                current_id += block._id_count
             if isinstance(block, _HasText):
-                if block.text:
-                    if block.text in texts_inv:
-                        block._text_index = texts_inv[block.text]
-                        continue
-                    block._text_index = len(texts_inv)
-                    texts.append(block.text)
-                    texts_inv[block.text] = block._text_index
-                else:
-                    block._text_index = -1
+                block._text_index = intern(block.text) if block.text else -1
+            elif isinstance(block, _Table):
+                block.index_texts(intern)
         # Compile commands
         cmds: List[str] = []
         if not self.movable:
@@ -1152,12 +1546,29 @@ class GumpBuilder(_Clickable):
             cmds.append("nodispose")
 
         cmds.append("page 0")
-        for block in self.root.walk():
-            cmds.extend(block.compile())
+        compiled: Dict[int, Tuple[_Block, Tuple[Any, ...], List[str]]] = {}
+        for block in blocks:
+            if self.compiled is None:
+                cmds.extend(block.compile())
+                continue
+            key = block.compile_key()
+            entry = self.compiled.get(id(block))
+            if entry is None or entry[0] is not block or entry[1] != key:
+                entry = (block, key, block.compile())
+            compiled[id(block)] = entry
+            cmds.extend(entry[2])
+        self.compiled = compiled
         cmds_body = "".join(f"{{ {cmd} }}" for cmd in cmds)
+        # Save the bounding boxes of the tile arts scanned by this launch
+        TILE_RECTS.flush()
 
+        # Skip sending if the gump is still open with the same content
+        sent = (self.x, self.y, cmds_body, texts)
+        if GumpBuilder.SENT.get(self.id) == sent and Gumps.HasGump(self.id):
+            return self.ResponseParser(self, serialized)
         Gumps.CloseGump(self.id)
         Gumps.SendGump(self.id, Player.Serial, self.x, self.y, cmds_body, CList[str](texts))
+        GumpBuilder.SENT[self.id] = sent
         return self.ResponseParser(self, serialized)
 
 
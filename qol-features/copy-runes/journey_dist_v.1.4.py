@@ -26,11 +26,17 @@ CAST_RECOVERY_TIME = 1500
 
 from AutoComplete import *
 import threading
+import os
 import re
+import sys
 from typing import List, Tuple, Optional
 from System.Collections.Generic import List as CList  # type: ignore
 from System import Byte, Int32  # type: ignore
 
+# Load local modules
+sys.path.append(os.path.dirname(__file__))
+from gump_layout import GumpLayout
+
 VERSION = "1.4"
 
 ################################################################################
@@ -217,50 +223,47 @@ class RunicAtlasControl:
         sextant: Optional[Tuple[int, int]] = None
         sextant_t2a: Optional[Tuple[int, int]] = None
 
-        last_button_id = -1
-        last_button_ln = -1
         has_selected_entry = False
-        for line_no, line_str in enumerate(gd.layoutPieces):
-            line_str = line_str.strip()
-            args = line_str.split()
-            if args[0] == "button":
-                last_button_id = int(args[-1])
-                last_button_ln = line_no
-                if last_button_id == 100:
-                    snapshot.page = 1
-                elif last_button_id == 116:
-                    snapshot.page = 2
-                elif last_button_id == 132:
-                    snapshot.page = 3
-            elif args[0] == "croppedtext":
-                if last_button_id < 100 or last_button_id >= 148:
-                    continue
-                if last_button_ln + 1 != line_no:
-                    continue
-                index = last_button_id - 100
-                rune = snapshot.runes[index]
-                text_id = int(args[-1])
-                color = int(args[-2])
-                rune.name = gd.stringList[text_id]
-                if color == 331:
-                    snapshot.selected_index = index
-                    has_selected_entry = True
-                elif color == 81:
-                    rune.facet = 0  # Felucca
-                elif color == 10:
-                    rune.facet = 1  # Trammel
-                elif color == 0:
-                    rune.facet = 2  # Illshenar
-                elif color == 1102:
-                    rune.facet = 3  # Malas
-                elif color == 1154:
-                    rune.facet = 4  # Tokuno
-                elif color == 1645:
-                    rune.facet = 5  # Ter Mur
-            elif line_str.startswith("htmlgump 25 254 182 18"):
-                text_id = int(args[5])
-                sextant = _decode_sextant(gd.stringList[text_id])
-                sextant_t2a = _decode_sextant(gd.stringList[text_id], True)
+        layout = GumpLayout.parse(gd)
+        for button in layout.select("button"):
+            button_id = int(button.args[-1])
+            if button_id == 100:
+                snapshot.page = 1
+            elif button_id == 116:
+                snapshot.page = 2
+            elif button_id == 132:
+                snapshot.page = 3
+            if button_id < 100 or button_id >= 148:
+                continue
+            # The name of the rune follows its button
+            if button.index + 1 >= len(layout.entries):
+                continue
+            label = layout.entries[button.index + 1]
+            if label.cmd != "croppedtext":
+                continue
+            index = button_id - 100
+            rune = snapshot.runes[index]
+            color = int(label.args[-2])
+            rune.name = label.text
+            if color == 331:
+                snapshot.selected_index = index
+                has_selected_entry = True
+            elif color == 81:
+                rune.facet = 0  # Felucca
+            elif color == 10:
+                rune.facet = 1  # Trammel
+            elif color == 0:
+                rune.facet = 2  # Illshenar
+            elif color == 1102:
+                rune.facet = 3  # Malas
+            elif color == 1154:
+                rune.facet = 4  # Tokuno
+            elif color == 1645:
+                rune.facet = 5  # Ter Mur
+        line = layout.first("htmlgump", 25, 254)
+        if line is not None and line.text is not None:
+            sextant = _decode_sextant(line.text)
+            sextant_t2a = _decode_sextant(line.text, True)
 
         if has_selected_entry and sextant is not None:
             snapshot.runes[snapshot.selected_index].x = sextant[0]
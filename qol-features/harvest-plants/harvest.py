@@ -18,7 +18,13 @@ from System.Collections.Generic import List as CList  # type: ignore
 from System import Int32  # type: ignore
 from typing import List, Tuple, Dict, Any, Optional
 from enum import Enum
+import os
 import re
+import sys
+
+# Load local modules
+sys.path.append(os.path.dirname(__file__))
+from gump_layout import GumpLayout
 
 
 COLORS = [0, 33, 1645, 43, 1135, 56, 2213, 66, 1435, 5, 1341, 16, 13, 1166, 1173, 1158, 1161, 1153, 1109]
@@ -245,18 +251,17 @@ class GardeningGumps:
     def is_main(gd: Gumps.GumpData) -> Optional[Dict[str, Any]]:
         if not gd.gumpLayout.startswith("{ resizepic 50 50 3600 200 150 }{ tilepic 45 45 3311 }"):
             return
-        lines = list(map(lambda s: s.strip("{} "), gd.gumpLayout.split("}{")))
-        match = re.search(r"tilepichue \d+ \d+ (\d+) (\d+)", lines[5])
-        plant = None
-        color = None
-        if match is not None:
-            plant = int(match.group(1))
-            color = int(match.group(2))
-        match = re.search(r"tilepic \d+ \d+ (\d+)", lines[5])
-        if match is not None:
-            plant = int(match.group(1))
+        layout = GumpLayout.parse(gd)
+        if len(layout.entries) <= 5:
+            return
+        line = layout.entries[5]
+        if line.cmd == "tilepichue" and len(line.args) >= 4:
+            plant = int(line.args[2])
+            color = int(line.args[3])
+        elif line.cmd == "tilepic" and len(line.args) >= 3:
+            plant = int(line.args[2])
             color = 0
-        if plant is None or color is None:
+        else:
             return
         return {"id": gd.gumpId, "plant": plant, "color": color, "day": int(gd.gumpData[21])}
 
@@ -269,15 +274,9 @@ class GardeningGumps:
 
         # Extract the seed color from the gump layout
         seed_color = None
-        for line in gd.gumpLayout.strip("{} ").split("}{"):
-            line = line.strip()
-            args = line.split(" ")
-            if line.startswith("text 199 116"):
-                match = re.search(r"text 199 116 (\d+) \d+", line)
-                if match is None:
-                    continue
-                seed_color = int(match.group(1))
-                break
+        line = GumpLayout.parse(gd).first("text", 199, 116)
+        if line is not None:
+            seed_color = int(line.args[2])
 
         if gd.gumpData[6] == "3169" and gd.gumpData[7] == "/":
             text_res = gd.gumpData[11]
@@ -1,5 +1,4 @@
-ACTION_DELAY = 900  # Delay between item moves in milliseconds
-RETRY_DELAY = 250  # Delay between re-trials to move each item
+ACTION_DELAY = 900  # Initial delay between item moves in milliseconds, adapted to the pace of the server
 MAX_TRIAL = 3  # Maximum number of trials to move items
 
 
@@ -9,8 +8,15 @@ MAX_TRIAL = 3  # Maximum number of trials to move items
 
 from AutoComplete import *
 from typing import Tuple, Optional
+import os
+import sys
 import re
 
+# Ensure we can import from the current directory
+sys.path.append(os.path.dirname(__file__))
+
+from move_queue import MoveJob, MoveQueue
+
 
 GUMP_MAIN = hash("MoveItemMainGump") & 0xFFFFFFFF
 GUMP_PROMPT = hash("MoveItemPromptGump") & 0xFFFFFFFF
@@ -145,6 +151,13 @@ def find_topmost_obj(obj: "Item") -> Optional["Item"]:
     return obj
 
 
+def on_move_done(job: MoveJob):
+    if job.status == MoveJob.FAILED:
+        item = Items.FindBySerial(job.serial)
+        name = item.Name if item is not None else hex(job.serial)
+        Misc.SendMessage(f"Failed to move item {name} after {job.attempts} trials.", 0x21)
+
+
 def move_items():
     # Obtain the source container
     src_cont = find_by_target("Choose the source container.", 0x47E)
@@ -189,6 +202,7 @@ def move_items():
     # Move items from source to destination
     num_total = len(src_cont.Contains)
     Misc.SendMessage(f"Moving {num_total} items...", 68)
+    executor = MoveQueue(delay=ACTION_DELAY, max_attempts=MAX_TRIAL)
     for i, item in enumerate(src_cont.Contains):
         item = Items.FindBySerial(item.Serial)
         if item is None:
@@ -227,30 +241,17 @@ def move_items():
             item_count = int(matchres.group(1))
             max_count = int(matchres.group(2))
             break
-        if item_count >= max_count:
+        # The moves still in flight are not reflected in the properties yet.
+        if item_count + len(executor) >= max_count:
             Misc.SendMessage(f"Moving {i + 1} of {num_total}: The target container is full!", 33)
             continue
         
         Misc.SendMessage(f"Moving {i + 1} of {num_total}: {to_proper_case(item.Name)}", 68)
-        for trial in range(MAX_TRIAL + 1):
-            if trial == MAX_TRIAL:
-                Misc.SendMessage(f"Failed to move item {item.Name} after {MAX_TRIAL} trials.", 0x21)
-                break
-
-            if preserve_pos:
-                x, y = item.Position.X, item.Position.Y
-                Items.Move(item.Serial, dst_cont.Serial, -1, x, y)
-            else:
-                Items.Move(item.Serial, dst_cont.Serial, -1)
-            Misc.Pause(ACTION_DELAY)
-
-            item_moved = Items.FindBySerial(item.Serial)
-            if item_moved is None:
-                break
-            if item_moved.Container != src_cont.Serial:
-                break
-            Misc.Pause(RETRY_DELAY)
+        x, y = (item.Position.X, item.Position.Y) if preserve_pos else (None, None)
+        executor.submit(MoveJob(item.Serial, dst_cont.Serial, -1, x, y, on_done=on_move_done))
 
+    executor.drain()
+    Misc.SendMessage(executor.report(), 68)
     Misc.SendMessage("Operation finished!", 68)
 
 
@@ -0,0 +1,173 @@
+from AutoComplete import *
+from typing import Dict, List, Optional, Tuple
+import re
+
+
+VERSION_GUMP_LAYOUT = "1.0.0"
+"""The version of the gump layout module. The copies of this module in the other scripts are kept identical."""
+
+
+################################################################################
+# Gump Layout
+################################################################################
+
+
+class GumpEntry:
+    """
+    A single command of a gump layout, such as `text 20 84 0 3`.
+
+    Attributes:
+        index (int): The position of the command in the layout.
+        page (int): The page the command belongs to.
+        cmd (str): The lowercase name of the command.
+        args (List[str]): The arguments of the command, as written in the layout.
+        x, y (Optional[int]): The position of the command, if it is placed in the gump.
+        cliloc (Optional[int]): The cliloc number shown by the command, if any.
+        cliloc_args (Optional[str]): The arguments of the cliloc without the enclosing "@", if any.
+        text_index (Optional[int]): The index of the text shown by the command in the string list, if any.
+        text (Optional[str]): The text shown by the command, if its index is in the string list.
+    """
+
+    __slots__ = ("index", "page", "cmd", "args", "x", "y", "cliloc", "cliloc_args", "text_index", "text")
+
+    def __init__(self, index: int, page: int, cmd: str, args: List[str]):
+        self.index = index
+        self.page = page
+        self.cmd = cmd
+        self.args = args
+        self.x: Optional[int] = None
+        self.y: Optional[int] = None
+        self.cliloc: Optional[int] = None
+        self.cliloc_args: Optional[str] = None
+        self.text_index: Optional[int] = None
+        self.text: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return f"GumpEntry({self.index}: {self.cmd} {' '.join(self.args)})"
+
+
+class GumpLayout:
+    """
+    The commands of a gump, tokenized once and indexed by command, by position and by cliloc.
+
+    Use `parse` to obtain the layout of a gump, which reuses the previous result while the gump is unchanged,
+    and query it with `select`, `first` and `text_at` instead of scanning the layout lines.
+    """
+
+    # The commands which are placed at (x, y) by their first two arguments
+    PLACED = {"button", "buttontileart", "checkbox", "checkertrans", "croppedtext", "gumppic", "gumppichued", "gumppictiled", "htmlgump", "radio", "resizepic", "text", "textentry", "textentrylimited", "tilepic", "tilepichue", "xmfhtmlgump", "xmfhtmlgumpcolor", "xmfhtmltok"}
+    # The argument which holds the index of the text, by command
+    TEXT_ARG = {"text": 3, "croppedtext": 5, "htmlgump": 4, "textentry": 6, "textentrylimited": 6}
+    # The argument which holds the cliloc number, by command
+    CLILOC_ARG = {"xmfhtmlgump": 4, "xmfhtmlgumpcolor": 4, "xmfhtmltok": 7, "tooltip": 0}
+
+    # The number of gumps whose layouts are kept by `parse`
+    CACHE_SIZE = 32
+
+    _pattern = re.compile(r"\{\s*([^}]*?)\s*\}")
+    _cache: Dict[int, Tuple[str, Tuple[str, ...], "GumpLayout"]] = {}
+
+    entries: List[GumpEntry]
+    by_cmd: Dict[str, List[GumpEntry]]
+    by_pos: Dict[Tuple[int, int], List[GumpEntry]]
+    by_cliloc: Dict[int, List[GumpEntry]]
+
+    def __init__(self, layout: str, strings: List[str]):
+        self.entries = []
+        self.by_cmd = {}
+        self.by_pos = {}
+        self.by_cliloc = {}
+        page = 0
+        for index, matchres in enumerate(self._pattern.finditer(layout)):
+            args = matchres.group(1).split()
+            cmd = args.pop(0).lower() if args else ""
+            entry = GumpEntry(index, page, cmd, args)
+            self.entries.append(entry)
+            self.by_cmd.setdefault(cmd, []).append(entry)
+            try:
+                if cmd == "page":
+                    page = entry.page = int(args[0])
+                if cmd in self.PLACED:
+                    entry.x, entry.y = int(args[0]), int(args[1])
+                    self.by_pos.setdefault((entry.x, entry.y), []).append(entry)
+                if cmd in self.TEXT_ARG:
+                    entry.text_index = int(args[self.TEXT_ARG[cmd]])
+                    if 0 <= entry.text_index < len(strings):
+                        entry.text = strings[entry.text_index]
+                if cmd in self.CLILOC_ARG:
+                    n = self.CLILOC_ARG[cmd]
+                    entry.cliloc = int(args[n])
+                    if len(args) > n + 1:
+                        entry.cliloc_args = " ".join(args[n + 1 :]).strip("@")
+                    self.by_cliloc.setdefault(entry.cliloc, []).append(entry)
+            except (IndexError, ValueError):
+                # An incomplete command, which keeps the fields read so far
+                continue
+
+    @classmethod
+    def parse(cls, gd: "Gumps.GumpData") -> "GumpLayout":
+        """
+        Returns the layout of the gump, which is tokenized again only if its layout or texts have changed
+        since the last call for the same gump ID.
+        """
+        layout = gd.gumpLayout or ""
+        strings = tuple(gd.stringList or [])
+        cached = cls._cache.get(gd.gumpId)
+        if cached is not None and cached[0] == layout and cached[1] == strings:
+            return cached[2]
+        parsed = cls(layout, list(strings))
+        if len(cls._cache) >= cls.CACHE_SIZE:
+            cls._cache.clear()
+        cls._cache[gd.gumpId] = (layout, strings, parsed)
+        return parsed
+
+    def select(
+        self,
+        cmd: Optional[str] = None,
+        x: Optional[int] = None,
+        y: Optional[int] = None,
+        cliloc: Optional[int] = None,
+    ) -> List[GumpEntry]:
+        """
+        Returns the entries which match every given condition, in the order of the layout.
+        The narrowest index is looked up first, and the other conditions are checked on its entries.
+        """
+        if x is not None and y is not None:
+            candidates = self.by_pos.get((x, y), [])
+        elif cliloc is not None:
+            candidates = self.by_cliloc.get(cliloc, [])
+        elif cmd is not None:
+            candidates = self.by_cmd.get(cmd, [])
+        else:
+            candidates = self.entries
+        return [
+            entry
+            for entry in candidates
+            if (cmd is None or entry.cmd == cmd)
+            and (x is None or entry.x == x)
+            and (y is None or entry.y == y)
+            and (cliloc is None or entry.cliloc == cliloc)
+        ]
+
+    def first(
+        self,
+        cmd: Optional[str] = None,
+        x: Optional[int] = None,
+        y: Optional[int] = None,
+        cliloc: Optional[int] = None,
+    ) -> Optional[GumpEntry]:
+        """
+        Returns the first entry which matches every given condition, or None if there is none.
+        """
+        entries = self.select(cmd, x, y, cliloc)
+        return entries[0] if entries else None
+
+    def text_at(self, x: int, y: int) -> Optional[str]:
+        """
+        Returns the text shown at the position, or None if there is none.
+        If several texts share the position, the last one in the layout wins.
+        """
+        for entry in reversed(self.by_pos.get((x, y), [])):
+            if entry.text is not None:
+                return entry.text
+        return None
@@ -1,7 +1,13 @@
 from AutoComplete import *
 from typing import Optional, Tuple
 from enum import Enum
+import os
 import re
+import sys
+
+# Load local modules
+sys.path.append(os.path.dirname(__file__))
+from gump_layout import GumpLayout
 
 
 class SkillGroup(Enum):
@@ -151,53 +157,40 @@ class OldPSGumpManager:
 
     @classmethod
     def parse_gump(cls, gd: Gumps.GumpData) -> Tuple[PSBook, int, int]:
-        # Parse the gump layout to find textboxes and their positions
-        lines = gd.gumpLayout.strip("{} ").split("}{")
-        textbox_map = {}
-        for line in lines:
-            line = line.strip().split(" ")
-            if line[0] == "htmlgump":
-                if len(line) < 8:
-                    raise ValueError(f"Incomplete htmlgump line: {line}")
-                x, y, _, _, idx = map(int, line[1:6])
-                if idx >= len(gd.stringList):
-                    raise ValueError(f"Index {idx} out of range")
-                textbox_map[(x, y)] = cls.strip_html_tags(gd.stringList[idx])
-                continue
-            if line[0] == "text":
-                if len(line) < 5:
-                    raise ValueError(f"Incomplete text line: {line}")
-                x, y, color, idx = map(int, line[1:5])
-                if idx >= len(gd.stringList):
-                    raise ValueError(f"Index {idx} out of range")
-                textbox_map[(x, y)] = cls.strip_html_tags(gd.stringList[idx])
-                continue
+        # Find the textboxes by their positions
+        layout = GumpLayout.parse(gd)
+
+        def read_box(box: Tuple[int, int]) -> Optional[str]:
+            text = layout.text_at(*box)
+            return None if text is None else cls.strip_html_tags(text)
 
         ps_book = PSBook(0)  # Dummy serial=
 
         # Read the PS count
         PS_COUNT_BOX = (348, 19)
-        if PS_COUNT_BOX not in textbox_map:
+        text = read_box(PS_COUNT_BOX)
+        if text is None:
             raise ValueError("Failed to read the power scroll count from the gump.")
-        matchres = re.match(r"^Total: (\d+)/300$", textbox_map[PS_COUNT_BOX])
+        matchres = re.match(r"^Total: (\d+)/300$", text)
         if not matchres:
-            raise ValueError(f"Failed to parse power scroll count from text: {textbox_map[PS_COUNT_BOX]}")
+            raise ValueError(f"Failed to parse power scroll count from text: {text}")
         ps_book.count = int(matchres.group(1))
 
         # Read the page
         PAGE_BOX = (12, 480)
-        if PAGE_BOX not in textbox_map:
+        text = read_box(PAGE_BOX)
+        if text is None:
             raise ValueError("Failed to read the page number from the gump.")
-        matchres = re.match(r"^Page (\d+)/(\d+)$", textbox_map[PAGE_BOX])
+        matchres = re.match(r"^Page (\d+)/(\d+)$", text)
         if not matchres:
-            raise ValueError(f"Failed to parse page number from text: {textbox_map[PAGE_BOX]}")
+            raise ValueError(f"Failed to parse page number from text: {text}")
         page = int(matchres.group(1))
         max_page = int(matchres.group(2))
 
         def parse_skill_value(box):
-            if box not in textbox_map:
+            val_str = read_box(box)
+            if val_str is None:
                 raise ValueError(f"Failed to read skill value from box {box}")
-            val_str = textbox_map[box]
             return int(val_str)
 
         for i in range(14):
@@ -208,9 +201,9 @@ class OldPSGumpManager:
             SKILL_115_BOX = (408, y)
             SKILL_120_BOX = (491, y)
 
-            if SKILL_NAME_BOX not in textbox_map:
+            skill_name = read_box(SKILL_NAME_BOX)
+            if skill_name is None:
                 continue
-            skill_name = textbox_map[SKILL_NAME_BOX]
             if skill_name not in ps_book.SKILL_LIST:
                 continue
 
@@ -1,6 +1,12 @@
 from AutoComplete import *
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
+import os
 import re
+import sys
+
+# Load local modules
+sys.path.append(os.path.dirname(__file__))
+from gump_layout import GumpEntry, GumpLayout
 
 
 class LockerEntry:
@@ -87,104 +93,94 @@ class LockerReader:
         page_max = 0
         count = 0
         maps = status.maps
-        for line in gd.layoutPieces:
-            args = line.split(" ")
-            if line.startswith("xmfhtmltok 35 430 280 20 0 0 17183 1153560"):
-                count, _ = map(int, args[9].strip("@").split("@"))
-                status.count = count
-                continue
-            if line.startswith("xmfhtmltok 35 450 280 20 0 0 17183 1153561"):
-                page, page_max = map(int, args[9].strip("@").split("@"))
-                status.page = page
-                status.page_max = page_max
-                continue
-
-            # Match facet
-            matchres = re.match(r"xmfhtmlgumpcolor 78 (\d+) 110 20 (\d+) 0 0 32752", line)
-            if matchres:
-                y = int(matchres.group(1))
-                idx = (page - 1) * 10 + (y - 73) // 35
-                entry = maps.setdefault(idx, LockerEntry())
-
-                facet = int(matchres.group(2))
-                if facet == 1012001:  # Felucca
-                    entry.facet = 0
-                elif facet == 1012000:  # Trammel
-                    entry.facet = 1
-                elif facet == 1012002:  # Ilshenar
-                    entry.facet = 2
-                elif facet == 1060643:  # Malas
-                    entry.facet = 3
-                elif facet == 1063258:  # Tokuno Islands
-                    entry.facet = 4
-                elif facet == 1112178:  # Ter Mur
-                    entry.facet = 5
-                elif facet == 1156262:  # Valley of Eodon (verification needed)
-                    entry.facet = 5
-
-            # Match coordinates
-            matchres = re.match(r"xmfhtmltok 198 (\d+) 140 20 0 0 32752 1060847 @(\d+), (\d+)@", line)
+        layout = GumpLayout.parse(gd)
+
+        line = layout.first("xmfhtmltok", 35, 430, 1153560)
+        if line is not None:
+            count, _ = map(int, line.cliloc_args.split("@"))
+            status.count = count
+        line = layout.first("xmfhtmltok", 35, 450, 1153561)
+        if line is not None:
+            page, page_max = map(int, line.cliloc_args.split("@"))
+            status.page = page
+            status.page_max = page_max
+
+        def get_entry(line: GumpEntry) -> LockerEntry:
+            idx = (page - 1) * 10 + (line.y - 73) // 35
+            return maps.setdefault(idx, LockerEntry())
+
+        def column(x: int) -> List[GumpEntry]:
+            # The cells of the entries, excluding the column titles
+            return [line for line in layout.select("xmfhtmlgumpcolor", x=x) if line.args[-1] == "32752"]
+
+        # Match facet
+        for line in column(78):
+            entry = get_entry(line)
+            facet = line.cliloc
+            if facet == 1012001:  # Felucca
+                entry.facet = 0
+            elif facet == 1012000:  # Trammel
+                entry.facet = 1
+            elif facet == 1012002:  # Ilshenar
+                entry.facet = 2
+            elif facet == 1060643:  # Malas
+                entry.facet = 3
+            elif facet == 1063258:  # Tokuno Islands
+                entry.facet = 4
+            elif facet == 1112178:  # Ter Mur
+                entry.facet = 5
+            elif facet == 1156262:  # Valley of Eodon (verification needed)
+                entry.facet = 5
+
+        # Match coordinates
+        for line in layout.select("xmfhtmltok", x=198, cliloc=1060847):
+            matchres = re.match(r"(\d+), (\d+)$", line.cliloc_args or "")
             if matchres:
-                y = int(matchres.group(1))
-                idx = (page - 1) * 10 + (y - 73) // 35
-                entry = maps.setdefault(idx, LockerEntry())
-
-                pos_x = int(matchres.group(2))
-                pos_y = int(matchres.group(3))
+                entry = get_entry(line)
+                pos_x = int(matchres.group(1))
+                pos_y = int(matchres.group(2))
                 entry.coords = (pos_x, pos_y)
 
-            # Match type
-            matchres = re.match(r"xmfhtmlgumpcolor 410 (\d+) 110 20 (\d+) 0 0 32752", line)
-            if matchres:
-                y = int(matchres.group(1))
-                idx = (page - 1) * 10 + (y - 73) // 35
-                entry = maps.setdefault(idx, LockerEntry())
-
-                map_type = int(matchres.group(2))
-                if map_type == 1158997:  # Mage's
-                    entry.type = "Mage"
-                elif map_type == 1158998:  # Assassin's
-                    entry.type = "Assassin"
-                elif map_type == 1158999:  # Warrior's
-                    entry.type = "Warrior"
-                elif map_type == 1159000:  # Artisan's
-                    entry.type = "Artisan"
-                elif map_type == 1159002:  # Ranger's
-                    entry.type = "Ranger"
-
-            # Match level
-            matchres = re.match(r"xmfhtmlgumpcolor 373 (\d+) 110 20 (\d+) 0 0 32752", line)
-            if matchres:
-                y = int(matchres.group(1))
-                idx = (page - 1) * 10 + (y - 73) // 35
-                entry = maps.setdefault(idx, LockerEntry())
-
-                level = int(matchres.group(2))
-                if level == 1158992:  # Stash
-                    entry.level = "Stash"
-                elif level == 1158993:  # Supply
-                    entry.level = "Supply"
-                elif level == 1158994:  # Cache
-                    entry.level = "Cache"
-                elif level == 1158995:  # Hoard
-                    entry.level = "Hoard"
-                elif level == 1158996:  # Trove
-                    entry.level = "Trove"
-
-            # Match status
-            matchres = re.match(r"xmfhtmlgumpcolor 473 (\d+) 150 20 (\d+) 0 0 32752", line)
-            if matchres:
-                y = int(matchres.group(1))
-                idx = (page - 1) * 10 + (y - 73) // 35
-                entry = maps.setdefault(idx, LockerEntry())
-
-                decode_status = int(matchres.group(2))
-                if decode_status == 1153580:  # Not Decoded
-                    entry.status = "Not Decoded"
-                elif decode_status == 1153581:  # Decoded
-                    entry.status = "Decoded"
-                elif decode_status == 1153582:  # Completed
-                    entry.status = "Completed"
+        # Match type
+        for line in column(410):
+            entry = get_entry(line)
+            map_type = line.cliloc
+            if map_type == 1158997:  # Mage's
+                entry.type = "Mage"
+            elif map_type == 1158998:  # Assassin's
+                entry.type = "Assassin"
+            elif map_type == 1158999:  # Warrior's
+                entry.type = "Warrior"
+            elif map_type == 1159000:  # Artisan's
+                entry.type = "Artisan"
+            elif map_type == 1159002:  # Ranger's
+                entry.type = "Ranger"
+
+        # Match level
+        for line in column(373):
+            entry = get_entry(line)
+            level = line.cliloc
+            if level == 1158992:  # Stash
+                entry.level = "Stash"
+            elif level == 1158993:  # Supply
+                entry.level = "Supply"
+            elif level == 1158994:  # Cache
+                entry.level = "Cache"
+            elif level == 1158995:  # Hoard
+                entry.level = "Hoard"
+            elif level == 1158996:  # Trove
+                entry.level = "Trove"
+
+        # Match status
+        for line in column(473):
+            entry = get_entry(line)
+            decode_status = line.cliloc
+            if decode_status == 1153580:  # Not Decoded
+                entry.status = "Not Decoded"
+            elif decode_status == 1153581:  # Decoded
+                entry.status = "Decoded"
+            elif decode_status == 1153582:  # Completed
+                entry.status = "Completed"
 
     @classmethod
     def read_all(cls) -> Optional[LockerStatus]:
@@ -1,3 +1,5 @@
 from .gumpradio import GumpBuilder
 from .gumpradio.templates import CraftingGumpBuilder
-from .core import *
\ No newline at end of file
+from .core import *
+from .move_queue import MoveJob, MoveQueue
+from .item_cache import ITEM_CACHE, ItemPropCache
\ No newline at end of file
@@ -0,0 +1,240 @@
+from AutoComplete import *
+from typing import Callable, Deque, Dict, List, Optional
+from collections import deque
+import time
+
+
+VERSION_MOVE_QUEUE = "1.1.0"
+"""The version of the move queue module. The copies of this module in the other scripts are kept identical."""
+
+
+################################################################################
+# Move Queue
+################################################################################
+
+
+class MoveJob:
+    """
+    A single item move, with its outcome once it is finished.
+    """
+
+    PENDING = "pending"
+    MOVED = "moved"
+    FAILED = "failed"
+
+    def __init__(
+        self,
+        serial: int,
+        dest: int,
+        amount: int = -1,
+        x: Optional[int] = None,
+        y: Optional[int] = None,
+        on_done: Optional[Callable[["MoveJob"], None]] = None,
+    ):
+        self.serial = serial
+        self.dest = dest
+        self.amount = amount
+        self.x = x
+        self.y = y
+        self.on_done = on_done
+        self.status = MoveJob.PENDING
+        """This stores the outcome of the move."""
+        self.attempts = 0
+        """This stores the number of times the move was issued."""
+        self.latency: Optional[float] = None
+        """This stores the time between the last issue and the acknowledgement of the move, in milliseconds."""
+        self.source: Optional[int] = None
+        self.issued_at = 0.0
+
+
+class MoveQueue:
+    """
+    A move executor which paces the moves by the responses of the server, instead of sleeping for a fixed delay after each move.
+
+    Up to `window` moves are kept in flight. A move is acknowledged when the item leaves its source container,
+    or disappears because it was merged into a stack. The delay between two moves shrinks a little after each
+    acknowledgement, and grows by a quarter whenever the server answers "You must wait to perform another action",
+    so the moves settle at the actual rate limit of the server. The last move issued before such an answer,
+    and any move not acknowledged in time, is issued again, up to `max_attempts` times in total.
+    A move refused by the server, e.g., into a full container, fails at once without being issued again.
+
+    The executor runs in the calling thread: `submit` returns once the move is issued, and `drain` waits for all moves.
+
+    Attributes:
+        window (int): The maximum number of moves in flight.
+        delay (float): The current delay between two moves, in milliseconds.
+        min_delay (float): The lower bound of the delay.
+        max_delay (float): The upper bound of the delay.
+        ack_timeout (float): The time after which an unacknowledged move is considered rejected, in milliseconds.
+        max_attempts (int): The maximum number of times a move is issued.
+        finished (List[MoveJob]): The finished moves, in the order they finished.
+        waits (int): The number of "You must wait" responses seen.
+        rejects (int): The number of moves refused by the server.
+    """
+
+    WAIT_MESSAGE = "You must wait to perform another action"
+    REJECT_MESSAGES = (
+        "That container cannot hold more items",
+        "That container cannot hold more weight",
+        "You cannot pick that up",
+        "You can not pick that up",
+    )
+    POLL_INTERVAL = 25
+    SPEED_UP = 0.95
+    SLOW_DOWN = 1.25
+
+    def __init__(
+        self,
+        delay: float = 600,
+        window: int = 2,
+        min_delay: float = 250,
+        max_delay: float = 2000,
+        ack_timeout: float = 1500,
+        max_attempts: int = 3,
+    ):
+        self.window = window
+        self.delay = delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.ack_timeout = ack_timeout
+        self.max_attempts = max_attempts
+        self.pending: Deque[MoveJob] = deque()
+        self.in_flight: List[MoveJob] = []
+        self.finished: List[MoveJob] = []
+        self.waits = 0
+        self.rejects = 0
+        self._last_issue = 0.0
+        self._journal_time = time.time()
+
+    def __len__(self) -> int:
+        return len(self.pending) + len(self.in_flight)
+
+    def submit(self, job: MoveJob) -> MoveJob:
+        """
+        Queue a move, and return once every queued move has been issued.
+        """
+        self.pending.append(job)
+        while self.pending:
+            self.step()
+        return job
+
+    def move(self, serial: int, dest: int, amount: int = -1, x: Optional[int] = None, y: Optional[int] = None) -> MoveJob:
+        """
+        Move a single item and wait for the outcome.
+        """
+        job = self.submit(MoveJob(serial, dest, amount, x, y))
+        while job.status == MoveJob.PENDING:
+            self.step()
+        return job
+
+    def drain(self) -> List[MoveJob]:
+        """
+        Wait until all the moves are finished, and return the finished moves.
+        """
+        while self:
+            self.step()
+        return self.finished
+
+    def step(self) -> None:
+        """
+        Check the responses, issue the next move if the window and the pace allow it, or wait a moment.
+        """
+        now = time.monotonic()
+        self._check_in_flight(now)
+        self._check_journal()
+        if self.pending and len(self.in_flight) < self.window and (now - self._last_issue) * 1000 >= self.delay:
+            self._issue(self.pending.popleft(), now)
+            return
+        Misc.Pause(self.POLL_INTERVAL)
+
+    def _issue(self, job: MoveJob, now: float) -> None:
+        item = Items.FindBySerial(job.serial)
+        if item is None:
+            self._finish(job, MoveJob.FAILED, now)
+            return
+        if job.source is None:
+            job.source = item.Container
+        job.attempts += 1
+        job.issued_at = now
+        self._last_issue = now
+        if job.x is not None and job.y is not None:
+            Items.Move(job.serial, job.dest, job.amount, job.x, job.y)
+        else:
+            Items.Move(job.serial, job.dest, job.amount)
+        self.in_flight.append(job)
+
+    def _check_journal(self) -> None:
+        entries = Journal.GetJournalEntry(self._journal_time)
+        if not entries:
+            return
+        self._journal_time = max(entry.Timestamp for entry in entries)
+        for entry in entries:
+            if self.in_flight and any(message in entry.Text for message in self.REJECT_MESSAGES):
+                # The server answered the last move, so it fails without a retry or a slowdown
+                self.rejects += 1
+                job = max(self.in_flight, key=lambda job: job.issued_at)
+                self.in_flight.remove(job)
+                self._finish(job, MoveJob.FAILED, time.monotonic())
+                continue
+            if self.WAIT_MESSAGE not in entry.Text:
+                continue
+            self.waits += 1
+            self.delay = min(self.max_delay, self.delay * self.SLOW_DOWN)
+            if self.in_flight:
+                self._retry(max(self.in_flight, key=lambda job: job.issued_at), time.monotonic())
+
+    def _check_in_flight(self, now: float) -> None:
+        for job in list(self.in_flight):
+            item = Items.FindBySerial(job.serial)
+            if item is None or item.Container != job.source:
+                self.in_flight.remove(job)
+                self.delay = max(self.min_delay, self.delay * self.SPEED_UP)
+                self._finish(job, MoveJob.MOVED, now)
+                continue
+            if (now - job.issued_at) * 1000 < self.ack_timeout:
+                continue
+            # The move got no response and was lost, so it is issued again at a slower pace.
+            self.delay = min(self.max_delay, self.delay * self.SLOW_DOWN)
+            self._retry(job, now)
+
+    def _retry(self, job: MoveJob, now: float) -> None:
+        self.in_flight.remove(job)
+        if job.attempts >= self.max_attempts:
+            self._finish(job, MoveJob.FAILED, now)
+        else:
+            self.pending.appendleft(job)
+
+    def _finish(self, job: MoveJob, status: str, now: float) -> None:
+        job.status = status
+        if status == MoveJob.MOVED:
+            job.latency = (now - job.issued_at) * 1000
+        self.finished.append(job)
+        if job.on_done is not None:
+            job.on_done(job)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return the counts of the finished moves and the latency of the acknowledged moves.
+        """
+        latencies = sorted(job.latency for job in self.finished if job.latency is not None)
+        moved = len(latencies)
+        return {
+            "moved": moved,
+            "failed": len(self.finished) - moved,
+            "retries": sum(job.attempts - 1 for job in self.finished if job.attempts > 1),
+            "waits": self.waits,
+            "rejects": self.rejects,
+            "latency-avg": sum(latencies) / moved if moved else 0.0,
+            "latency-p95": latencies[min(moved - 1, int(moved * 0.95))] if moved else 0.0,
+            "delay": self.delay,
+        }
+
+    def report(self) -> str:
+        """
+        Summarize the stats in a single line.
+        """
+        stats = self.stats()
+        return (
+            f"Moved {stats['moved']}, failed {stats['failed']}, retried {stats['retries']}. "
+            f"Latency {stats['latency-avg']:.0f} ms (p95 {stats['latency-p95']:.0f} ms), pace {stats['delay']:.0f} ms."
+        )
@@ -5,6 +5,7 @@ VERSION = "1.1"
 SETTING_DIR = "Data/Sorter/"
 
 MOVE_DELAY = 1000
+PLAN_MOVES = True
 
 ################################################################################
 # Imports
@@ -121,6 +122,338 @@ class SortRules:
             yield top_cont
 
 
+################################################################################
+# Container Index
+
+
+class ContainerIndex:
+    """
+    An index of the sortbags of each rule set within reach, built once per sort pass.
+
+    Rule sets whose container rules only name serials (as created by `Sorter.scan_rule_set`) are resolved directly.
+    The other rule sets share a single scan of the known items, and the top container of each match is resolved once.
+    The sortbags in reach are recomputed only when the player moves, and the items are scanned again only if
+    an indexed sortbag disappeared, or if a rule set has no sortbag in reach after the player moved.
+    """
+
+    REACH = 2
+    """The maximum distance to the top container of a sortbag."""
+
+    def __init__(self, rule_sets: List[SortRules]):
+        self.rule_sets = [rule_set for rule_set in rule_sets if rule_set.enabled]
+        self.roots: Dict[SortRules, List[int]] = {}
+        """This stores the serials of the top containers of the sortbags of each rule set, regardless of the distance."""
+        self._in_reach: Dict[SortRules, List[int]] = {}
+        self._position: Optional[Tuple[int, int, int]] = None
+        self._scan_position: Optional[Tuple[int, int, int]] = None
+        self._stale = True
+
+    @staticmethod
+    def _direct_serials(rule_set: SortRules) -> Optional[List[int]]:
+        """
+        Return the serials named by the container rules, or `None` if any rule needs to be tested against the items.
+        """
+        serials = []
+        for match in rule_set.cont_rules:
+            if isinstance(match, SingleSerialMatch):
+                serials.append(match.serial)
+            elif isinstance(match, SerialMatch):
+                serials.extend(sorted(match.serial))
+            else:
+                return None
+        return serials
+
+    @staticmethod
+    def _top_container(item: "Item", cache: Dict[int, Optional[int]]) -> Optional[int]:
+        """
+        Return the serial of the top container of the item if it is on the ground, resolving each root only once.
+        """
+        if item.RootContainer == 0:
+            return item.Serial if item.OnGround else None
+        if item.RootContainer not in cache:
+            top_cont = Items.FindBySerial(item.RootContainer)
+            cache[item.RootContainer] = top_cont.Serial if top_cont is not None and top_cont.OnGround else None
+        return cache[item.RootContainer]
+
+    def scan(self) -> None:
+        """
+        Find the top containers of the sortbags of all rule sets.
+        """
+        self.roots.clear()
+        cache: Dict[int, Optional[int]] = {}
+        scanned: List[SortRules] = []
+        for rule_set in self.rule_sets:
+            serials = self._direct_serials(rule_set)
+            if serials is None:
+                scanned.append(rule_set)
+                continue
+            roots = self.roots[rule_set] = []
+            for serial in serials:
+                item = Items.FindBySerial(serial)
+                top_serial = self._top_container(item, cache) if item is not None else None
+                if top_serial is not None and top_serial not in roots:
+                    roots.append(top_serial)
+
+        if scanned:
+            for rule_set in scanned:
+                self.roots[rule_set] = []
+            filter = Items.Filter()
+            filter.Enabled = True
+            for item in Items.ApplyFilter(filter):
+                matching = [rule_set for rule_set in scanned if any(match.test(item) for match in rule_set.cont_rules)]
+                if not matching:
+                    continue
+                top_serial = self._top_container(item, cache)
+                if top_serial is None:
+                    continue
+                for rule_set in matching:
+                    if top_serial not in self.roots[rule_set]:
+                        self.roots[rule_set].append(top_serial)
+
+        self._stale = False
+        self._position = None
+        self._scan_position = (Player.Map, Player.Position.X, Player.Position.Y)
+
+    def _update_reach(self) -> None:
+        """
+        Recompute the sortbags in reach, if the player moved.
+        """
+        position = (Player.Map, Player.Position.X, Player.Position.Y)
+        if position == self._position:
+            return
+        self._position = position
+        self._in_reach.clear()
+        for rule_set, roots in self.roots.items():
+            in_reach = self._in_reach[rule_set] = []
+            for serial in roots:
+                top_cont = Items.FindBySerial(serial)
+                if top_cont is None or not top_cont.OnGround:
+                    self._stale = True
+                    continue
+                if Player.DistanceTo(top_cont) <= self.REACH:
+                    in_reach.append(serial)
+
+    def _resolve(self, rule_set: SortRules) -> List["Item"]:
+        """
+        Look up the sortbags of the rule set in reach, and mark the index stale if any of them disappeared.
+        """
+        result = []
+        for serial in self._in_reach.get(rule_set, ()):
+            top_cont = Items.FindBySerial(serial)
+            if top_cont is None or not top_cont.OnGround:
+                self._stale = True
+                continue
+            result.append(top_cont)
+        return result
+
+    def find_contall(self, rule_set: SortRules) -> List["Item"]:
+        """
+        Find the top containers of the sortbags of the rule set within reach. See `SortRules.find_contall`.
+        """
+        self._update_reach()
+        result = self._resolve(rule_set) if not self._stale else []
+        if self._stale or (not result and self._scan_position != self._position):
+            self.scan()
+            self._update_reach()
+            result = self._resolve(rule_set)
+        return result
+
+
+################################################################################
+# Rule Set Dispatch
+
+
+class RuleSetIndex:
+    """
+    A dispatch index from items to the rule sets whose sort rules match them, built from all enabled rule sets.
+
+    Serial and type matches (also through presets) are indexed in hash maps by serial, by (item ID, color) and by item ID,
+    so an item is only tested against the remaining name and preset matches. The rule sets are returned in their original order,
+    so the result is the same as testing every rule set in turn.
+    """
+
+    MAX_PRESET_DEPTH = 8
+    """The maximum depth of presets referring to presets, beyond which a preset match is tested as is."""
+
+    def __init__(self, rule_sets: List[SortRules]):
+        self.rule_sets = [rule_set for rule_set in rule_sets if rule_set.enabled]
+        self.by_serial: Dict[int, Set[int]] = {}
+        """This stores the positions of the rule sets matching each serial."""
+        self.by_type: Dict[Tuple[int, int], Set[int]] = {}
+        """This stores the positions of the rule sets matching each (item ID, color)."""
+        self.by_itemid: Dict[int, Set[int]] = {}
+        """This stores the positions of the rule sets matching each item ID of any color."""
+        self.residual: List[Tuple[int, BaseMatch]] = []
+        """This stores the matches which cannot be indexed, with the positions of their rule sets."""
+        for pos, rule_set in enumerate(self.rule_sets):
+            for match in rule_set.sort_rules:
+                self._add(pos, match, 0)
+
+    def _add(self, pos: int, match: BaseMatch, depth: int) -> None:
+        if isinstance(match, SingleSerialMatch):
+            self.by_serial.setdefault(match.serial, set()).add(pos)
+        elif isinstance(match, SerialMatch):
+            for serial in match.serial:
+                self.by_serial.setdefault(serial, set()).add(pos)
+        elif isinstance(match, SingleTypeMatch):
+            if match.color is None:
+                self.by_itemid.setdefault(match.itemid, set()).add(pos)
+            else:
+                self.by_type.setdefault((match.itemid, match.color), set()).add(pos)
+        elif isinstance(match, TypeMatch):
+            for itemid in match.itemid:
+                if not match.color:
+                    self.by_itemid.setdefault(itemid, set()).add(pos)
+                    continue
+                for color in match.color:
+                    self.by_type.setdefault((itemid, color), set()).add(pos)
+        elif isinstance(match, PresetMatch) and match.preset in PRESETS and depth < self.MAX_PRESET_DEPTH:
+            self._add(pos, PRESETS[match.preset], depth + 1)
+        else:
+            self.residual.append((pos, match))
+
+    def match(self, item: "Item") -> List[SortRules]:
+        """
+        Return the enabled rule sets whose sort rules match the item, in their original order.
+        """
+        positions: Set[int] = set()
+        positions.update(self.by_serial.get(item.Serial, ()))
+        positions.update(self.by_type.get((item.ItemID, item.Color), ()))
+        positions.update(self.by_itemid.get(item.ItemID, ()))
+        for pos, match in self.residual:
+            if pos not in positions and match.test(item):
+                positions.add(pos)
+        return [self.rule_sets[pos] for pos in sorted(positions)]
+
+
+################################################################################
+# Sort Planner
+
+
+class SortPlan:
+    """
+    The moves planned for a sort pass.
+    """
+
+    def __init__(self):
+        self.moves: List[Tuple["Item", SortRules, int]] = []
+        """This stores the item, the rule set and the serial of the sortbag of each move, in the order of the items."""
+        self.unplaced: List[Tuple["Item", str]] = []
+        """This stores the items matched by a rule set which cannot be placed anywhere, with the reason."""
+
+
+class SortPlanner:
+    """
+    Plans all the moves of a sort pass before issuing any, by packing the items into the sortbags
+    within their item count and weight limits.
+
+    Each item may go into the sortbags of the rule sets matching it, preferring earlier rule sets
+    and earlier sortbags, as `Sorter.move_item` does. The packing runs in two passes:
+    1. The items with the fewest candidate sortbags are placed first, and heavier items first among those,
+       each into its most preferred sortbag with room left.
+    2. Each item left over is placed into a full candidate sortbag, if one of the items there can be
+       relocated into another of its own candidate sortbags to make room.
+    """
+
+    def __init__(self, dispatch: RuleSetIndex, index: ContainerIndex, ledger: "Sorter.CapacityLedger"):
+        self.dispatch = dispatch
+        self.index = index
+        self.ledger = ledger
+        self.count_left: Dict[int, int] = {}
+        """This stores the number of items each sortbag can still take."""
+        self.weight_left: Dict[int, float] = {}
+        """This stores the weight each sortbag can still take."""
+
+    def _add_bin(self, serial: int) -> None:
+        if serial in self.count_left:
+            return
+        info = self.ledger.get(serial)
+        if info is None:
+            self.count_left[serial] = 0
+            self.weight_left[serial] = 0
+            return
+        self.count_left[serial] = info.max_contents - info.contents
+        self.weight_left[serial] = info.max_weight - info.weight
+
+    def _fits(self, item: "Item", serial: int) -> bool:
+        return self.count_left[serial] >= 1 and self.weight_left[serial] >= item.Weight
+
+    def _place(self, item: "Item", serial: int, sign: int = 1) -> None:
+        self.count_left[serial] -= sign
+        self.weight_left[serial] -= sign * item.Weight
+
+    def plan(self, items: List["Item"]) -> SortPlan:
+        """
+        Assign the items to the sortbags. The items not matched by any rule set are left out.
+        """
+        plan = SortPlan()
+        candidates: Dict[int, List[Tuple[SortRules, int]]] = {}
+        placeable: List["Item"] = []
+        for item in items:
+            rule_sets = self.dispatch.match(item)
+            if not rule_sets:
+                continue
+            options: List[Tuple[SortRules, int]] = []
+            for rule_set in rule_sets:
+                for cont in self.index.find_contall(rule_set):
+                    self._add_bin(cont.Serial)
+                    if all(serial != cont.Serial for _, serial in options):
+                        options.append((rule_set, cont.Serial))
+            if not options:
+                plan.unplaced.append((item, "no sortbag in reach"))
+                continue
+            candidates[item.Serial] = options
+            placeable.append(item)
+
+        # Pass 1: the most constrained items first
+        assignment: Dict[int, Tuple[SortRules, int]] = {}
+        members: Dict[int, List["Item"]] = {}
+        leftovers: List["Item"] = []
+        for item in sorted(placeable, key=lambda item: (len(candidates[item.Serial]), -item.Weight)):
+            for rule_set, serial in candidates[item.Serial]:
+                if self._fits(item, serial):
+                    self._place(item, serial)
+                    assignment[item.Serial] = (rule_set, serial)
+                    members.setdefault(serial, []).append(item)
+                    break
+            else:
+                leftovers.append(item)
+
+        # Pass 2: make room by relocating a placed item into another of its sortbags
+        for item in leftovers:
+            if not self._relocate_for(item, candidates, assignment, members):
+                plan.unplaced.append((item, "no room left in the sortbags"))
+
+        plan.moves = [(item, *assignment[item.Serial]) for item in placeable if item.Serial in assignment]
+        return plan
+
+    def _relocate_for(
+        self,
+        item: "Item",
+        candidates: Dict[int, List[Tuple[SortRules, int]]],
+        assignment: Dict[int, Tuple[SortRules, int]],
+        members: Dict[int, List["Item"]],
+    ) -> bool:
+        for rule_set, serial in candidates[item.Serial]:
+            for other in members.get(serial, []):
+                # The sortbag must fit the item once the other item is taken out.
+                if self.weight_left[serial] + other.Weight < item.Weight:
+                    continue
+                for other_rule_set, other_serial in candidates[other.Serial]:
+                    if other_serial == serial or not self._fits(other, other_serial):
+                        continue
+                    self._place(other, serial, -1)
+                    members[serial].remove(other)
+                    self._place(other, other_serial)
+                    members.setdefault(other_serial, []).append(other)
+                    assignment[other.Serial] = (other_rule_set, other_serial)
+                    self._place(item, serial)
+                    members[serial].append(item)
+                    assignment[item.Serial] = (rule_set, serial)
+                    return True
+        return False
+
+
 ################################################################################
 # I/O Functions
 
@@ -267,13 +600,79 @@ class Sorter:
 
         return result
 
+    class CapacityLedger:
+        """
+        A local ledger of the contents and the weight of the sortbags, so that the properties of each sortbag
+        are read once per sort pass instead of before every move.
+
+        The ledger is updated optimistically on every move, with the weight of the moved item.
+        It is reconciled with the properties of a sortbag when a move into it is rejected,
+        and on a checkpoint after every `CHECKPOINT_INTERVAL` moves into it.
+        """
+
+        CHECKPOINT_INTERVAL = 25
+        """The number of moves into a sortbag after which its properties are read again."""
+
+        def __init__(self):
+            self.entries: Dict[int, "Sorter.ContainerInfo"] = {}
+            """This stores the expected contents of each sortbag by serial."""
+            self.moves: Dict[int, int] = {}
+            """This stores the number of moves into each sortbag since its properties were last read."""
+
+        def get(self, serial: int) -> Optional["Sorter.ContainerInfo"]:
+            """
+            Return the expected contents of the sortbag, reading its properties only if it is not in the ledger.
+            """
+            info = self.entries.get(serial)
+            if info is None:
+                info = Sorter.get_contents(serial)
+                if info is None:
+                    return None
+                self.entries[serial] = info
+                self.moves[serial] = 0
+            return info
+
+        def record_move(self, serial: int, item: "Item") -> None:
+            """
+            Account for an item moved into the sortbag.
+            A stack merged into an existing stack is counted as a new item, which errs on the safe side.
+            """
+            info = self.entries.get(serial)
+            if info is None:
+                return
+            info.contents += 1
+            info.weight += item.Weight
+            self.moves[serial] += 1
+            if self.moves[serial] >= self.CHECKPOINT_INTERVAL:
+                self.reconcile(serial)
+
+        def reconcile(self, serial: int) -> None:
+            """
+            Drop the expected contents of the sortbag, so that its properties are read again on the next lookup.
+            """
+            self.entries.pop(serial, None)
+            self.moves.pop(serial, None)
+
     @classmethod
-    def move_item(cls, item: "Item", rule_set: SortRules) -> bool:
+    def move_item(
+        cls,
+        item: "Item",
+        rule_set: SortRules,
+        executor: MoveQueue,
+        index: Optional[ContainerIndex] = None,
+        ledger: Optional["Sorter.CapacityLedger"] = None,
+    ) -> bool:
         """
-        Fail-safe move item based on rule set.
+        Fail-safe move item based on rule set. The sortbags are looked up in the index, if provided.
+        The capacities of the sortbags are tracked in the ledger, if provided, and read from their properties otherwise.
+
+        The move is only queued to the executor, and a rejected move is reported when the executor finishes it.
         """
-        for target_cont in rule_set.find_contall():
-            target_info = cls.get_contents(target_cont.Serial)
+        if ledger is None:
+            ledger = cls.CapacityLedger()
+        target_conts = index.find_contall(rule_set) if index is not None else rule_set.find_contall()
+        for target_cont in target_conts:
+            target_info = ledger.get(target_cont.Serial)
             if target_info is None:
                 Logging.Error(f"Failed to get info for target container {hex(target_cont.Serial)}.")
                 continue
@@ -285,39 +684,95 @@ class Sorter:
                 continue
             if rule_set.notify:
                 Logging.Info(f"Sorting item '{item.Name}' using rule set '{rule_set.name}'.")
-            Items.Move(item.Serial, target_cont.Serial, -1)
-            Misc.Pause(MOVE_DELAY)
+
+            ledger.record_move(target_cont.Serial, item)
+            on_done = lambda job, name=item.Name: cls.on_move_done(job, name, ledger)
+            executor.submit(MoveJob(item.Serial, target_cont.Serial, on_done=on_done))
             return True
         Logging.Error(f"No suitable target container found for item '{item.Name}'.")
         return False
 
+    @classmethod
+    def on_move_done(cls, job: MoveJob, name: str, ledger: "Sorter.CapacityLedger", rejected: Optional[Set[int]] = None) -> None:
+        """
+        Reconcile the ledger with the properties of the sortbag if the move was rejected,
+        and add the sortbag to the rejected sortbags, if provided.
+        """
+        if job.status == MoveJob.MOVED:
+            return
+        Logging.Error(f"Target container {hex(job.dest)} rejected item '{name}'.")
+        ledger.reconcile(job.dest)
+        if rejected is not None:
+            rejected.add(job.dest)
+
     @classmethod
     def sort(cls, stop_event: threading.Event) -> None:
         """
         Scan the player's inventory and sort items based on the defined rules.
         """
+        dispatch = RuleSetIndex(cls.RULE_SETS)
+        index = ContainerIndex(cls.RULE_SETS)
+        ledger = cls.CapacityLedger()
+        executor = MoveQueue(delay=MOVE_DELAY)
         filter = Items.Filter()
         filter.Enabled = True
         filter.OnGround = False
-        for item in Items.ApplyFilter(filter):
-            if stop_event.is_set():
-                break
-            if item.RootContainer != Player.Backpack.Serial:
-                continue
-            for rule_set in cls.RULE_SETS:
-                if not rule_set.enabled:
-                    continue
-                if not rule_set.test(item):
-                    continue
-                if cls.move_item(item, rule_set):
+        items = [item for item in Items.ApplyFilter(filter) if item.RootContainer == Player.Backpack.Serial]
+
+        # Share the properties the client holds for the sorted items, so that the explorer can skip requesting them
+        ITEM_CACHE.record_known(items)
+        ITEM_CACHE.flush()
+
+        if PLAN_MOVES:
+            cls.sort_planned(stop_event, items, SortPlanner(dispatch, index, ledger), ledger, executor)
+        else:
+            for item in items:
+                if stop_event.is_set():
                     break
+                for rule_set in dispatch.match(item):
+                    if cls.move_item(item, rule_set, executor, index, ledger):
+                        break
 
+        executor.drain()
+        Logging.Info(executor.report())
         Misc.Pause(100)
         cls.STOP_EVENT = None
         Logging.Info("Sorting done.")
         gb = CraftingGumpBuilder(id="SorterShortcutGump")
         Gumps.SendAction(gb.id, 0)
 
+    @classmethod
+    def sort_planned(
+        cls,
+        stop_event: threading.Event,
+        items: List["Item"],
+        planner: SortPlanner,
+        ledger: "Sorter.CapacityLedger",
+        executor: MoveQueue,
+    ) -> None:
+        """
+        Plan the moves of all the items first, report the items which cannot be placed, and then issue the moves.
+
+        The ledger only provides the contents of the sortbags to the planner, and is not updated by the moves.
+        Once a sortbag rejects a move, the remaining moves planned into it are skipped instead of being issued.
+        """
+        plan = planner.plan(items)
+        for item, reason in plan.unplaced:
+            Logging.Error(f"Cannot sort item '{item.Name}': {reason}.")
+        Logging.Message(f"Planned {len(plan.moves)} moves, {len(plan.unplaced)} items cannot be placed.")
+
+        rejected: Set[int] = set()
+        for item, rule_set, serial in plan.moves:
+            if stop_event.is_set():
+                break
+            if serial in rejected:
+                Logging.Error(f"Skipping item '{item.Name}', target container {hex(serial)} rejected a previous move.")
+                continue
+            if rule_set.notify:
+                Logging.Info(f"Sorting item '{item.Name}' using rule set '{rule_set.name}'.")
+            on_done = lambda job, name=item.Name: cls.on_move_done(job, name, ledger, rejected)
+            executor.submit(MoveJob(item.Serial, serial, on_done=on_done))
+
     @classmethod
     def scan_rule_set(cls) -> Optional[SortRules]:
         """
@@ -1025,6 +1480,7 @@ class Sorter:
 if __name__ == "__main__":
     # Load existing rules
     Sorter.RULE_SETS = load_sort_rules(Sorter.RULES_FILEPATH)
+    ITEM_CACHE.load()
 
     # Open shortcut gump
     while Player.Connected:
@@ -1,10 +1,15 @@
 from AutoComplete import *
+import os
 import sys
 from System import Byte, Int32  # type: ignore
 from enum import Enum
 from queue import Queue
 from typing import List, Tuple, Set, Any, Optional
 
+# Load local modules
+sys.path.append(os.path.dirname(__file__))
+from gump_layout import GumpLayout
+
 
 ################################################################################
 # Setting
@@ -321,11 +326,8 @@ class CircuitAgent:
             raise cls.GumpNotFoundException("Failed to get the gump data.")
 
         res = CircuitProjection()
-        for line in gd.layoutPieces:
-            args = line.lower().strip().split(" ")
-            if not args[0] == "gumppic":
-                continue
-            x, y, grpid = int(args[1]), int(args[2]), int(args[3])
+        for line in GumpLayout.parse(gd).select("gumppic"):
+            x, y, grpid = line.x, line.y, int(line.args[2])
             # Blue cells
             if grpid == 2152:
                 px = (x - 110) // 40